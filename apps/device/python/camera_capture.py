@@ -0,0 +1,324 @@
+"""
+StitchMe Camera Capture
+Frames grabbed into reusable buffers off the event loop, best-frame selection, JPEG pre-encoding and shared-memory handoff
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Callable, Deque, Dict, NamedTuple, Optional, Tuple
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Capture size requested from the camera (width, height)
+CAPTURE_RESOLUTION = (1920, 1080)
+
+# Long edge (px) of uploaded frames: room for the AI service to crop a wound region and still fill its 512px input
+UPLOAD_LONG_EDGE = 1024
+
+JPEG_QUALITY = 85
+
+# Consecutive frames the best one is picked from
+BURST_FRAMES = 5
+
+# Encoded frames that can wait for the uploader at once
+SHARED_SLOTS = 4
+
+# Width (px) frames are shrunk to for sharpness and motion scoring
+SCORE_WIDTH = 320
+
+# Mean absolute gray-level change between frames that halves a frame's score
+MOTION_SCALE = 4.0
+
+
+class Frame(NamedTuple):
+    """A captured frame in the pool and how usable it looks"""
+    index: int
+    captured_at: float  # time.monotonic()
+    sharpness: float  # Variance of the Laplacian; low when blurred
+    motion: float  # Mean absolute change from the previous frame
+
+
+class FrameHandle(NamedTuple):
+    """Where an encoded frame sits in shared memory; small and picklable, sent to the uploader"""
+    slot: int
+    name: str
+    size: int
+    width: int
+    height: int
+    quality: int
+    sharpness: float
+    motion: float
+    captured_at: float
+
+
+class FramePool:
+    """Preallocated frame buffers handed out by index, so capture never allocates"""
+
+    def __init__(self, count: int, shape: Tuple[int, int, int]):
+        self.frames = np.zeros((count,) + shape, dtype=np.uint8)
+        self._free: queue.SimpleQueue = queue.SimpleQueue()
+        for index in range(count):
+            self._free.put(index)
+
+    def acquire(self, timeout: Optional[float] = None) -> Optional[int]:
+        try:
+            return self._free.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def release(self, index: int):
+        self._free.put(index)
+
+
+class SharedFrameReader:
+    """
+    Uploader-side access to encoded frames (picklable; pass it to the uploader process)
+
+    view() returns the JPEG bytes in place as a memoryview; drop the view
+    and then release() the handle so the slot can be reused.
+    """
+
+    def __init__(self, free_slots):
+        self._free_slots = free_slots
+        self._blocks: Dict[str, SharedMemory] = {}
+
+    def __getstate__(self):
+        return {'_free_slots': self._free_slots, '_blocks': {}}
+
+    def view(self, handle: FrameHandle) -> memoryview:
+        block = self._blocks.get(handle.name)
+        if block is None:
+            block = self._blocks[handle.name] = SharedMemory(name=handle.name)
+        return block.buf[:handle.size]
+
+    def release(self, handle: FrameHandle):
+        self._free_slots.put(handle.slot)
+
+    def close(self):
+        for block in self._blocks.values():
+            block.close()
+        self._blocks.clear()
+
+
+class SharedFrameSlots:
+    """Fixed shared-memory blocks encoded frames are written into, recycled as the uploader releases them"""
+
+    def __init__(self, count: int, slot_size: int):
+        self.slot_size = slot_size
+        self.blocks = [SharedMemory(create=True, size=slot_size) for _ in range(count)]
+        self.free = multiprocessing.Queue()
+        for slot in range(count):
+            self.free.put(slot)
+
+    def reader(self) -> SharedFrameReader:
+        return SharedFrameReader(self.free)
+
+    def put(self, jpeg: np.ndarray, timeout: Optional[float], **info) -> FrameHandle:
+        """Copy an encoded frame into a free slot; raises queue.Empty if the uploader holds them all"""
+        if jpeg.size > self.slot_size:
+            raise ValueError(f"Encoded frame is {jpeg.size} bytes, slots hold {self.slot_size}")
+        slot = self.free.get(timeout=timeout)
+        block = self.blocks[slot]
+        block.buf[:jpeg.size] = jpeg.data
+        return FrameHandle(slot=slot, name=block.name, size=int(jpeg.size), **info)
+
+    def close(self):
+        for block in self.blocks:
+            block.close()
+            block.unlink()
+
+
+def open_camera(index: int = 0, resolution: Tuple[int, int] = CAPTURE_RESOLUTION):
+    """OpenCV camera as a grab function that fills a given buffer, plus the (width, height) it delivers"""
+    camera = cv2.VideoCapture(index)
+    if not camera.isOpened():
+        raise RuntimeError(f"Camera {index} could not be opened")
+    camera.set(cv2.CAP_PROP_FRAME_WIDTH, resolution[0])
+    camera.set(cv2.CAP_PROP_FRAME_HEIGHT, resolution[1])
+    width = int(camera.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(camera.get(cv2.CAP_PROP_FRAME_HEIGHT))
+
+    def grab(out: np.ndarray) -> bool:
+        ok, _ = camera.read(out)
+        return ok
+
+    grab.release = camera.release
+    return grab, (width, height)
+
+
+class CameraCapture:
+    """
+    Keeps the last few camera frames ready and turns the best of them into an upload-sized JPEG
+
+    A capture thread grabs frames into a FramePool and scores each on a
+    small grayscale copy: sharpness from the Laplacian, motion from the
+    change since the previous frame. capture() has a single encoder thread
+    pick the best of the next burst frames, shrink it to long_edge, encode
+    it at quality and copy it into shared memory. The event loop only waits
+    on a future, and the uploader gets a FrameHandle to read via
+    SharedFrameReader.
+    """
+
+    def __init__(self,
+                 grab: Callable[[np.ndarray], bool],
+                 resolution: Tuple[int, int] = CAPTURE_RESOLUTION,
+                 long_edge: int = UPLOAD_LONG_EDGE,
+                 quality: int = JPEG_QUALITY,
+                 burst: int = BURST_FRAMES,
+                 slots: int = SHARED_SLOTS):
+        self.grab = grab
+        self.resolution = resolution
+        self.burst = burst
+        self.long_edge = long_edge
+        self.quality = quality
+        self.max_long_edge = long_edge
+
+        width, height = resolution
+        # The burst, one frame being grabbed and one being encoded
+        self.pool = FramePool(burst + 2, (height, width, 3))
+        # A raw frame at the largest target always fits; JPEG comes in far under that
+        self.slots = SharedFrameSlots(slots, long_edge * long_edge * 3)
+
+        score_height = max(1, round(height * SCORE_WIDTH / width))
+        self._small = np.zeros((score_height, SCORE_WIDTH, 3), dtype=np.uint8)
+        self._gray = np.zeros((score_height, SCORE_WIDTH), dtype=np.uint8)
+        self._previous_gray = np.zeros_like(self._gray)
+        self._has_previous = False
+
+        self._recent: Deque[Frame] = deque()
+        self._ready = threading.Condition()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._encoder = ThreadPoolExecutor(max_workers=1, thread_name_prefix='jpeg')
+
+        self.frames_captured = 0
+        self.grab_failures = 0
+        self.frames_encoded = 0
+        self.raw_bytes = 0
+        self.encoded_bytes = 0
+        self.encode_time = 0.0
+
+    def set_target(self, long_edge: Optional[int] = None, quality: Optional[int] = None):
+        """Change the upload size or JPEG quality, e.g. for a slower link"""
+        if long_edge is not None:
+            if not 0 < long_edge <= self.max_long_edge:
+                raise ValueError(f"Long edge must be between 1 and {self.max_long_edge}px")
+            self.long_edge = long_edge
+        if quality is not None:
+            if not 1 <= quality <= 100:
+                raise ValueError("JPEG quality must be between 1 and 100")
+            self.quality = quality
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._capture, name='camera', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 1.0):
+        self._stop.set()
+        with self._ready:
+            self._ready.notify_all()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+        self._encoder.shutdown(wait=True)
+        self.slots.close()
+        release = getattr(self.grab, 'release', None)
+        if release:
+            release()
+
+    def _score(self, frame: np.ndarray) -> Tuple[float, float]:
+        cv2.resize(frame, (self._small.shape[1], self._small.shape[0]), dst=self._small,
+                   interpolation=cv2.INTER_AREA)
+        cv2.cvtColor(self._small, cv2.COLOR_BGR2GRAY, dst=self._gray)
+        sharpness = float(cv2.Laplacian(self._gray, cv2.CV_32F).var())
+        motion = float(cv2.absdiff(self._gray, self._previous_gray).mean()) if self._has_previous else 0.0
+        np.copyto(self._previous_gray, self._gray)
+        self._has_previous = True
+        return sharpness, motion
+
+    def _capture(self):
+        while not self._stop.is_set():
+            index = self.pool.acquire(timeout=0.1)
+            if index is None:
+                continue
+
+            if not self.grab(self.pool.frames[index]):
+                self.pool.release(index)
+                self.grab_failures += 1
+                if self.grab_failures % 100 == 1:
+                    logger.warning(f"⚠️ Camera grab failed ({self.grab_failures} failures)")
+                self._stop.wait(0.1)
+                continue
+
+            captured_at = time.monotonic()
+            sharpness, motion = self._score(self.pool.frames[index])
+            self.frames_captured += 1
+            with self._ready:
+                self._recent.append(Frame(index, captured_at, sharpness, motion))
+                # Only the newest burst frames are kept; the oldest goes back to the pool
+                if len(self._recent) > self.burst:
+                    self.pool.release(self._recent.popleft().index)
+                self._ready.notify_all()
+
+    def _select(self, after: float, timeout: float) -> Frame:
+        """Take the best of the next burst frames captured after the given time out of the rotation"""
+        with self._ready:
+            if not self._ready.wait_for(
+                    lambda: self._stop.is_set() or
+                    sum(frame.captured_at >= after for frame in self._recent) >= self.burst, timeout):
+                raise TimeoutError(f"Camera delivered fewer than {self.burst} frames in {timeout}s")
+            if self._stop.is_set():
+                raise RuntimeError("Camera capture stopped")
+            best = max(self._recent, key=lambda frame: frame.sharpness / (1.0 + frame.motion / MOTION_SCALE))
+            self._recent.remove(best)
+        return best
+
+    def _select_and_encode(self, after: float, timeout: float) -> FrameHandle:
+        best = self._select(after, timeout)
+        started = time.perf_counter()
+        try:
+            image = self.pool.frames[best.index]
+            scale = self.long_edge / max(image.shape[:2])
+            if scale < 1.0:
+                image = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+            ok, jpeg = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+            if not ok:
+                raise RuntimeError("JPEG encoding failed")
+        finally:
+            self.pool.release(best.index)
+        self.encode_time += time.perf_counter() - started
+
+        height, width = image.shape[:2]
+        handle = self.slots.put(jpeg, timeout, width=width, height=height, quality=self.quality,
+                                sharpness=best.sharpness, motion=best.motion, captured_at=best.captured_at)
+        self.frames_encoded += 1
+        self.raw_bytes += self.pool.frames[0].nbytes
+        self.encoded_bytes += handle.size
+        return handle
+
+    async def capture(self, timeout: float = 2.0) -> FrameHandle:
+        """Best of the next burst frames, encoded and in shared memory for the uploader"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._encoder, self._select_and_encode, time.monotonic(), timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'frames_captured': self.frames_captured,
+            'grab_failures': self.grab_failures,
+            'frames_encoded': self.frames_encoded,
+            'raw_bytes': self.raw_bytes,
+            'encoded_bytes': self.encoded_bytes,
+            'compression': round(self.raw_bytes / self.encoded_bytes, 1) if self.encoded_bytes else None,
+            'encode_ms': round(self.encode_time / self.frames_encoded * 1000, 2) if self.frames_encoded else None,
+        }
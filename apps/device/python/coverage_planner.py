@@ -0,0 +1,316 @@
+"""
+StitchMe Coverage Planner
+Boustrophedon and spiral coverage paths over wound regions, ordered to minimize travel
+"""
+
+import math
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from motion_planner import (DEFAULT_AXIS_LIMITS, DEFAULT_JUNCTION_DEVIATION, DEFAULT_TRAVEL_SPEED, AxisLimits,
+                            PathPlan, plan_move, plan_path)
+
+PATTERNS = ('boustrophedon', 'spiral')
+
+# Width (mm) of the strip one pass of the nozzle wets; passes are this far apart
+DEFAULT_SPACING = 2.0
+
+# Resolution (mm) regions are rasterized at for spiral offsets
+RASTER_MM = 0.1
+
+# Regions smaller than this (mm^2) are mask noise
+MIN_REGION_AREA = 1.0
+
+# A pass: polyline (N, 2) in mm the nozzle dispenses along
+Pass = np.ndarray
+
+
+def regions_from_mask(mask: np.ndarray,
+                      mm_per_pixel: float,
+                      origin: Tuple[float, float] = (0.0, 0.0),
+                      min_area: float = MIN_REGION_AREA) -> List[np.ndarray]:
+    """
+    Outline polygons (mm) of the regions in a binary wound mask
+
+    Columns run along x and rows along y; origin is the work-area position of
+    the mask's top-left corner.
+    """
+    contours, _ = cv2.findContours(np.asarray(mask, dtype=np.uint8), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    regions = []
+    for contour in contours:
+        if cv2.contourArea(contour) * mm_per_pixel ** 2 < min_area:
+            continue
+        # Pixel centers
+        regions.append((contour[:, 0, :].astype(np.float64) + 0.5) * mm_per_pixel + np.asarray(origin))
+    return regions
+
+
+def polygon_area(polygon: np.ndarray) -> float:
+    """Shoelace area (mm^2)"""
+    x, y = polygon[:, 0], polygon[:, 1]
+    return abs(float(np.dot(x, np.roll(y, -1)) - np.dot(y, np.roll(x, -1)))) / 2.0
+
+
+def boustrophedon_passes(polygon: np.ndarray, spacing: float = DEFAULT_SPACING) -> List[Pass]:
+    """
+    Back-and-forth strokes covering a polygon
+
+    Strokes run along the region's long axis so there are as few turns as
+    possible, spacing mm apart, and alternate direction. Concave regions can
+    give several strokes per line; the nozzle travels between them without
+    dispensing.
+    """
+    center = polygon.mean(axis=0)
+    # Long axis from the principal component of the outline
+    _, vectors = np.linalg.eigh(np.cov((polygon - center).T))
+    axis = vectors[:, -1]
+    rotation = np.array([axis, [-axis[1], axis[0]]])
+    local = (polygon - center) @ rotation.T
+
+    low, high = local[:, 1].min(), local[:, 1].max()
+    lines = max(int(math.floor((high - low) / spacing)), 1)
+    # Center the lines in the region so the edges get half a spacing each
+    offsets = (low + high) / 2.0 + (np.arange(lines) - (lines - 1) / 2.0) * spacing
+
+    start, end = local, np.roll(local, -1, axis=0)
+    passes = []
+    for line, y in enumerate(offsets):
+        # Edges straddling the line (half-open so shared vertices count once)
+        crossing = (start[:, 1] <= y) != (end[:, 1] <= y)
+        if not crossing.any():
+            continue
+        s, e = start[crossing], end[crossing]
+        xs = np.sort(s[:, 0] + (y - s[:, 1]) * (e[:, 0] - s[:, 0]) / (e[:, 1] - s[:, 1]))
+        strokes = [np.array([[x0, y], [x1, y]]) for x0, x1 in zip(xs[0::2], xs[1::2]) if x1 > x0]
+        if line % 2:
+            strokes = [stroke[::-1] for stroke in reversed(strokes)]
+        passes.extend(stroke @ rotation + center for stroke in strokes)
+    return passes
+
+
+def spiral_passes(polygon: np.ndarray, spacing: float = DEFAULT_SPACING) -> List[Pass]:
+    """
+    Concentric rings covering a polygon from the outline inwards
+
+    Rings are level sets of the distance to the outline, spacing mm apart,
+    each started at the point nearest where the previous one finished.
+    Narrow necks split a ring into several.
+    """
+    origin = polygon.min(axis=0) - spacing
+    size = np.ceil((polygon.max(axis=0) + spacing - origin) / RASTER_MM).astype(int) + 1
+    mask = np.zeros((size[1], size[0]), dtype=np.uint8)
+    cv2.fillPoly(mask, [np.round((polygon - origin) / RASTER_MM).astype(np.int32)], 1)
+    distance = cv2.distanceTransform(mask, cv2.DIST_L2, 5) * RASTER_MM
+
+    passes, position = [], None
+    level = spacing / 2.0
+    while True:
+        contours, _ = cv2.findContours((distance >= level).astype(np.uint8), cv2.RETR_LIST, cv2.CHAIN_APPROX_SIMPLE)
+        rings = []
+        for contour in contours:
+            contour = cv2.approxPolyDP(contour, 1.0, True)
+            if len(contour) < 2:
+                continue
+            rings.append((contour[:, 0, :].astype(np.float64) + 0.5) * RASTER_MM + origin)
+        if not rings:
+            break
+        for ring in rings:
+            if position is not None:
+                ring = np.roll(ring, -int(np.argmin(np.linalg.norm(ring - position, axis=1))), axis=0)
+            ring = np.vstack([ring, ring[:1]])
+            passes.append(ring)
+            position = ring[-1]
+        level += spacing
+
+    if not passes:
+        # Thinner than one pass: a single stroke along it
+        return boustrophedon_passes(polygon, spacing)
+    return passes
+
+
+def order_regions(start: np.ndarray, ends: np.ndarray) -> Tuple[List[int], List[bool]]:
+    """
+    Visit order and direction for regions with (entry, exit) points ends[k]
+
+    Nearest neighbour from start, then 2-opt: reversing a run of the tour
+    also reverses the direction each region in it is covered, which is free
+    because a coverage pass works either way round. Returns region indices
+    and, for each, whether to cover it backwards.
+    """
+    count = len(ends)
+    remaining = set(range(count))
+    order, flipped = [], []
+    position = start
+    while remaining:
+        index, flip = min(
+            ((k, f) for k in remaining for f in (False, True)),
+            key=lambda option: np.linalg.norm(ends[option[0], int(option[1])] - position)
+        )
+        remaining.remove(index)
+        order.append(index)
+        flipped.append(flip)
+        position = ends[index, 0] if flip else ends[index, 1]
+
+    def entry(i):
+        return ends[order[i], 1] if flipped[i] else ends[order[i], 0]
+
+    def exit_(i):
+        return ends[order[i], 0] if flipped[i] else ends[order[i], 1]
+
+    improved = True
+    while improved:
+        improved = False
+        for i in range(count):
+            for k in range(i, count):
+                before = start if i == 0 else exit_(i - 1)
+                current = np.linalg.norm(entry(i) - before)
+                candidate = np.linalg.norm(exit_(k) - before)
+                if k + 1 < count:
+                    current += np.linalg.norm(entry(k + 1) - exit_(k))
+                    candidate += np.linalg.norm(entry(k + 1) - entry(i))
+                if candidate < current - 1e-9:
+                    order[i:k + 1] = order[i:k + 1][::-1]
+                    flipped[i:k + 1] = [not flip for flip in flipped[i:k + 1][::-1]]
+                    improved = True
+    return order, flipped
+
+
+@dataclass
+class CoveragePlan:
+    """A coverage path over one or more regions, with the single-point treatment it replaces"""
+    path: PathPlan
+    pattern: str
+    spacing: float
+    area_mm2: float
+    dispense_length: float
+    approach_duration: float
+    region_order: List[int]
+    single_point: Dict[str, float]
+
+    @property
+    def duration(self) -> float:
+        return self.approach_duration + self.path.duration
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            'pattern': self.pattern,
+            'regions': len(self.region_order),
+            'spacing_mm': self.spacing,
+            'area_mm2': round(self.area_mm2, 1),
+            'dispense_length_mm': round(self.dispense_length, 1),
+            'travel_length_mm': round(self.path.distance - self.dispense_length, 1),
+            'duration_s': round(self.duration, 3),
+            'volume_ml': round(self.path.volume_ml, 4),
+            'path': self.path.summary(),
+            'single_point': self.single_point,
+        }
+
+
+def plan_coverage(regions: Sequence[np.ndarray],
+                  z: float,
+                  start: Dict[str, float],
+                  volume_ml: float,
+                  max_flow_ml_min: float,
+                  work_area: Dict[str, float],
+                  dose_ml_cm2: Optional[float] = None,
+                  pattern: str = 'boustrophedon',
+                  spacing: float = DEFAULT_SPACING,
+                  speed: float = 20.0,
+                  limits: Dict[str, AxisLimits] = DEFAULT_AXIS_LIMITS,
+                  junction_deviation: float = DEFAULT_JUNCTION_DEVIATION,
+                  travel_speed: float = DEFAULT_TRAVEL_SPEED) -> CoveragePlan:
+    """
+    Plan a pass covering every region (outline polygons in mm) at height z
+
+    volume_ml is spread evenly over the dispensing strokes, or with
+    dose_ml_cm2 the volume is sized to the covered area instead; travel
+    between strokes and regions is dry. The feed speed is lowered if covering the
+    path at speed would need more than max_flow_ml_min from the pump.
+    Regions are clipped to the work area. Dry moves to the path (and between
+    dwells in the single-point comparison) are timed at travel_speed, the cap
+    DeviceController.move_to_position applies.
+    """
+    if pattern not in PATTERNS:
+        raise ValueError(f"Unknown coverage pattern: {pattern}")
+    if spacing <= 0:
+        raise ValueError("Spacing must be positive")
+    if not max_flow_ml_min > 0:
+        raise ValueError(f"Pump flow rate must be positive, got {max_flow_ml_min} ml/min")
+    if dose_ml_cm2 is not None and not dose_ml_cm2 > 0:
+        raise ValueError(f"Dose must be positive, got {dose_ml_cm2} ml/cm²")
+    if dose_ml_cm2 is None and not volume_ml > 0:
+        raise ValueError(f"Volume must be positive, got {volume_ml} ml")
+
+    bounds = np.array([work_area['x_max'], work_area['y_max']], dtype=np.float64)
+    polygons = [np.clip(np.asarray(region, dtype=np.float64), 0.0, bounds) for region in regions]
+    polygons = [polygon for polygon in polygons if len(polygon) >= 3 and polygon_area(polygon) > 0]
+    if not polygons:
+        raise ValueError("No region to cover")
+
+    make_passes = boustrophedon_passes if pattern == 'boustrophedon' else spiral_passes
+    region_passes = [[p for p in make_passes(polygon, spacing) if len(p) >= 2] for polygon in polygons]
+    kept = [k for k, passes in enumerate(region_passes) if passes]
+    if not kept:
+        raise ValueError("Regions are too small to cover")
+
+    ends = np.array([[region_passes[k][0][0], region_passes[k][-1][-1]] for k in kept])
+    start_xy = np.array([float(start['x']), float(start['y'])])
+    order, flipped = order_regions(start_xy, ends)
+
+    # Waypoints, and whether the segment leading to each one dispenses
+    points, dispensing = [], []
+    for index, flip in zip(order, flipped):
+        passes = region_passes[kept[index]]
+        if flip:
+            passes = [p[::-1] for p in reversed(passes)]
+        for p in passes:
+            points.append(p[0])
+            dispensing.append(False)
+            points.extend(p[1:])
+            dispensing.extend([True] * (len(p) - 1))
+    points = np.clip(np.array(points), 0.0, bounds)
+    dispensing = np.array(dispensing[1:])
+
+    area = sum(polygon_area(polygons[k]) for k in kept)
+    if dose_ml_cm2 is not None:
+        volume_ml = dose_ml_cm2 * area / 100.0
+
+    lengths = np.linalg.norm(np.diff(points, axis=0), axis=1)
+    dispense_length = float(lengths[dispensing].sum())
+    deposition = volume_ml / dispense_length if dispense_length > 0 else 0.0
+    if deposition > 0:
+        speed = min(speed, max_flow_ml_min / 60.0 / deposition)
+    flow_rates = np.where(dispensing, deposition * speed * 60.0, 0.0)
+
+    waypoints = [{'x': float(x), 'y': float(y), 'z': float(z)} for x, y in points]
+    path = plan_path(waypoints, flow_rates, limits=limits, speed=speed, junction_deviation=junction_deviation)
+
+    approach = plan_move(start, waypoints[0], limits=limits, speed=travel_speed).duration
+
+    # What start_treatment does today: the same volume dispensed in dwells at each region's centroid
+    dwell = volume_ml / len(order) / max_flow_ml_min * 60.0
+    position, single_point_duration = dict(start), 0.0
+    for index in order:
+        x, y = polygons[kept[index]].mean(axis=0)
+        target = {'x': float(x), 'y': float(y), 'z': float(z)}
+        single_point_duration += plan_move(position, target, limits=limits, speed=travel_speed).duration + dwell
+        position = target
+
+    return CoveragePlan(
+        path=path,
+        pattern=pattern,
+        spacing=spacing,
+        area_mm2=area,
+        dispense_length=dispense_length,
+        approach_duration=approach,
+        region_order=[kept[index] for index in order],
+        single_point={
+            'duration_s': round(single_point_duration, 3),
+            'volume_ml': round(volume_ml, 4),
+            # The spot under a stationary nozzle
+            'area_mm2': round(len(order) * math.pi * (spacing / 2.0) ** 2, 1),
+        }
+    )
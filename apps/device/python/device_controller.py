@@ -6,7 +6,15 @@ Handles physical device operations: motors, actuators, treatment application
 import asyncio
 import logging
 from enum import Enum
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Sequence, Union
+
+import numpy as np
+
+from coverage_planner import DEFAULT_SPACING, plan_coverage
+from device_state import AXIS_NAMES, MachineState, StateSnapshot
+from hardware import HardwareBackend, MotionStopped, SimulatedBackend
+from motion_planner import DEFAULT_AXIS_LIMITS, DEFAULT_TRAVEL_SPEED, AxisLimits, PathPlan, plan_move, plan_path
+from startup import run_steps
 
 logger = logging.getLogger(__name__)
 
@@ -23,31 +31,60 @@ class TreatmentType(Enum):
     CLEANING = "cleaning"
     SANITIZING = "sanitizing"
 
+# Pump that dispenses each treatment
+TREATMENT_PUMPS = {
+    TreatmentType.SKIN_GLUE: 'skin_glue_pump',
+    TreatmentType.CLEANING: 'cleaning_pump',
+    TreatmentType.SANITIZING: 'sanitizer_pump',
+}
+
+# Default (volume_ml, flow_rate_ml_min) for area treatments
+DISPENSE_DEFAULTS = {
+    TreatmentType.CLEANING: (1.0, 2.0),
+    TreatmentType.SANITIZING: (0.5, 1.0),
+}
+
+# How often pump flow and reported position follow the path while it runs (s)
+PATH_UPDATE_INTERVAL = 0.02
+
 class DeviceController:
-    """Controls the physical StitchMe device hardware"""
+    """
+    Controls the physical StitchMe device hardware
+
+    All hardware access goes through a HardwareBackend. Without one the
+    controller runs on SimulatedBackend, which moves and dispenses on the
+    event loop's clock but drives no real hardware; pass the board's
+    backend to control a device. axis_limits are the gantry's per-axis
+    motion limits, motion_planner.DEFAULT_AXIS_LIMITS unless given.
+    """
     
-    def __init__(self):
+    def __init__(self, backend: Optional[HardwareBackend] = None,
+                 axis_limits: Optional[Dict[str, AxisLimits]] = None):
+        self.backend = backend or SimulatedBackend()
         self.state = DeviceState.IDLE
         self.current_treatment = None
-        self.motor_positions = {}
+        # Positions, enables and flows, updated in place; readers take snapshots
+        self.machine = MachineState()
         self.is_emergency_stopped = False
+        self.axis_limits = axis_limits or DEFAULT_AXIS_LIMITS
+        self.motion_profile = 'scurve'  # or 'trapezoid'
+        self.junction_deviation = 0.05  # mm
+        self.last_move = None
         
     async def initialize(self):
         """Initialize device hardware"""
         logger.info("🔧 Initializing device controller...")
         
         try:
-            # Initialize motor controllers
-            await self._initialize_motors()
-            
-            # Initialize actuators (nozzles, pumps)
-            await self._initialize_actuators()
-            
-            # Initialize positioning system
-            await self._initialize_positioning()
-            
-            # Home all axes
-            await self._home_all_axes()
+            # Motors, actuators (nozzles, pumps) and positioning come up independently;
+            # homing needs the motors and the positioning system
+            await run_steps({
+                'backend': (self.backend.initialize, ()),
+                'motors': (self._initialize_motors, ('backend',)),
+                'actuators': (self._initialize_actuators, ('backend',)),
+                'positioning': (self._initialize_positioning, ()),
+                'homing': (self._home_all_axes, ('motors', 'positioning')),
+            }, label="Device controller")
             
             logger.info("✅ Device controller initialized")
             return True
@@ -62,12 +99,7 @@ class DeviceController:
         
         # TODO: Initialize actual motor drivers
         # For now, simulate motor initialization
-        self.motors = {
-            'x_axis': {'position': 0, 'enabled': True},
-            'y_axis': {'position': 0, 'enabled': True},
-            'z_axis': {'position': 0, 'enabled': True},
-            'nozzle_rotation': {'position': 0, 'enabled': True},
-        }
+        self.machine.enable_axes(True)
         
         logger.info("✅ Motors initialized")
     
@@ -76,12 +108,8 @@ class DeviceController:
         logger.info("🔧 Initializing actuators...")
         
         # TODO: Initialize actual actuator hardware
-        self.actuators = {
-            'skin_glue_pump': {'enabled': True, 'flow_rate': 0},
-            'cleaning_pump': {'enabled': True, 'flow_rate': 0},
-            'sanitizer_pump': {'enabled': True, 'flow_rate': 0},
-            'nozzle_valve': {'enabled': True, 'open': False},
-        }
+        self.machine.stop_dispensing()
+        self.machine.enable_actuators(True)
         
         logger.info("✅ Actuators initialized")
     
@@ -90,11 +118,8 @@ class DeviceController:
         logger.info("🔧 Initializing positioning system...")
         
         # TODO: Initialize encoders, limit switches, etc.
-        self.positioning = {
-            'work_area': {'x_max': 200, 'y_max': 200, 'z_max': 50},  # mm
-            'current_position': {'x': 0, 'y': 0, 'z': 0},
-            'calibrated': False,
-        }
+        self.machine.set_position(0, 0, 0)
+        self.machine.set_calibrated(False)
         
         logger.info("✅ Positioning system initialized")
     
@@ -106,13 +131,12 @@ class DeviceController:
             # TODO: Implement actual homing sequence
             # Move to limit switches and set zero positions
             
-            for axis in ['x_axis', 'y_axis', 'z_axis']:
-                logger.info(f"Homing {axis}...")
-                await asyncio.sleep(0.5)  # Simulate homing time
-                self.motors[axis]['position'] = 0
+            # Z first so the nozzle is clear of the patient, then X and Y together
+            await self._home_axis('z_axis')
+            await asyncio.gather(self._home_axis('x_axis'), self._home_axis('y_axis'))
             
-            self.positioning['current_position'] = {'x': 0, 'y': 0, 'z': 0}
-            self.positioning['calibrated'] = True
+            self.machine.set_position(0, 0, 0)
+            self.machine.set_calibrated(True)
             
             logger.info("✅ All axes homed successfully")
             
@@ -120,7 +144,23 @@ class DeviceController:
             logger.error(f"❌ Homing failed: {e}")
             raise
     
-    async def move_to_position(self, x: float, y: float, z: float, speed: float = 100):
+    def _set_flow(self, pump: str, flow_rate: float):
+        """Command a pump's flow (ml/min)"""
+        self.backend.set_flow(pump, flow_rate)
+        self.machine.set_flow(pump, flow_rate)
+    
+    def _set_valve(self, open: bool):
+        """Open or close the nozzle valve"""
+        self.backend.set_valve(open)
+        self.machine.set_valve(open)
+    
+    async def _home_axis(self, axis: str):
+        """Home one axis against its limit switch"""
+        logger.info(f"Homing {axis}...")
+        await self.backend.home_axis(axis)
+        self.machine.set_axis(axis, 0)
+    
+    async def move_to_position(self, x: float, y: float, z: float, speed: float = DEFAULT_TRAVEL_SPEED):
         """Move device to specified position (mm)"""
         if self.is_emergency_stopped:
             raise Exception("Device is emergency stopped")
@@ -132,28 +172,23 @@ class DeviceController:
         
         try:
             # Check bounds
-            work_area = self.positioning['work_area']
-            if not (0 <= x <= work_area['x_max'] and 
-                   0 <= y <= work_area['y_max'] and 
-                   0 <= z <= work_area['z_max']):
+            if not self.machine.work_area.contains(x, y, z):
                 raise ValueError("Position out of bounds")
             
-            # TODO: Implement actual motor movement
-            # Calculate movement steps, acceleration, etc.
-            
-            # Simulate movement time
-            distance = ((x - self.positioning['current_position']['x'])**2 + 
-                       (y - self.positioning['current_position']['y'])**2 + 
-                       (z - self.positioning['current_position']['z'])**2)**0.5
+            # Jerk-limited, time-synchronized straight-line move with per-axis step schedules
+            plan = plan_move(
+                self.machine.position,
+                {'x': x, 'y': y, 'z': z},
+                limits=self.axis_limits,
+                speed=speed,
+                profile=self.motion_profile
+            )
+            self.last_move = plan.summary()
             
-            move_time = distance / speed  # seconds
-            await asyncio.sleep(min(move_time, 5.0))  # Cap at 5 seconds for simulation
+            await self.backend.execute_move(plan)
             
             # Update position
-            self.positioning['current_position'] = {'x': x, 'y': y, 'z': z}
-            self.motors['x_axis']['position'] = x
-            self.motors['y_axis']['position'] = y
-            self.motors['z_axis']['position'] = z
+            self.machine.set_position(x, y, z)
             
             logger.info(f"✅ Moved to position: X={x}, Y={y}, Z={z}")
             
@@ -166,6 +201,10 @@ class DeviceController:
                             position: Dict[str, float], 
                             parameters: Dict[str, Any]):
         """Start treatment application"""
+        # Cleaning and sanitizing cover the wound outline when the analysis provides one
+        if treatment_type in DISPENSE_DEFAULTS and parameters.get('wound_outlines'):
+            return await self.cover_wound(treatment_type, parameters['wound_outlines'], position['z'], parameters)
+        
         if self.state != DeviceState.IDLE:
             raise Exception(f"Cannot start treatment in state: {self.state}")
         
@@ -202,89 +241,193 @@ class DeviceController:
             await self.emergency_stop()
             raise
         finally:
-            self.state = DeviceState.IDLE
+            # An emergency stop holds until reset_emergency()
+            if self.state != DeviceState.EMERGENCY:
+                self.state = DeviceState.IDLE
             self.current_treatment = None
     
-    async def _apply_skin_glue(self, parameters: Dict[str, Any]):
-        """Apply skin glue treatment"""
-        logger.info("💧 Applying skin glue...")
+    async def follow_path(self, treatment_type: TreatmentType,
+                          waypoints: List[Dict[str, float]],
+                          flow_rates: Union[float, Sequence[float]],
+                          speed: float = 10.0,
+                          smooth: bool = False):
+        """
+        Dispense along a seam of waypoints (mm) without stopping at each one
         
-        # Get parameters
-        volume_ml = parameters.get('volume_ml', 0.1)
-        flow_rate = parameters.get('flow_rate_ml_min', 0.5)
+        flow_rates is the pump flow (ml/min) per segment, or one for the whole
+        seam, at the feed speed (mm/s). The path is blended through corners
+        with look-ahead and pump flow follows nozzle speed, so the bead stays
+        even where the head slows. smooth=True joins the waypoints with a
+        spline instead of straight lines. Returns the plan summary.
+        """
+        if self.state != DeviceState.IDLE:
+            raise Exception(f"Cannot start treatment in state: {self.state}")
         
-        # Calculate application time
-        application_time = (volume_ml / flow_rate) * 60  # seconds
+        for waypoint in waypoints:
+            if not self.machine.work_area.contains(waypoint['x'], waypoint['y'], waypoint['z']):
+                raise ValueError("Path out of bounds")
+        
+        plan = plan_path(
+            waypoints,
+            flow_rates,
+            limits=self.axis_limits,
+            speed=speed,
+            junction_deviation=self.junction_deviation,
+            smooth=smooth
+        )
+        summary = plan.summary()
+        
+        logger.info(f"💉 Starting {treatment_type.value} along {summary['waypoints']} waypoints: "
+                    f"{summary['distance_mm']}mm in {summary['duration_s']}s "
+                    f"(stop-and-go {summary['stop_and_go_duration_s']}s)")
+        
+        await self._run_path_treatment(treatment_type, plan, summary)
+        return summary
+    
+    async def cover_wound(self, treatment_type: TreatmentType,
+                          regions: List[Any],
+                          z: float,
+                          parameters: Dict[str, Any]):
+        """
+        Clean or sanitize a wound area with a coverage path instead of a single dwell
+        
+        regions are wound outlines (polygons of x, y points in mm). Parameters:
+        volume_ml (or dose_ml_cm2), flow_rate_ml_min (the pump's ceiling),
+        pattern ('boustrophedon' or 'spiral'), spacing_mm and speed_mm_s.
+        Returns the plan summary, including the single-point equivalent.
+        """
+        if self.state != DeviceState.IDLE:
+            raise Exception(f"Cannot start treatment in state: {self.state}")
+        if not 0 <= z <= self.machine.work_area.z_max:
+            raise ValueError("Position out of bounds")
+        
+        volume_ml, flow_rate = DISPENSE_DEFAULTS[treatment_type]
+        coverage = plan_coverage(
+            [np.asarray(region, dtype=np.float64) for region in regions],
+            z,
+            self.machine.position,
+            parameters.get('volume_ml', volume_ml),
+            parameters.get('flow_rate_ml_min', flow_rate),
+            self.machine.work_area._asdict(),
+            dose_ml_cm2=parameters.get('dose_ml_cm2'),
+            pattern=parameters.get('pattern', 'boustrophedon'),
+            spacing=parameters.get('spacing_mm', DEFAULT_SPACING),
+            speed=parameters.get('speed_mm_s', 20.0),
+            limits=self.axis_limits,
+            junction_deviation=self.junction_deviation
+        )
+        summary = coverage.summary()
+        
+        logger.info(f"🧭 Covering {summary['area_mm2']}mm² in {summary['regions']} region(s) "
+                    f"({summary['pattern']}): {summary['duration_s']}s, {summary['volume_ml']}ml "
+                    f"vs single-point {summary['single_point']['duration_s']}s, "
+                    f"{summary['single_point']['volume_ml']}ml")
+        
+        await self._run_path_treatment(treatment_type, coverage.path, summary)
+        return summary
+    
+    async def _run_path_treatment(self, treatment_type: TreatmentType, plan: PathPlan, summary: Dict[str, Any]):
+        """Travel to the start of a planned path, then dispense along it"""
+        pump = TREATMENT_PUMPS[treatment_type]
         
         try:
-            # Open nozzle valve
-            self.actuators['nozzle_valve']['open'] = True
-            
-            # Start pump
-            self.actuators['skin_glue_pump']['flow_rate'] = flow_rate
+            self.state = DeviceState.TREATING
+            self.current_treatment = {
+                'type': treatment_type,
+                'path': summary,
+                'start_time': asyncio.get_event_loop().time(),
+            }
             
-            # Apply for calculated time
-            await asyncio.sleep(application_time)
+            # Travel to the start of the path without dispensing
+            x, y, z = plan.points[0]
+            await self.move_to_position(float(x), float(y), float(z))
             
-            # Stop pump
-            self.actuators['skin_glue_pump']['flow_rate'] = 0
+            # Pump flow follows the nozzle speed while the backend runs the step schedules
+            motion = asyncio.create_task(self.backend.execute_move(plan))
+            try:
+                self._set_valve(True)
+                
+                loop = asyncio.get_event_loop()
+                started = loop.time()
+                while not motion.done():
+                    elapsed = loop.time() - started
+                    x, y, z = plan.position_at(elapsed)[0]
+                    self._set_flow(pump, float(plan.flow_at(elapsed)[0]))
+                    self.machine.set_position(x, y, z)
+                    
+                    await asyncio.wait({motion}, timeout=PATH_UPDATE_INTERVAL)
+                await motion
+                
+            finally:
+                motion.cancel()
+                self._set_flow(pump, 0)
+                self._set_valve(False)
             
-            # Close nozzle valve
-            self.actuators['nozzle_valve']['open'] = False
+            self.machine.set_position(*plan.points[-1])
+            self.last_move = summary
             
-            logger.info(f"✅ Applied {volume_ml}ml skin glue")
+            logger.info(f"✅ Applied {plan.volume_ml:.4f}ml {treatment_type.value} along path")
             
         except Exception as e:
-            # Emergency stop pumps
-            self.actuators['skin_glue_pump']['flow_rate'] = 0
-            self.actuators['nozzle_valve']['open'] = False
+            logger.error(f"❌ Path treatment failed: {e}")
+            await self.emergency_stop()
             raise
+        finally:
+            # An emergency stop holds until reset_emergency()
+            if self.state != DeviceState.EMERGENCY:
+                self.state = DeviceState.IDLE
+            self.current_treatment = None
+    
+    async def _dispense(self, pump: str, volume_ml: float, flow_rate: float):
+        """
+        Dispense volume_ml at flow_rate (ml/min) with the nozzle in place
+        
+        The dwell runs on the backend, so an emergency stop cuts it short with
+        MotionStopped; the pump and valve are shut off either way.
+        """
+        if volume_ml <= 0 or flow_rate <= 0:
+            raise ValueError("Volume and flow rate must be positive")
+        if self.is_emergency_stopped:
+            raise MotionStopped("Device is emergency stopped")
+        
+        application_time = (volume_ml / flow_rate) * 60  # seconds
+        try:
+            self._set_valve(True)
+            self._set_flow(pump, flow_rate)
+            await self.backend.dispense(application_time)
+        finally:
+            self._set_flow(pump, 0)
+            self._set_valve(False)
+    
+    async def _apply_skin_glue(self, parameters: Dict[str, Any]):
+        """Apply skin glue treatment"""
+        logger.info("💧 Applying skin glue...")
+        
+        volume_ml = parameters.get('volume_ml', 0.1)
+        flow_rate = parameters.get('flow_rate_ml_min', 0.5)
+        await self._dispense('skin_glue_pump', volume_ml, flow_rate)
+        
+        logger.info(f"✅ Applied {volume_ml}ml skin glue")
     
     async def _apply_cleaning(self, parameters: Dict[str, Any]):
         """Apply cleaning solution"""
         logger.info("🧽 Applying cleaning solution...")
         
-        # Similar implementation to skin glue but with cleaning pump
         volume_ml = parameters.get('volume_ml', 1.0)
         flow_rate = parameters.get('flow_rate_ml_min', 2.0)
-        application_time = (volume_ml / flow_rate) * 60
+        await self._dispense('cleaning_pump', volume_ml, flow_rate)
         
-        try:
-            self.actuators['nozzle_valve']['open'] = True
-            self.actuators['cleaning_pump']['flow_rate'] = flow_rate
-            await asyncio.sleep(application_time)
-            self.actuators['cleaning_pump']['flow_rate'] = 0
-            self.actuators['nozzle_valve']['open'] = False
-            
-            logger.info(f"✅ Applied {volume_ml}ml cleaning solution")
-            
-        except Exception as e:
-            self.actuators['cleaning_pump']['flow_rate'] = 0
-            self.actuators['nozzle_valve']['open'] = False
-            raise
+        logger.info(f"✅ Applied {volume_ml}ml cleaning solution")
     
     async def _apply_sanitizing(self, parameters: Dict[str, Any]):
         """Apply sanitizing solution"""
         logger.info("🦠 Applying sanitizer...")
         
-        # Similar implementation for sanitizer
         volume_ml = parameters.get('volume_ml', 0.5)
         flow_rate = parameters.get('flow_rate_ml_min', 1.0)
-        application_time = (volume_ml / flow_rate) * 60
+        await self._dispense('sanitizer_pump', volume_ml, flow_rate)
         
-        try:
-            self.actuators['nozzle_valve']['open'] = True
-            self.actuators['sanitizer_pump']['flow_rate'] = flow_rate
-            await asyncio.sleep(application_time)
-            self.actuators['sanitizer_pump']['flow_rate'] = 0
-            self.actuators['nozzle_valve']['open'] = False
-            
-            logger.info(f"✅ Applied {volume_ml}ml sanitizer")
-            
-        except Exception as e:
-            self.actuators['sanitizer_pump']['flow_rate'] = 0
-            self.actuators['nozzle_valve']['open'] = False
-            raise
+        logger.info(f"✅ Applied {volume_ml}ml sanitizer")
     
     async def emergency_stop(self):
         """Emergency stop all device operations"""
@@ -295,15 +438,11 @@ class DeviceController:
         
         try:
             # Stop all motors immediately
-            for motor in self.motors.values():
-                motor['enabled'] = False
+            self.backend.stop()
+            self.machine.enable_axes(False)
             
             # Stop all pumps
-            for actuator in self.actuators.values():
-                if 'flow_rate' in actuator:
-                    actuator['flow_rate'] = 0
-                if 'open' in actuator:
-                    actuator['open'] = False
+            self.machine.stop_dispensing()
             
             logger.info("✅ Emergency stop completed")
             
@@ -319,8 +458,7 @@ class DeviceController:
         
         try:
             # Re-enable motors
-            for motor in self.motors.values():
-                motor['enabled'] = True
+            self.machine.enable_axes(True)
             
             # Re-home all axes
             await self._home_all_axes()
@@ -341,8 +479,8 @@ class DeviceController:
             logger.info("🔧 Testing motors...")
             
             # Test each motor
-            for motor_name, motor in self.motors.items():
-                if not motor['enabled']:
+            for motor_name, enabled in zip(AXIS_NAMES, self.machine.axis_enabled):
+                if not enabled:
                     return False
                 
                 # TODO: Implement actual motor test
@@ -355,16 +493,18 @@ class DeviceController:
             logger.error(f"❌ Motor test failed: {e}")
             return False
     
+    def snapshot(self) -> StateSnapshot:
+        """Immutable view of positions, enables and flows, shared until the state next changes"""
+        return self.machine.snapshot()
+    
     async def get_status(self):
         """Get current device status"""
         return {
             'state': self.state.value,
             'emergency_stopped': self.is_emergency_stopped,
-            'current_position': self.positioning['current_position'],
-            'calibrated': self.positioning['calibrated'],
+            'last_move': self.last_move,
             'current_treatment': self.current_treatment,
-            'motors': self.motors,
-            'actuators': self.actuators,
+            **self.machine.snapshot().to_dict(),
         }
     
     async def shutdown(self):
@@ -380,15 +520,12 @@ class DeviceController:
             await self.move_to_position(0, 0, 0)
             
             # Disable all motors
-            for motor in self.motors.values():
-                motor['enabled'] = False
+            self.machine.enable_axes(False)
             
             # Close all valves
-            for actuator in self.actuators.values():
-                if 'flow_rate' in actuator:
-                    actuator['flow_rate'] = 0
-                if 'open' in actuator:
-                    actuator['open'] = False
+            for pump in TREATMENT_PUMPS.values():
+                self._set_flow(pump, 0)
+            self._set_valve(False)
             
             self.state = DeviceState.IDLE
             
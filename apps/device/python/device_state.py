@@ -0,0 +1,147 @@
+"""
+StitchMe Device State
+Axis positions and actuator state held in fixed arrays, updated in place, read through immutable snapshots
+"""
+
+from typing import Any, Dict, NamedTuple, Tuple
+
+import numpy as np
+
+from hardware import PUMPS
+
+AXIS_NAMES = ('x_axis', 'y_axis', 'z_axis', 'nozzle_rotation')
+
+_AXIS_INDEX = {axis: index for index, axis in enumerate(AXIS_NAMES)}
+_PUMP_INDEX = {pump: index for index, pump in enumerate(PUMPS)}
+
+
+class WorkArea(NamedTuple):
+    """Reachable volume (mm) from the homed origin"""
+    x_max: float = 200.0
+    y_max: float = 200.0
+    z_max: float = 50.0
+
+    def contains(self, x: float, y: float, z: float) -> bool:
+        return 0 <= x <= self.x_max and 0 <= y <= self.y_max and 0 <= z <= self.z_max
+
+
+class StateSnapshot(NamedTuple):
+    """The device state at one version; plain tuples, safe to hand to any reader"""
+    version: int
+    axis_positions: Tuple[float, ...]
+    axis_enabled: Tuple[bool, ...]
+    pump_flows: Tuple[float, ...]
+    pump_enabled: Tuple[bool, ...]
+    valve_open: bool
+    valve_enabled: bool
+    calibrated: bool
+
+    @property
+    def position(self) -> Dict[str, float]:
+        x, y, z = self.axis_positions[:3]
+        return {'x': x, 'y': y, 'z': z}
+
+    def to_dict(self) -> Dict[str, Any]:
+        """The status layout get_status has always reported, built fresh for the caller"""
+        actuators = {
+            pump: {'enabled': enabled, 'flow_rate': flow}
+            for pump, flow, enabled in zip(PUMPS, self.pump_flows, self.pump_enabled)
+        }
+        actuators['nozzle_valve'] = {'enabled': self.valve_enabled, 'open': self.valve_open}
+        return {
+            'current_position': self.position,
+            'calibrated': self.calibrated,
+            'motors': {
+                axis: {'position': position, 'enabled': enabled}
+                for axis, position, enabled in zip(AXIS_NAMES, self.axis_positions, self.axis_enabled)
+            },
+            'actuators': actuators,
+        }
+
+
+class MachineState:
+    """
+    Mutable device state for the control path
+
+    Axis positions (x, y, z in mm, then nozzle rotation) and pump flows
+    (ml/min, in hardware.PUMPS order) live in preallocated arrays that the
+    setters write in place. Every setter bumps version; snapshot() builds a
+    StateSnapshot once per version, so readers polling faster than the state
+    changes all share the same one.
+    """
+
+    __slots__ = ('work_area', 'axis_positions', 'axis_enabled', 'pump_flows', 'pump_enabled',
+                 'valve_open', 'valve_enabled', 'calibrated', 'version', '_snapshot')
+
+    def __init__(self, work_area: WorkArea = WorkArea()):
+        self.work_area = work_area
+        self.axis_positions = np.zeros(len(AXIS_NAMES), dtype=np.float64)
+        self.axis_enabled = np.zeros(len(AXIS_NAMES), dtype=bool)
+        self.pump_flows = np.zeros(len(PUMPS), dtype=np.float64)
+        self.pump_enabled = np.zeros(len(PUMPS), dtype=bool)
+        self.valve_open = False
+        self.valve_enabled = False
+        self.calibrated = False
+        self.version = 0
+        self._snapshot = None
+
+    def _changed(self):
+        self.version += 1
+        self._snapshot = None
+
+    @property
+    def position(self) -> Dict[str, float]:
+        """Current x, y, z (mm) as the planners take it; a new dict each call"""
+        x, y, z = self.axis_positions[:3].tolist()
+        return {'x': x, 'y': y, 'z': z}
+
+    def set_position(self, x: float, y: float, z: float):
+        self.axis_positions[0] = x
+        self.axis_positions[1] = y
+        self.axis_positions[2] = z
+        self._changed()
+
+    def set_axis(self, axis: str, position: float):
+        self.axis_positions[_AXIS_INDEX[axis]] = position
+        self._changed()
+
+    def enable_axes(self, enabled: bool):
+        self.axis_enabled[:] = enabled
+        self._changed()
+
+    def enable_actuators(self, enabled: bool):
+        self.pump_enabled[:] = enabled
+        self.valve_enabled = enabled
+        self._changed()
+
+    def set_flow(self, pump: str, flow_ml_min: float):
+        self.pump_flows[_PUMP_INDEX[pump]] = flow_ml_min
+        self._changed()
+
+    def set_valve(self, open: bool):
+        self.valve_open = open
+        self._changed()
+
+    def set_calibrated(self, calibrated: bool):
+        self.calibrated = calibrated
+        self._changed()
+
+    def stop_dispensing(self):
+        """All pumps to zero and the valve closed, as one change"""
+        self.pump_flows[:] = 0.0
+        self.valve_open = False
+        self._changed()
+
+    def snapshot(self) -> StateSnapshot:
+        if self._snapshot is None:
+            self._snapshot = StateSnapshot(
+                version=self.version,
+                axis_positions=tuple(self.axis_positions.tolist()),
+                axis_enabled=tuple(self.axis_enabled.tolist()),
+                pump_flows=tuple(self.pump_flows.tolist()),
+                pump_enabled=tuple(self.pump_enabled.tolist()),
+                valve_open=self.valve_open,
+                valve_enabled=self.valve_enabled,
+                calibrated=self.calibrated,
+            )
+        return self._snapshot
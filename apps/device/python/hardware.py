@@ -0,0 +1,150 @@
+"""
+StitchMe Hardware Abstraction
+The interface DeviceController drives motors, pumps and the nozzle valve through, and a simulated backend
+"""
+
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+from typing import Dict, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+AXES = ('x_axis', 'y_axis', 'z_axis')
+
+PUMPS = ('skin_glue_pump', 'cleaning_pump', 'sanitizer_pump')
+
+
+class MotionStopped(Exception):
+    """Raised by execute_move or dispense when stop() interrupts them"""
+
+
+class HardwareBackend(ABC):
+    """
+    Motors, pumps and valve as DeviceController sees them
+
+    Timing comes from the event loop (asyncio.sleep / loop.time()), so a
+    backend behaves the same under the real loop and the simulator's
+    virtual-time loop.
+    """
+
+    @abstractmethod
+    async def initialize(self):
+        """Bring up the drivers; called once before anything else"""
+
+    @abstractmethod
+    async def home_axis(self, axis: str):
+        """Drive an axis to its limit switch and zero it"""
+
+    @abstractmethod
+    async def execute_move(self, plan):
+        """Run a TrajectoryPlan or PathPlan's step schedules; returns when done, raises MotionStopped if stopped"""
+
+    @abstractmethod
+    async def dispense(self, duration: float):
+        """Hold the current flows with the nozzle in place for duration (s); raises MotionStopped if stopped"""
+
+    @abstractmethod
+    def set_flow(self, pump: str, flow_ml_min: float):
+        """Set a pump's flow rate (ml/min); it dispenses while the valve is open"""
+
+    @abstractmethod
+    def set_valve(self, open: bool):
+        """Open or close the nozzle valve"""
+
+    @abstractmethod
+    def stop(self):
+        """Stop all motion and dispensing immediately"""
+
+
+class SimulatedBackend(HardwareBackend):
+    """
+    Hardware stand-in that takes as long as the real thing and keeps account
+
+    Moves and dispenses last exactly their planned duration, unless stop()
+    cuts them short, and homing a fixed time. Pumped volume is integrated
+    over loop time between flow changes, and steps, moves, dispenses and
+    stops are counted, so runs can be checked against their plans.
+    """
+
+    def __init__(self, homing_time: float = 0.5):
+        self.homing_time = homing_time
+        self.steps: Dict[str, int] = {axis: 0 for axis in AXES}
+        self.flows: Dict[str, float] = {pump: 0.0 for pump in PUMPS}
+        self.dispensed_ml: Dict[str, float] = {pump: 0.0 for pump in PUMPS}
+        self.valve_open = False
+        self.moves = 0
+        self.move_time = 0.0
+        self.stops = 0
+        self._flow_since = 0.0
+        self.dispenses = 0
+        self.dispense_time = 0.0
+        # One event per move or dispense in progress, set by stop()
+        self._moving: set = set()
+
+    def _now(self) -> float:
+        return asyncio.get_event_loop().time()
+
+    def _settle_flows(self):
+        """Add what the pumps delivered since the last flow change"""
+        now = self._now()
+        if self.valve_open:
+            for pump, flow in self.flows.items():
+                self.dispensed_ml[pump] += flow / 60.0 * (now - self._flow_since)
+        self._flow_since = now
+
+    async def initialize(self):
+        self._flow_since = self._now()
+
+    async def home_axis(self, axis: str):
+        await asyncio.sleep(self.homing_time)
+
+    async def _run_for(self, duration: float) -> Optional[float]:
+        """Wait out duration (s); None if it ran to the end, else how long it ran before stop()"""
+        stopped = asyncio.Event()
+        self._moving.add(stopped)
+        started = self._now()
+        try:
+            await asyncio.wait_for(stopped.wait(), duration)
+        except asyncio.TimeoutError:
+            return None
+        finally:
+            self._moving.discard(stopped)
+        return self._now() - started
+
+    async def execute_move(self, plan):
+        elapsed = await self._run_for(plan.duration)
+
+        for axis, times in zip(AXES, plan.step_times.values()):
+            # Only the steps due before a stop were taken
+            self.steps[axis] += len(times) if elapsed is None else int(np.searchsorted(times, elapsed, side='right'))
+        self.moves += 1
+        self.move_time += plan.duration if elapsed is None else elapsed
+        if elapsed is not None:
+            raise MotionStopped(f"Move stopped after {elapsed:.3f}s of {plan.duration:.3f}s")
+
+    async def dispense(self, duration: float):
+        elapsed = await self._run_for(duration)
+        self.dispenses += 1
+        self.dispense_time += duration if elapsed is None else elapsed
+        if elapsed is not None:
+            raise MotionStopped(f"Dispense stopped after {elapsed:.3f}s of {duration:.3f}s")
+
+    def set_flow(self, pump: str, flow_ml_min: float):
+        self._settle_flows()
+        self.flows[pump] = flow_ml_min
+
+    def set_valve(self, open: bool):
+        self._settle_flows()
+        self.valve_open = open
+
+    def stop(self):
+        self._settle_flows()
+        for pump in self.flows:
+            self.flows[pump] = 0.0
+        self.valve_open = False
+        for stopped in self._moving:
+            stopped.set()
+        self.stops += 1
@@ -0,0 +1,106 @@
+"""
+StitchMe Health Monitor
+System health sampled on its own cadence into a ring buffer, read from cache by the status path
+"""
+
+import logging
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+logger = logging.getLogger(__name__)
+
+CPU_TEMPERATURE_PATH = '/sys/class/thermal/thermal_zone0/temp'
+
+# One hour of history at the default 1 Hz
+HEALTH_HISTORY = 3600
+
+HEALTH_DTYPE = np.dtype([
+    ('time', np.float64),  # Unix time
+    ('cpu_percent', np.float32),
+    ('memory_percent', np.float32),
+    ('temperature', np.float32),  # NaN when unavailable
+])
+
+
+class HealthMonitor:
+    """
+    Samples CPU, memory and temperature when sample() is called (from a slow periodic task)
+
+    Samples go into a fixed-size structured array used as a ring buffer;
+    latest() returns the dict built at the last sample, so status updates
+    never touch psutil or sysfs themselves.
+    """
+
+    def __init__(self, capacity: int = HEALTH_HISTORY):
+        self.samples = np.zeros(capacity, dtype=HEALTH_DTYPE)
+        self.count = 0
+        self.boot_time = psutil.boot_time() if psutil else None
+        self._latest: Dict[str, Any] = {'status': 'unknown'}
+        self._temperature_file = None
+
+        if psutil:
+            # The first cpu_percent() call only starts the measurement window
+            psutil.cpu_percent()
+
+    def _read_temperature(self) -> Optional[float]:
+        """CPU temperature (Raspberry Pi specific); the sysfs file is kept open and re-read"""
+        try:
+            if self._temperature_file is None:
+                self._temperature_file = open(CPU_TEMPERATURE_PATH, 'rb', buffering=0)
+            self._temperature_file.seek(0)
+            return int(self._temperature_file.read().strip()) / 1000.0
+        except (OSError, ValueError):
+            return None
+
+    async def sample(self):
+        """Take one sample; registered as a low-rate scheduler task"""
+        if psutil is None:
+            return
+
+        now = time.time()
+        cpu_percent = psutil.cpu_percent()
+        memory_percent = psutil.virtual_memory().percent
+        temperature = self._read_temperature()
+
+        record = self.samples[self.count % len(self.samples)]
+        record['time'] = now
+        record['cpu_percent'] = cpu_percent
+        record['memory_percent'] = memory_percent
+        record['temperature'] = np.nan if temperature is None else temperature
+        self.count += 1
+
+        self._latest = {
+            'cpu_percent': cpu_percent,
+            'memory_percent': memory_percent,
+            'temperature': temperature,
+            'uptime': now - self.boot_time,
+            'sampled_at': datetime.fromtimestamp(now).isoformat(),
+        }
+
+    def latest(self) -> Dict[str, Any]:
+        return self._latest
+
+    def history(self, seconds: Optional[float] = None) -> np.ndarray:
+        """Samples in time order, optionally only the last seconds' worth (a copy when the ring has wrapped)"""
+        capacity = len(self.samples)
+        if self.count <= capacity:
+            samples = self.samples[:self.count]
+        else:
+            start = self.count % capacity
+            samples = np.concatenate([self.samples[start:], self.samples[:start]])
+        if seconds is not None and len(samples):
+            samples = samples[samples['time'] >= samples['time'][-1] - seconds]
+        return samples
+
+    def close(self):
+        if self._temperature_file is not None:
+            self._temperature_file.close()
+            self._temperature_file = None
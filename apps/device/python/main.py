@@ -13,17 +13,24 @@ This is the native app that controls the physical device:
 
 import asyncio
 import logging
+import os
 import signal
 import sys
 from datetime import datetime
 from pathlib import Path
 
 # Device modules
+from camera_capture import CameraCapture, open_camera
 from device_controller import DeviceController
+from health_monitor import HealthMonitor
 from sensor_manager import SensorManager
 from communication_manager import CommunicationManager
 from ui_manager import UIManager
 from safety_manager import SafetyManager
+from scheduler import Scheduler
+from sensor_acquisition import SensorAcquisition
+from startup import run_steps
+from status_publisher import StatusPublisher
 
 # Configure logging
 logging.basicConfig(
@@ -37,6 +44,26 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
+# Main loop tasks: (rate Hz, priority); lower priority values run first when due together.
+# Sensors aren't among them: SensorAcquisition samples each at its own rate on its own thread
+LOOP_TASKS = {
+    'safety': (50, 0),
+    'commands': (20, 1),
+    'status': (10, 3),
+    'ui': (5, 4),
+    'health': (1, 5),
+}
+
+# Set to 1 to let the device start without image capture when the camera fails its check,
+# instead of treating it as a critical failure (safe mode). Off unless explicitly enabled
+ALLOW_START_WITHOUT_CAMERA = os.getenv("STITCHME_ALLOW_START_WITHOUT_CAMERA", "0") == "1"
+
+# Status update limits per link: (messages/s, bytes/s); None is unlimited
+STATUS_LIMITS = {
+    'bluetooth': (2, 2000),
+    'wifi': (10, None),
+}
+
 class StitchMeDevice:
     """Main device application controller"""
     
@@ -47,36 +74,30 @@ class StitchMeDevice:
         self.communication_manager = None
         self.ui_manager = None
         self.safety_manager = None
+        self.scheduler = None
+        self.status_publisher = None
+        self.health_monitor = HealthMonitor()
+        self.sensor_acquisition = SensorAcquisition()
+        self.camera_capture = None
+        self.device_id = None
         
     async def initialize(self):
         """Initialize all device subsystems"""
         try:
             logger.info("🏥 Starting StitchMe Device Controller...")
             
-            # Initialize safety systems first
-            self.safety_manager = SafetyManager()
-            await self.safety_manager.initialize()
-            logger.info("✅ Safety systems initialized")
-            
-            # Initialize hardware controllers
-            self.device_controller = DeviceController()
-            await self.device_controller.initialize()
-            logger.info("✅ Device controller initialized")
-            
-            # Initialize sensors (cameras, vitals, etc.)
-            self.sensor_manager = SensorManager()
-            await self.sensor_manager.initialize()
-            logger.info("✅ Sensor systems initialized")
+            # Safety first; then hardware, sensors (cameras, vitals, etc.), communication
+            # (Bluetooth, WiFi) and the touchscreen UI come up concurrently
+            await run_steps({
+                'safety': (self.initialize_safety, ()),
+                'device_controller': (self.initialize_device_controller, ('safety',)),
+                'sensors': (self.initialize_sensors, ('safety',)),
+                'communication': (self.initialize_communication, ('safety',)),
+                'ui': (self.initialize_ui, ('safety',)),
+            })
             
-            # Initialize communication (Bluetooth, WiFi)
-            self.communication_manager = CommunicationManager()
-            await self.communication_manager.initialize()
-            logger.info("✅ Communication systems initialized")
-            
-            # Initialize device UI (touchscreen display)
-            self.ui_manager = UIManager()
-            await self.ui_manager.initialize()
-            logger.info("✅ Device UI initialized")
+            # First health sample, so status has one before the sampler task starts
+            await self.health_monitor.sample()
             
             # Run system diagnostics
             await self.run_diagnostics()
@@ -89,19 +110,82 @@ class StitchMeDevice:
             await self.emergency_shutdown()
             return False
     
+    async def initialize_safety(self):
+        """Bring up safety monitoring (everything else waits for it)"""
+        self.safety_manager = SafetyManager()
+        await self.safety_manager.initialize()
+        logger.info("✅ Safety systems initialized")
+    
+    async def initialize_device_controller(self):
+        """Bring up motors, actuators and positioning, and home the axes"""
+        self.device_controller = DeviceController()
+        await self.device_controller.initialize()
+        logger.info("✅ Device controller initialized")
+    
+    async def initialize_sensors(self):
+        """Bring up cameras and vitals sensors"""
+        self.sensor_manager = SensorManager()
+        await self.sensor_manager.initialize()
+        if not callable(getattr(self.sensor_manager, 'acquisition_channels', None)):
+            raise RuntimeError("SensorManager has no acquisition_channels(); it must return "
+                               "{name: (read, rate_hz, fields)} for the sensors to be sampled")
+        
+        # From here on every sensor is sampled at its native rate, whatever the main loop is doing
+        for name, (read, rate_hz, fields) in self.sensor_manager.acquisition_channels().items():
+            self.sensor_acquisition.add(name, read, rate_hz, fields)
+        self.sensor_acquisition.start()
+        
+        # Wound images are grabbed, picked and JPEG-encoded on their own threads; opening the camera can block.
+        # CameraCapture is the camera's only owner: nothing else opens it, diagnostics included
+        try:
+            grab, resolution = await asyncio.to_thread(open_camera)
+        except RuntimeError as e:
+            logger.error(f"❌ {e}; image capture unavailable")
+        else:
+            self.camera_capture = CameraCapture(grab, resolution)
+            self.camera_capture.start()
+        logger.info("✅ Sensor systems initialized")
+    
+    async def initialize_communication(self):
+        """Bring up Bluetooth and WiFi links"""
+        self.communication_manager = CommunicationManager()
+        await self.communication_manager.initialize()
+        # Checked here rather than on the first status tick, which would fail on every tick after it
+        if not callable(getattr(self.communication_manager, 'send_status', None)):
+            raise RuntimeError("CommunicationManager has no send_status(app_id, payload); "
+                               "status updates cannot be delivered")
+        logger.info("✅ Communication systems initialized")
+    
+    async def initialize_ui(self):
+        """Bring up the touchscreen display"""
+        self.ui_manager = UIManager()
+        await self.ui_manager.initialize()
+        logger.info("✅ Device UI initialized")
+    
     async def run_diagnostics(self):
         """Run comprehensive system diagnostics"""
         logger.info("🔍 Running system diagnostics...")
         
-        # Check all critical systems
-        diagnostics = {
-            'motors': await self.device_controller.test_motors(),
-            'cameras': await self.sensor_manager.test_cameras(),
-            'sensors': await self.sensor_manager.test_sensors(),
-            'communication': await self.communication_manager.test_connectivity(),
-            'safety': await self.safety_manager.test_safety_systems(),
-            'storage': await self.check_storage_space(),
+        # Check all critical systems concurrently
+        checks = {
+            'motors': self.device_controller.test_motors(),
+            'cameras': self.check_cameras(),
+            'sensors': self.sensor_manager.test_sensors(),
+            'communication': self.communication_manager.test_connectivity(),
+            'safety': self.safety_manager.test_safety_systems(),
+            'storage': self.check_storage_space(),
         }
+        started = asyncio.get_running_loop().time()
+        results = await asyncio.gather(*checks.values(), return_exceptions=True)
+        logger.info(f"⏱️ Diagnostics took {asyncio.get_running_loop().time() - started:.2f}s")
+        
+        # A check that raised counts as failed
+        diagnostics = {}
+        for system, result in zip(checks, results):
+            if isinstance(result, Exception):
+                logger.error(f"❌ {system.capitalize()} check raised: {result}")
+                result = False
+            diagnostics[system] = result
         
         # Log results
         for system, status in diagnostics.items():
@@ -110,6 +194,9 @@ class StitchMeDevice:
         
         # Check if any critical systems failed
         critical_systems = ['motors', 'safety', 'cameras']
+        if ALLOW_START_WITHOUT_CAMERA and not diagnostics['cameras']:
+            logger.warning("⚠️ Starting without image capture: STITCHME_ALLOW_START_WITHOUT_CAMERA is set")
+            critical_systems.remove('cameras')
         failed_critical = [sys for sys in critical_systems if not diagnostics[sys]]
         
         if failed_critical:
@@ -117,6 +204,20 @@ class StitchMeDevice:
             await self.safety_manager.enter_safe_mode()
             raise Exception(f"Critical system failure: {failed_critical}")
     
+    async def check_cameras(self, timeout: float = 2.0):
+        """Check the capture threads are getting frames from the camera they own"""
+        if self.camera_capture is None:
+            return False
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while self.camera_capture.frames_captured == 0:
+            if loop.time() >= deadline:
+                logger.warning(f"⚠️ Camera delivered no frames in {timeout}s "
+                               f"({self.camera_capture.grab_failures} failed grabs)")
+                return False
+            await asyncio.sleep(0.05)
+        return True
+    
     async def check_storage_space(self):
         """Check available storage space"""
         try:
@@ -139,29 +240,39 @@ class StitchMeDevice:
         """Main device operation loop"""
         self.running = True
         
-        while self.running:
-            try:
-                # Update device status
-                await self.update_device_status()
-                
-                # Process incoming commands from mobile/desktop apps
-                await self.communication_manager.process_commands()
-                
-                # Update sensor readings
-                await self.sensor_manager.update_readings()
-                
-                # Update device UI
-                await self.ui_manager.update_display()
-                
-                # Check safety systems
-                await self.safety_manager.monitor_safety()
-                
-                # Small delay to prevent CPU overload
-                await asyncio.sleep(0.1)
-                
-            except Exception as e:
-                logger.error(f"❌ Error in main loop: {e}")
-                await self.safety_manager.handle_error(e)
+        # Each subsystem runs at its own fixed rate; safety runs first and never waits behind the others
+        self.scheduler = Scheduler(on_error=self.safety_manager.handle_error)
+        callbacks = {
+            'safety': self.safety_manager.monitor_safety,
+            'commands': self.communication_manager.process_commands,
+            'status': self.update_device_status,
+            'ui': self.ui_manager.update_display,
+            'health': self.health_monitor.sample,
+        }
+        for name, (rate_hz, priority) in LOOP_TASKS.items():
+            self.scheduler.add(name, callbacks[name], rate_hz, priority, critical=(name == 'safety'))
+        
+        try:
+            await self.scheduler.run()
+        finally:
+            for name, stats in self.scheduler.stats().items():
+                logger.info(f"⏱️ {name}: {stats['runs']} runs at {stats['rate_hz']}Hz, "
+                            f"jitter p99 {stats['jitter_ms']['p99']}ms, "
+                            f"{stats['overruns']} overruns, {stats['skipped']} skipped")
+            for name, stats in self.sensor_acquisition.stats().items():
+                logger.info(f"📈 {name}: {stats['samples']} samples at {stats['achieved_hz']}Hz "
+                            f"(target {stats['rate_hz']}Hz), {stats['missed']} missed, {stats['errors']} errors")
+            if self.status_publisher:
+                stats = self.status_publisher.stats()
+                logger.info(f"📡 Status: {stats['bytes_sent']} bytes sent vs {stats['json_broadcast_bytes']} "
+                            f"as full JSON ({stats['bandwidth_saved_percent']}% saved), "
+                            f"{stats['publish_ms']}ms per update vs {stats['json_encode_ms']}ms JSON encode")
+    
+    def stop_main_loop(self):
+        """Stop the main loop after the current dispatch"""
+        self.running = False
+        if self.scheduler:
+            self.scheduler.stop()
     
     async def update_device_status(self):
         """Update overall device status"""
@@ -170,44 +281,48 @@ class StitchMeDevice:
             'device_id': await self.get_device_id(),
             'status': 'operational',
             'connected_apps': await self.communication_manager.get_connected_devices(),
-            'sensor_readings': await self.sensor_manager.get_current_readings(),
+            'sensor_readings': self.sensor_acquisition.readings(),
             'system_health': await self.get_system_health(),
         }
         
-        # Broadcast status to connected apps
-        await self.communication_manager.broadcast_status(status)
+        if self.status_publisher is None:
+            self.status_publisher = StatusPublisher(send=self.communication_manager.send_status)
+        self.sync_status_subscribers(status['connected_apps'])
+        
+        # Send connected apps only what changed, within each link's limits
+        await self.status_publisher.publish(status)
+    
+    def sync_status_subscribers(self, connected_apps):
+        """Subscribe newly connected apps to status updates and drop disconnected ones"""
+        connected = {}
+        for app in connected_apps or []:
+            if isinstance(app, dict):
+                connected[str(app.get('id'))] = app.get('transport')
+            else:
+                connected[str(app)] = None
+        
+        for app_id in list(self.status_publisher.subscribers):
+            if app_id not in connected:
+                self.status_publisher.unsubscribe(app_id)
+        for app_id, transport in connected.items():
+            if app_id not in self.status_publisher.subscribers:
+                max_rate_hz, max_bytes_per_s = STATUS_LIMITS.get(transport, (None, None))
+                self.status_publisher.subscribe(app_id, max_rate_hz, max_bytes_per_s)
     
     async def get_device_id(self):
         """Get unique device identifier"""
-        try:
-            # Use MAC address or serial number
-            import uuid
-            return str(uuid.getnode())
-        except:
-            return "unknown-device"
+        if self.device_id is None:
+            try:
+                # Use MAC address or serial number
+                import uuid
+                self.device_id = str(uuid.getnode())
+            except:
+                self.device_id = "unknown-device"
+        return self.device_id
     
     async def get_system_health(self):
-        """Get overall system health metrics"""
-        try:
-            import psutil
-            
-            return {
-                'cpu_percent': psutil.cpu_percent(),
-                'memory_percent': psutil.virtual_memory().percent,
-                'temperature': await self.get_cpu_temperature(),
-                'uptime': datetime.now().timestamp() - psutil.boot_time(),
-            }
-        except:
-            return {'status': 'unknown'}
-    
-    async def get_cpu_temperature(self):
-        """Get CPU temperature (Raspberry Pi specific)"""
-        try:
-            with open('/sys/class/thermal/thermal_zone0/temp', 'r') as f:
-                temp = int(f.read().strip()) / 1000.0
-                return temp
-        except:
-            return None
+        """Get overall system health metrics (latest background sample)"""
+        return self.health_monitor.latest()
     
     async def emergency_shutdown(self):
         """Emergency shutdown procedure"""
@@ -234,7 +349,7 @@ class StitchMeDevice:
             logger.error(f"❌ Error during emergency shutdown: {e}")
         
         finally:
-            self.running = False
+            self.stop_main_loop()
     
     async def graceful_shutdown(self):
         """Graceful shutdown procedure"""
@@ -242,12 +357,18 @@ class StitchMeDevice:
         
         try:
             # Stop main loop
-            self.running = False
+            self.stop_main_loop()
             
             # Safely stop all systems
             if self.device_controller:
                 await self.device_controller.shutdown()
             
+            self.sensor_acquisition.stop()
+            if self.camera_capture:
+                stats = self.camera_capture.stats()
+                logger.info(f"📷 Camera: {stats['frames_encoded']} frames uploaded as {stats['encoded_bytes']} bytes "
+                            f"({stats['compression']}x smaller than raw), {stats['encode_ms']}ms to encode")
+                self.camera_capture.stop()
             if self.sensor_manager:
                 await self.sensor_manager.shutdown()
             
@@ -260,6 +381,8 @@ class StitchMeDevice:
             if self.safety_manager:
                 await self.safety_manager.shutdown()
             
+            self.health_monitor.close()
+            
             logger.info("✅ StitchMe Device shutdown complete")
             
         except Exception as e:
@@ -300,7 +423,6 @@ async def main():
 
 if __name__ == "__main__":
     # Ensure we're running as root for hardware access
-    import os
     if os.geteuid() != 0:
         logger.error("❌ This application must be run as root for hardware access")
         sys.exit(1)
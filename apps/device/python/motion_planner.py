@@ -0,0 +1,544 @@
+"""
+StitchMe Motion Planner
+Jerk-limited (S-curve) and trapezoidal point-to-point trajectories, blended multi-waypoint paths
+and per-axis step schedules
+"""
+
+import math
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+AXES = ('x', 'y', 'z')
+
+PROFILES = ('scurve', 'trapezoid')
+
+
+@dataclass(frozen=True)
+class AxisLimits:
+    """Mechanical limits of one axis (mm, mm/s, mm/s^2, mm/s^3)"""
+    max_velocity: float
+    max_acceleration: float
+    max_jerk: float
+    steps_per_mm: float
+
+
+# Nominal limits of the reference gantry, used unless a device is configured with its own
+# (DeviceController(axis_limits=...)). steps_per_mm follows from the drive train: 1.8° steppers
+# at 1/16 microstepping (3200 steps/rev) on GT2 belts with 20-tooth pulleys for X/Y (40 mm/rev)
+# and an 8 mm-lead screw for Z. Speed, acceleration and jerk are conservative starting values,
+# not measurements; devices with a different build or measured limits should pass their own.
+DEFAULT_AXIS_LIMITS = {
+    'x': AxisLimits(max_velocity=150.0, max_acceleration=1500.0, max_jerk=30000.0, steps_per_mm=80.0),
+    'y': AxisLimits(max_velocity=150.0, max_acceleration=1500.0, max_jerk=30000.0, steps_per_mm=80.0),
+    'z': AxisLimits(max_velocity=25.0, max_acceleration=250.0, max_jerk=5000.0, steps_per_mm=400.0),
+}
+
+# Speed cap (mm/s) for dry moves to and between treatment positions
+DEFAULT_TRAVEL_SPEED = 100.0
+
+# Step times are found on a grid this fine, then refined with Newton steps
+STEP_GRID_S = 1e-4
+MAX_STEP_GRID_POINTS = 100_000
+
+# Largest distance (mm) the nozzle may cut inside a corner; bounds the speed it is taken at
+DEFAULT_JUNCTION_DEVIATION = 0.05
+
+# Chord length (mm) smoothed paths are sampled at
+SPLINE_RESOLUTION = 0.5
+
+
+@dataclass
+class PathProfile:
+    """
+    Piecewise constant-jerk motion along a path coordinate s (mm)
+
+    Segment k starts at t[k] with position s[k], velocity v[k] and
+    acceleration a[k] and runs at jerk j[k] until t[k + 1]; t, s and v also
+    hold the end of the move.
+    """
+    t: np.ndarray
+    s: np.ndarray
+    v: np.ndarray
+    a: np.ndarray
+    j: np.ndarray
+
+    @property
+    def duration(self) -> float:
+        return float(self.t[-1])
+
+    @property
+    def length(self) -> float:
+        return float(self.s[-1])
+
+    @property
+    def peak_velocity(self) -> float:
+        return float(self.v.max())
+
+    def sample(self, times) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Position, velocity and acceleration at each time (clamped to the move)"""
+        times = np.clip(np.asarray(times, dtype=np.float64), 0.0, self.duration)
+        k = np.clip(np.searchsorted(self.t, times, side='right') - 1, 0, len(self.j) - 1)
+        tau = times - self.t[k]
+        a0, v0, s0, j = self.a[k], self.v[k], self.s[k], self.j[k]
+        acceleration = a0 + j * tau
+        velocity = v0 + tau * (a0 + tau * j / 2.0)
+        position = s0 + tau * (v0 + tau * (a0 / 2.0 + tau * j / 6.0))
+        return position, velocity, acceleration
+
+
+def _accel_phase(velocity: float, acceleration: float, jerk: float) -> Tuple[float, float]:
+    """(total time, jerk time) to go from rest to velocity under the acceleration and jerk limits"""
+    if math.isinf(jerk):
+        return velocity / acceleration, 0.0
+    if velocity * jerk >= acceleration ** 2:
+        jerk_time = acceleration / jerk
+        return jerk_time + velocity / acceleration, jerk_time
+    # Acceleration limit never reached: a triangular acceleration pulse
+    jerk_time = math.sqrt(velocity / jerk)
+    return 2.0 * jerk_time, jerk_time
+
+
+def _peak_velocity(distance: float, velocity: float, acceleration: float, jerk: float) -> float:
+    """Highest velocity reachable on a rest-to-rest move of this distance"""
+    accel_time, _ = _accel_phase(velocity, acceleration, jerk)
+    # Accelerating to v and back takes v * accel_time(v) of distance
+    if distance >= velocity * accel_time:
+        return velocity
+
+    if math.isinf(jerk):
+        return math.sqrt(acceleration * distance)
+
+    # Acceleration limit reached: v^2 / A + v A / J = D
+    ratio = acceleration ** 2 / jerk
+    peak = (-ratio + math.sqrt(ratio ** 2 + 4.0 * acceleration * distance)) / 2.0
+    if peak >= ratio:
+        return peak
+    # Otherwise a triangular pulse: 2 v sqrt(v / J) = D
+    return (distance * math.sqrt(jerk) / 2.0) ** (2.0 / 3.0)
+
+
+def plan_profile(distance: float,
+                 max_velocity: float,
+                 max_acceleration: float,
+                 max_jerk: float = math.inf) -> PathProfile:
+    """
+    Minimum-time rest-to-rest profile over distance (mm)
+
+    With finite max_jerk this is the 7-segment S-curve (jerk, constant
+    acceleration, jerk, cruise and the mirror image); with infinite jerk it
+    degenerates to a trapezoid. Segments the limits make unnecessary have
+    zero length.
+    """
+    if distance <= 0.0:
+        return PathProfile(t=np.zeros(2), s=np.zeros(2), v=np.zeros(2), a=np.zeros(1), j=np.zeros(1))
+
+    peak = _peak_velocity(distance, max_velocity, max_acceleration, max_jerk)
+    accel_time, jerk_time = _accel_phase(peak, max_acceleration, max_jerk)
+    cruise_time = (distance - peak * accel_time) / peak
+    peak_accel = peak / (accel_time - jerk_time)
+    jerk = peak_accel / jerk_time if jerk_time > 0 else 0.0
+
+    # (duration, acceleration at start, jerk) for each segment
+    segments = [
+        (jerk_time, 0.0, jerk),
+        (accel_time - 2.0 * jerk_time, peak_accel, 0.0),
+        (jerk_time, peak_accel, -jerk),
+        (max(cruise_time, 0.0), 0.0, 0.0),
+        (jerk_time, 0.0, -jerk),
+        (accel_time - 2.0 * jerk_time, -peak_accel, 0.0),
+        (jerk_time, -peak_accel, jerk),
+    ]
+    # Unneeded phases (all the jerk phases, for a trapezoid) drop out
+    segments = [segment for segment in segments if segment[0] > 1e-12]
+
+    t, s, v, a, j = [0.0], [0.0], [0.0], [], []
+    for duration, a0, segment_jerk in segments:
+        a.append(a0)
+        j.append(segment_jerk)
+        s.append(s[-1] + duration * (v[-1] + duration * (a0 / 2.0 + duration * segment_jerk / 6.0)))
+        v.append(v[-1] + duration * (a0 + duration * segment_jerk / 2.0))
+        t.append(t[-1] + duration)
+
+    # Integration leaves the end within float rounding of the target; pin it exactly
+    s[-1] = distance
+    v[-1] = 0.0
+    return PathProfile(t=np.array(t), s=np.array(s), v=np.array(v), a=np.array(a), j=np.array(j))
+
+
+@dataclass
+class TrajectoryPlan:
+    """A straight-line move with its path profile and per-axis step schedules"""
+    start: np.ndarray
+    end: np.ndarray
+    direction: np.ndarray
+    profile: PathProfile
+    # Seconds from the start of the move at which each axis steps, and which way
+    step_times: Dict[str, np.ndarray] = field(default_factory=dict)
+    step_directions: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def duration(self) -> float:
+        return self.profile.duration
+
+    @property
+    def distance(self) -> float:
+        return self.profile.length
+
+    def position_at(self, times) -> np.ndarray:
+        """(N, 3) axis positions at each time"""
+        path, _, _ = self.profile.sample(np.atleast_1d(times))
+        return self.start + path[:, None] * self.direction
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            'distance_mm': round(self.distance, 3),
+            'duration_s': round(self.duration, 4),
+            'peak_velocity_mm_s': round(self.profile.peak_velocity, 2),
+            'steps': {axis: int(len(times)) for axis, times in self.step_times.items()},
+        }
+
+
+def _path_limits(direction: np.ndarray,
+                 limits: Dict[str, AxisLimits],
+                 speed: Optional[float]) -> Tuple[float, float, float]:
+    """Tightest path velocity, acceleration and jerk that keep every axis within its limits"""
+    velocity = speed if speed else math.inf
+    acceleration = jerk = math.inf
+    for axis, component in zip(AXES, np.abs(direction)):
+        if component < 1e-12:
+            continue
+        axis_limits = limits[axis]
+        velocity = min(velocity, axis_limits.max_velocity / component)
+        acceleration = min(acceleration, axis_limits.max_acceleration / component)
+        jerk = min(jerk, axis_limits.max_jerk / component)
+    return velocity, acceleration, jerk
+
+
+def _step_times(profile: PathProfile, step_positions: np.ndarray) -> np.ndarray:
+    """Times at which the path reaches each position, by grid inversion plus Newton refinement"""
+    if step_positions.size == 0:
+        return np.empty(0)
+
+    points = int(min(max(profile.duration / STEP_GRID_S, 64), MAX_STEP_GRID_POINTS))
+    grid = np.linspace(0.0, profile.duration, points)
+    path, _, _ = profile.sample(grid)
+    # Position is non-decreasing, so interpolating the inverse is valid
+    times = np.interp(step_positions, path, grid)
+
+    for _ in range(2):
+        position, velocity, _ = profile.sample(times)
+        moving = velocity > 1e-9
+        times[moving] -= (position[moving] - step_positions[moving]) / velocity[moving]
+        np.clip(times, 0.0, profile.duration, out=times)
+    return times
+
+
+def plan_move(start: Dict[str, float],
+              end: Dict[str, float],
+              limits: Dict[str, AxisLimits] = DEFAULT_AXIS_LIMITS,
+              speed: Optional[float] = None,
+              profile: str = 'scurve') -> TrajectoryPlan:
+    """
+    Plan a minimum-time straight-line move between two positions (mm)
+
+    The move is planned once along the path and projected onto the axes, so
+    x, y and z start, accelerate and arrive together and the nozzle follows
+    a straight line. The path limits are the tightest any axis allows for the
+    move's direction; speed optionally caps the path velocity. Step schedules
+    hold the time of every motor step as float64 seconds.
+    """
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown motion profile: {profile}")
+
+    start_vec = np.array([float(start[axis]) for axis in AXES])
+    end_vec = np.array([float(end[axis]) for axis in AXES])
+    delta = end_vec - start_vec
+    distance = float(np.linalg.norm(delta))
+    direction = delta / distance if distance > 0 else np.zeros(3)
+
+    velocity, acceleration, jerk = _path_limits(direction, limits, speed)
+    if profile == 'trapezoid':
+        jerk = math.inf
+    path_profile = plan_profile(distance, velocity, acceleration, jerk)
+
+    plan = TrajectoryPlan(start=start_vec, end=end_vec, direction=direction, profile=path_profile)
+    for axis, component, axis_delta in zip(AXES, np.abs(direction), delta):
+        steps_per_mm = limits[axis].steps_per_mm
+        step_count = int(round(abs(axis_delta) * steps_per_mm))
+        # Path position at which the axis has travelled k steps
+        step_positions = np.arange(1, step_count + 1) / (steps_per_mm * component) if step_count else np.empty(0)
+        np.minimum(step_positions, distance, out=step_positions)
+        plan.step_times[axis] = _step_times(path_profile, step_positions)
+        plan.step_directions[axis] = 1 if axis_delta >= 0 else -1
+
+    return plan
+
+
+@dataclass
+class PathPlan:
+    """
+    A blended move through a sequence of waypoints with its flow and step schedules
+
+    points[k] to points[k + 1] is segment k, starting offsets[k] mm along the
+    path. The profile runs over the whole path, slowing at corners rather than
+    stopping, and deposition[k] is the volume (ml) laid per mm of segment k.
+    """
+    points: np.ndarray
+    directions: np.ndarray
+    offsets: np.ndarray
+    deposition: np.ndarray
+    profile: PathProfile
+    corner_velocities: np.ndarray
+    # The same waypoints as separate rest-to-rest moves, for comparison
+    stop_and_go_duration: float
+    # Seconds from the start of the path at which each axis steps, and which way (+1/-1) per step
+    step_times: Dict[str, np.ndarray] = field(default_factory=dict)
+    step_directions: Dict[str, np.ndarray] = field(default_factory=dict)
+
+    @property
+    def duration(self) -> float:
+        return self.profile.duration
+
+    @property
+    def distance(self) -> float:
+        return self.profile.length
+
+    @property
+    def volume_ml(self) -> float:
+        return float(np.dot(np.diff(self.offsets), self.deposition))
+
+    def _segments(self, path: np.ndarray) -> np.ndarray:
+        return np.clip(np.searchsorted(self.offsets, path, side='right') - 1, 0, len(self.directions) - 1)
+
+    def position_at(self, times) -> np.ndarray:
+        """(N, 3) axis positions at each time"""
+        path, _, _ = self.profile.sample(np.atleast_1d(times))
+        k = self._segments(path)
+        return self.points[k] + (path - self.offsets[k])[:, None] * self.directions[k]
+
+    def flow_at(self, times) -> np.ndarray:
+        """Pump flow (ml/min) at each time, proportional to nozzle speed for uniform deposition"""
+        path, velocity, _ = self.profile.sample(np.atleast_1d(times))
+        return self.deposition[self._segments(path)] * velocity * 60.0
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            'waypoints': int(len(self.points)),
+            'distance_mm': round(self.distance, 3),
+            'duration_s': round(self.duration, 4),
+            'stop_and_go_duration_s': round(self.stop_and_go_duration, 4),
+            'peak_velocity_mm_s': round(self.profile.peak_velocity, 2),
+            'min_corner_velocity_mm_s': round(float(self.corner_velocities[1:-1].min()), 2)
+            if len(self.corner_velocities) > 2 else None,
+            'volume_ml': round(self.volume_ml, 4),
+            'steps': {axis: int(len(times)) for axis, times in self.step_times.items()},
+        }
+
+
+def smooth_path(points: np.ndarray, resolution: float = SPLINE_RESOLUTION) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Centripetal Catmull-Rom spline through the waypoints, sampled as a polyline
+
+    Returns the dense (N, 3) points and, for each dense segment, the index of
+    the waypoint segment it came from. The centripetal parameterization never
+    overshoots into loops or cusps on unevenly spaced points, so the seam
+    stays between its waypoints.
+    """
+    # Reflect the ends so the curve starts and finishes heading along the first and last segments
+    padded = np.vstack([2.0 * points[0] - points[1], points, 2.0 * points[-1] - points[-2]])
+    knots = np.concatenate([[0.0], np.cumsum(np.linalg.norm(np.diff(padded, axis=0), axis=1) ** 0.5)])
+
+    dense, source = [points[:1]], []
+    for k in range(len(points) - 1):
+        p0, p1, p2, p3 = padded[k:k + 4]
+        t0, t1, t2, t3 = knots[k:k + 4]
+        samples = max(int(math.ceil(np.linalg.norm(p2 - p1) / resolution)), 1)
+        t = np.linspace(t1, t2, samples + 1)[1:, None]
+        # Barry-Goldman pyramid
+        a1 = ((t1 - t) * p0 + (t - t0) * p1) / (t1 - t0)
+        a2 = ((t2 - t) * p1 + (t - t1) * p2) / (t2 - t1)
+        a3 = ((t3 - t) * p2 + (t - t2) * p3) / (t3 - t2)
+        b1 = ((t2 - t) * a1 + (t - t0) * a2) / (t2 - t0)
+        b2 = ((t3 - t) * a2 + (t - t1) * a3) / (t3 - t1)
+        curve = ((t2 - t) * b1 + (t - t1) * b2) / (t2 - t1)
+        curve[-1] = p2
+        dense.append(curve)
+        source.extend([k] * samples)
+    return np.vstack(dense), np.array(source, dtype=np.intp)
+
+
+def _corner_velocity(incoming: np.ndarray, outgoing: np.ndarray,
+                     shorter: float, acceleration: float, deviation: float) -> float:
+    """
+    Fastest speed through the junction between two unit directions
+
+    Junction deviation: the speed at which an arc tangent to both segments,
+    deviation mm from the corner, is taken at the acceleration limit. On
+    densely sampled curves the vertices are also spaced too closely for that
+    arc to fit, so the radius implied by the turn over the shorter segment
+    caps it as well.
+    """
+    cos_turn = float(np.clip(np.dot(incoming, outgoing), -1.0, 1.0))
+    if cos_turn > 1.0 - 1e-12:
+        return math.inf
+    # Half the angle between the segments (pi for a straight line, 0 for a reversal)
+    sin_half = math.sqrt((1.0 + cos_turn) / 2.0)
+    if sin_half < 1e-9:
+        return 0.0
+    deviation_speed = math.sqrt(acceleration * deviation * sin_half / (1.0 - sin_half))
+    curve_radius = shorter / (2.0 * math.sqrt((1.0 - cos_turn) / 2.0))
+    return min(deviation_speed, math.sqrt(acceleration * curve_radius))
+
+
+def _path_steps(plan: PathPlan, limits: Dict[str, AxisLimits]):
+    """Fill in per-axis step schedules; a step falls wherever the axis crosses a step boundary"""
+    lengths = np.diff(plan.offsets)
+    for index, axis in enumerate(AXES):
+        steps_per_mm = limits[axis].steps_per_mm
+        # Axis position in steps relative to the path start, rounded so float noise on a
+        # stationary axis (e.g. from the spline) doesn't flicker across a step boundary
+        counts = np.round((plan.points[:, index] - plan.points[0, index]) * steps_per_mm, 6)
+        path_positions, directions = [], []
+        for k in range(len(lengths)):
+            begin, end = counts[k], counts[k + 1]
+            if end > begin:
+                boundaries = np.arange(math.floor(begin) + 1, math.floor(end) + 1)
+            elif end < begin:
+                boundaries = np.arange(math.floor(begin), math.floor(end), -1)
+            else:
+                continue
+            if boundaries.size == 0:
+                continue
+            fraction = (boundaries - begin) / (end - begin)
+            path_positions.append(plan.offsets[k] + np.clip(fraction, 0.0, 1.0) * lengths[k])
+            directions.append(np.full(boundaries.size, 1 if end > begin else -1, dtype=np.int8))
+
+        if path_positions:
+            step_positions = np.minimum(np.concatenate(path_positions), plan.distance)
+            plan.step_times[axis] = _step_times(plan.profile, step_positions)
+            plan.step_directions[axis] = np.concatenate(directions)
+        else:
+            plan.step_times[axis] = np.empty(0)
+            plan.step_directions[axis] = np.empty(0, dtype=np.int8)
+
+
+def plan_path(waypoints: Sequence[Dict[str, float]],
+              flow_rates: Union[float, Sequence[float]] = 0.0,
+              limits: Dict[str, AxisLimits] = DEFAULT_AXIS_LIMITS,
+              speed: float = 10.0,
+              junction_deviation: float = DEFAULT_JUNCTION_DEVIATION,
+              smooth: bool = False,
+              resolution: float = SPLINE_RESOLUTION) -> PathPlan:
+    """
+    Plan a continuous move through waypoints (mm) at feed speed (mm/s)
+
+    Each corner gets a speed limit from junction deviation, then a backward
+    and a forward pass over the whole path lower those limits until every
+    segment can get from one corner speed to the next within its acceleration
+    limit, so the nozzle only comes to rest at the ends. Segments use
+    constant-acceleration (trapezoidal) blends between corner speeds. With
+    smooth=True the waypoints are joined by a Catmull-Rom spline instead of
+    straight lines.
+
+    flow_rates gives the pump flow (ml/min) for each waypoint segment, or one
+    for the whole path, at the feed speed; the plan scales it with the actual
+    nozzle speed so the volume laid per mm stays the same through corners.
+    """
+    if len(waypoints) < 2:
+        raise ValueError("A path needs at least two waypoints")
+    if speed <= 0:
+        raise ValueError("Feed speed must be positive")
+
+    points = np.array([[float(waypoint[axis]) for axis in AXES] for waypoint in waypoints])
+    rates = np.broadcast_to(np.asarray(flow_rates, dtype=np.float64), (len(points) - 1,))
+    if np.any(rates < 0):
+        raise ValueError("Flow rates cannot be negative")
+    # ml per mm at the feed speed
+    deposition = rates / 60.0 / speed
+
+    # Repeated waypoints have no direction; drop them with their segment
+    keep = np.concatenate([[True], np.linalg.norm(np.diff(points, axis=0), axis=1) > 1e-9])
+    deposition = deposition[keep[1:]]
+    points = points[keep]
+    if len(points) < 2:
+        raise ValueError("Path has no length")
+
+    # Baseline: the same waypoints as separate rest-to-rest moves
+    stop_and_go = 0.0
+    for delta in np.diff(points, axis=0):
+        length = float(np.linalg.norm(delta))
+        stop_and_go += plan_profile(length, *_path_limits(delta / length, limits, speed)).duration
+
+    if smooth and len(points) > 2:
+        points, source = smooth_path(points, resolution)
+        deposition = deposition[source]
+        keep = np.concatenate([[True], np.linalg.norm(np.diff(points, axis=0), axis=1) > 1e-9])
+        deposition = deposition[keep[1:]]
+        points = points[keep]
+
+    deltas = np.diff(points, axis=0)
+    lengths = np.linalg.norm(deltas, axis=1)
+    directions = deltas / lengths[:, None]
+    offsets = np.concatenate([[0.0], np.cumsum(lengths)])
+    segment_count = len(lengths)
+
+    velocity_limits = np.empty(segment_count)
+    accelerations = np.empty(segment_count)
+    for k in range(segment_count):
+        velocity_limits[k], accelerations[k], _ = _path_limits(directions[k], limits, speed)
+
+    # Corner speed limits; the path starts and ends at rest
+    corners = np.zeros(segment_count + 1)
+    for k in range(1, segment_count):
+        corners[k] = min(
+            velocity_limits[k - 1],
+            velocity_limits[k],
+            _corner_velocity(directions[k - 1], directions[k], min(lengths[k - 1], lengths[k]),
+                             min(accelerations[k - 1], accelerations[k]), junction_deviation)
+        )
+
+    # Look-ahead: never arrive at a corner faster than the rest of the path can slow down from...
+    for k in range(segment_count - 1, -1, -1):
+        corners[k] = min(corners[k], math.sqrt(corners[k + 1] ** 2 + 2.0 * accelerations[k] * lengths[k]))
+    # ...or faster than the path so far can speed up to
+    for k in range(segment_count):
+        corners[k + 1] = min(corners[k + 1], math.sqrt(corners[k] ** 2 + 2.0 * accelerations[k] * lengths[k]))
+
+    t, s, v, a = [0.0], [0.0], [0.0], []
+    for k in range(segment_count):
+        entry, exit_, acceleration, length = corners[k], corners[k + 1], accelerations[k], lengths[k]
+        cruise = velocity_limits[k]
+        if (2.0 * cruise ** 2 - entry ** 2 - exit_ ** 2) / (2.0 * acceleration) > length:
+            # Too short to reach the feed speed: accelerate straight into the deceleration
+            cruise = math.sqrt((2.0 * acceleration * length + entry ** 2 + exit_ ** 2) / 2.0)
+        cruise = max(cruise, entry, exit_)
+        accel_time = (cruise - entry) / acceleration
+        decel_time = (cruise - exit_) / acceleration
+        cruise_distance = length - (cruise ** 2 - entry ** 2 + cruise ** 2 - exit_ ** 2) / (2.0 * acceleration)
+        phases = [(accel_time, acceleration), (max(cruise_distance, 0.0) / cruise, 0.0), (decel_time, -acceleration)]
+
+        for duration, phase_acceleration in phases:
+            if duration <= 1e-12:
+                continue
+            a.append(phase_acceleration)
+            s.append(s[-1] + duration * (v[-1] + duration * phase_acceleration / 2.0))
+            v.append(v[-1] + duration * phase_acceleration)
+            t.append(t[-1] + duration)
+        # Pin each corner so rounding doesn't accumulate along the path
+        s[-1] = offsets[k + 1]
+        v[-1] = exit_
+
+    profile = PathProfile(t=np.array(t), s=np.array(s), v=np.array(v), a=np.array(a), j=np.zeros(len(a)))
+    plan = PathPlan(
+        points=points,
+        directions=directions,
+        offsets=offsets,
+        deposition=deposition,
+        profile=profile,
+        corner_velocities=corners,
+        stop_and_go_duration=stop_and_go
+    )
+    _path_steps(plan, limits)
+    return plan
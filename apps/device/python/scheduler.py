@@ -0,0 +1,187 @@
+"""
+StitchMe Task Scheduler
+Fixed-rate periodic tasks released on absolute deadlines, in priority order, with jitter and overrun statistics
+"""
+
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Recent release jitters kept per task for percentiles
+JITTER_WINDOW = 1000
+
+# Overruns are logged the first time and then every this many
+OVERRUN_LOG_EVERY = 100
+
+# Releases this close (s) are due now. Release times accumulate float rounding, and a wait
+# shorter than the clock can represent never ends on a virtual clock (the simulator's)
+RELEASE_TOLERANCE = 1e-9
+
+
+@dataclass
+class TaskStats:
+    """Release and execution timing of one periodic task (seconds)"""
+    runs: int = 0
+    # Runs that took longer than the period
+    overruns: int = 0
+    # Releases dropped because the previous run was still going
+    skipped: int = 0
+    # Releases that passed entirely while the scheduler was held up
+    missed: int = 0
+    errors: int = 0
+    total_exec: float = 0.0
+    max_exec: float = 0.0
+    max_jitter: float = 0.0
+    jitter: np.ndarray = field(default_factory=lambda: np.zeros(JITTER_WINDOW))
+
+    def record(self, jitter: float, duration: float):
+        self.jitter[self.runs % JITTER_WINDOW] = jitter
+        self.runs += 1
+        self.total_exec += duration
+        self.max_exec = max(self.max_exec, duration)
+        self.max_jitter = max(self.max_jitter, jitter)
+
+    def summary(self) -> Dict[str, Any]:
+        recent = self.jitter[:min(self.runs, JITTER_WINDOW)] * 1000
+        return {
+            'runs': self.runs,
+            'overruns': self.overruns,
+            'skipped': self.skipped,
+            'missed': self.missed,
+            'errors': self.errors,
+            'jitter_ms': {
+                'mean': round(float(recent.mean()), 3) if recent.size else None,
+                'p99': round(float(np.percentile(recent, 99)), 3) if recent.size else None,
+                'max': round(self.max_jitter * 1000, 3),
+            },
+            'exec_ms': {
+                'mean': round(self.total_exec / self.runs * 1000, 3) if self.runs else None,
+                'max': round(self.max_exec * 1000, 3),
+            },
+        }
+
+
+@dataclass
+class PeriodicTask:
+    """A coroutine function run every period seconds; lower priority values run first"""
+    name: str
+    callback: Callable[[], Awaitable[Any]]
+    period: float
+    priority: int
+    # Critical tasks run inside the dispatcher, so nothing else starts until they finish
+    critical: bool = False
+    next_release: float = 0.0
+    running: Optional[asyncio.Task] = None
+    stats: TaskStats = field(default_factory=TaskStats)
+
+
+class Scheduler:
+    """
+    Runs subsystem updates as periodic tasks, each at its own rate
+
+    A single dispatcher sleeps until the earliest release time, then releases
+    every due task in priority order. Release times advance by whole periods
+    from the first one, so the rate doesn't drift with execution time, and
+    releases that fall entirely behind are counted as missed rather than
+    bunched up. Critical tasks (safety) are awaited by the dispatcher itself;
+    the rest run as their own asyncio tasks so a slow display refresh never
+    holds up the next safety check, and a task still running at its next
+    release skips that release.
+    """
+
+    def __init__(self, on_error: Optional[Callable[[Exception], Awaitable[Any]]] = None):
+        self.on_error = on_error
+        self.tasks: List[PeriodicTask] = []
+        self._running = False
+        self._wakeup: Optional[asyncio.Event] = None
+
+    def add(self, name: str, callback: Callable[[], Awaitable[Any]], rate_hz: float,
+            priority: int, critical: bool = False) -> PeriodicTask:
+        if rate_hz <= 0:
+            raise ValueError(f"Rate for {name} must be positive")
+        task = PeriodicTask(name=name, callback=callback, period=1.0 / rate_hz,
+                            priority=priority, critical=critical)
+        self.tasks.append(task)
+        self.tasks.sort(key=lambda t: t.priority)
+        return task
+
+    async def run(self):
+        """Dispatch tasks until stop() is called"""
+        loop = asyncio.get_running_loop()
+        self._running = True
+        self._wakeup = asyncio.Event()
+        start = loop.time()
+        for task in self.tasks:
+            task.next_release = start
+
+        try:
+            while self._running:
+                # self.tasks is sorted by priority, so due tasks are released most urgent first
+                for task in self.tasks:
+                    if task.next_release <= loop.time() + RELEASE_TOLERANCE:
+                        await self._release(task, loop)
+
+                delay = min(task.next_release for task in self.tasks) - loop.time()
+                if delay > RELEASE_TOLERANCE:
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), delay)
+                    except asyncio.TimeoutError:
+                        pass
+        finally:
+            running = [task.running for task in self.tasks if task.running and not task.running.done()]
+            for pending in running:
+                pending.cancel()
+            await asyncio.gather(*running, return_exceptions=True)
+
+    def stop(self):
+        self._running = False
+        if self._wakeup:
+            self._wakeup.set()
+
+    async def _release(self, task: PeriodicTask, loop: asyncio.AbstractEventLoop):
+        release = task.next_release
+        now = loop.time()
+        # Clamped: a release taken within RELEASE_TOLERANCE of its time can be a hair early
+        behind = max(0, int((now - release) // task.period))
+        task.stats.missed += behind
+        task.next_release = release + (behind + 1) * task.period
+
+        if task.running and not task.running.done():
+            task.stats.skipped += 1
+            return
+
+        if task.critical:
+            await self._execute(task, release, loop)
+        else:
+            task.running = asyncio.create_task(self._execute(task, release, loop))
+
+    async def _execute(self, task: PeriodicTask, release: float, loop: asyncio.AbstractEventLoop):
+        started = loop.time()
+        try:
+            await task.callback()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            task.stats.errors += 1
+            logger.error(f"❌ Error in {task.name} task: {e}")
+            if self.on_error:
+                await self.on_error(e)
+        finally:
+            duration = loop.time() - started
+            task.stats.record(started - release, duration)
+            if duration > task.period:
+                task.stats.overruns += 1
+                if task.stats.overruns % OVERRUN_LOG_EVERY == 1:
+                    logger.warning(f"⚠️ {task.name} took {duration * 1000:.1f}ms, period is "
+                                   f"{task.period * 1000:.1f}ms ({task.stats.overruns} overruns)")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            task.name: {'rate_hz': round(1.0 / task.period, 2), 'priority': task.priority, **task.stats.summary()}
+            for task in self.tasks
+        }
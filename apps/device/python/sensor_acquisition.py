@@ -0,0 +1,245 @@
+"""
+StitchMe Sensor Acquisition
+Each sensor sampled at its own rate on its own thread into timestamped ring buffers, read as zero-copy views
+"""
+
+import logging
+import math
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Seconds of samples kept per sensor, unless a sensor asks for more or less
+DEFAULT_HISTORY = 60.0
+
+# Seconds of extra ring slots beyond the history, so a view of the whole history
+# survives at least this long before the sampler overwrites its oldest sample
+READ_HEADROOM = 1.0
+
+# A sensor whose newest sample is this many periods old is reported stale
+STALE_AFTER_PERIODS = 10
+
+# Read errors are logged the first time and then every this many
+ERROR_LOG_EVERY = 100
+
+Reading = Union[float, Sequence[float]]
+
+
+class SampleRing:
+    """
+    Fixed-capacity buffer of (timestamp, values) samples for one sensor
+
+    The ring has capacity + headroom slots and every sample is written
+    twice, at i and i + slots, so the most recent n <= capacity samples are
+    always one contiguous slice and every read below returns NumPy views
+    instead of copies. Reads are capped at capacity, so a view never covers
+    the slot the writer fills next: it stays intact for slots - n more
+    samples (at least headroom), then the writer laps it. Copy it to keep it.
+    """
+
+    def __init__(self, capacity: int, fields: Sequence[str], headroom: int = 1):
+        self.capacity = capacity
+        self.slots = capacity + max(1, headroom)
+        self.fields = tuple(fields)
+        self.times = np.zeros(2 * self.slots, dtype=np.float64)
+        self.values = np.zeros((2 * self.slots, len(self.fields)), dtype=np.float64)
+        # Samples ever written; only the writer changes it, after the sample is in place
+        self.count = 0
+
+    def write(self, timestamp: float, values: Reading):
+        index = self.count % self.slots
+        self.times[index] = self.times[index + self.slots] = timestamp
+        self.values[index] = self.values[index + self.slots] = values
+        self.count += 1
+
+    def _recent(self, count: int, n: int) -> slice:
+        """Slice of the newest n of the first count samples"""
+        end = (count - 1) % self.slots + self.slots + 1
+        return slice(end - n, end)
+
+    def last(self, n: int) -> Tuple[np.ndarray, np.ndarray]:
+        """The newest n samples (fewer if there aren't that many yet) as (times, values) views, oldest first"""
+        count = self.count
+        n = min(n, count, self.capacity)
+        if n == 0:
+            return self.times[:0], self.values[:0]
+        window = self._recent(count, n)
+        return self.times[window], self.values[window]
+
+    def window(self, seconds: float, max_points: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Samples from the last seconds as (times, values) views
+
+        With max_points, every k-th sample is taken (a strided view, still no
+        copy) so at most max_points come back, always including the newest.
+        """
+        times, values = self.last(self.capacity)
+        if len(times):
+            start = int(np.searchsorted(times, times[-1] - seconds, side='left'))
+            times, values = times[start:], values[start:]
+        if max_points and len(times) > max_points:
+            step = math.ceil(len(times) / max_points)
+            first = (len(times) - 1) % step
+            times, values = times[first::step], values[first::step]
+        return times, values
+
+    def since(self, cursor: int) -> Tuple[np.ndarray, np.ndarray, int, int]:
+        """
+        Samples written after cursor (a count from a previous call, 0 at first)
+
+        Returns (times, values, new cursor, lost). A reader that comes back
+        within the ring's history gets every sample however long it was away;
+        lost counts those overwritten before it came back.
+        """
+        count = self.count
+        lost = max(0, count - cursor - self.capacity)
+        times, values = self.last(count - cursor - lost)
+        return times, values, count, lost
+
+    def latest(self) -> Optional[Tuple[float, np.ndarray]]:
+        count = self.count
+        if count == 0:
+            return None
+        index = (count - 1) % self.slots
+        return float(self.times[index]), self.values[index]
+
+
+class SensorChannel:
+    """One sensor's reader, rate, buffer and acquisition statistics"""
+
+    __slots__ = ('name', 'read', 'period', 'ring', 'thread',
+                 'samples', 'missed', 'errors', 'max_read', 'started')
+
+    def __init__(self, name: str, read: Callable[[], Reading], rate_hz: float,
+                 fields: Sequence[str], history: float):
+        self.name = name
+        self.read = read
+        self.period = 1.0 / rate_hz
+        self.ring = SampleRing(max(1, int(math.ceil(history * rate_hz))), fields,
+                               headroom=int(math.ceil(READ_HEADROOM * rate_hz)))
+        self.thread: Optional[threading.Thread] = None
+        self.samples = 0
+        # Sample times that passed entirely while a read (or the OS) held the thread up
+        self.missed = 0
+        self.errors = 0
+        self.max_read = 0.0
+        self.started = 0.0
+
+    def summary(self) -> Dict[str, Any]:
+        elapsed = time.monotonic() - self.started if self.started else 0.0
+        return {
+            'rate_hz': round(1.0 / self.period, 2),
+            'achieved_hz': round(self.samples / elapsed, 2) if elapsed > 0 else None,
+            'samples': self.samples,
+            'missed': self.missed,
+            'errors': self.errors,
+            'max_read_ms': round(self.max_read * 1000, 3),
+            'history_s': round(self.ring.capacity * self.period, 1),
+        }
+
+
+class SensorAcquisition:
+    """
+    Samples every registered sensor at its native rate, independent of the main loop
+
+    Each sensor's read() is a plain blocking call (I2C, SPI, serial) run on
+    its own daemon thread, released on absolute deadlines like the main
+    loop's scheduler. Because sampling never goes through the event loop, a
+    stalled loop delays consumers, not samples. Timestamps are
+    time.monotonic(), the clock asyncio's loop.time() uses.
+
+    Consumers read through SampleRing views: safety checks the newest
+    samples or a short window, status takes readings(), and uploads call
+    since() with their own cursor to get everything captured in between.
+    """
+
+    def __init__(self):
+        self.channels: Dict[str, SensorChannel] = {}
+        self._stop = threading.Event()
+        self._running = False
+
+    def add(self, name: str, read: Callable[[], Reading], rate_hz: float,
+            fields: Sequence[str] = ('value',), history: float = DEFAULT_HISTORY) -> SampleRing:
+        """Register a sensor; read() returns one value per field. Returns its ring for consumers"""
+        if rate_hz <= 0:
+            raise ValueError(f"Rate for {name} must be positive")
+        if name in self.channels:
+            raise ValueError(f"Sensor {name} is already registered")
+        channel = SensorChannel(name, read, rate_hz, fields, history)
+        self.channels[name] = channel
+        if self._running:
+            self._start(channel)
+        return channel.ring
+
+    def start(self):
+        self._stop.clear()
+        self._running = True
+        for channel in self.channels.values():
+            if channel.thread is None:
+                self._start(channel)
+
+    def _start(self, channel: SensorChannel):
+        channel.started = time.monotonic()
+        channel.thread = threading.Thread(target=self._sample, args=(channel,),
+                                          name=f"sensor-{channel.name}", daemon=True)
+        channel.thread.start()
+
+    def stop(self, timeout: float = 1.0):
+        self._running = False
+        self._stop.set()
+        for channel in self.channels.values():
+            if channel.thread:
+                channel.thread.join(timeout)
+                channel.thread = None
+
+    def _sample(self, channel: SensorChannel):
+        ring, period = channel.ring, channel.period
+        release = time.monotonic()
+        while not self._stop.is_set():
+            started = time.monotonic()
+            try:
+                value = channel.read()
+            except Exception as e:
+                channel.errors += 1
+                if channel.errors % ERROR_LOG_EVERY == 1:
+                    logger.warning(f"⚠️ Reading {channel.name} failed: {e} ({channel.errors} errors)")
+            else:
+                ring.write(started, value)
+                channel.samples += 1
+            now = time.monotonic()
+            channel.max_read = max(channel.max_read, now - started)
+
+            behind = int((now - release) // period)
+            channel.missed += behind
+            release += (behind + 1) * period
+            if release > now and self._stop.wait(release - now):
+                break
+
+    def ring(self, name: str) -> SampleRing:
+        return self.channels[name].ring
+
+    def readings(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Newest value of every field of every sensor, for status updates
+
+        Each sensor also gets 'stale', true once its newest sample is
+        STALE_AFTER_PERIODS periods old. It changes only when a sensor
+        stops or resumes, so unchanged readings stay out of status deltas.
+        """
+        now = time.monotonic()
+        readings = {}
+        for name, channel in self.channels.items():
+            latest = channel.ring.latest()
+            if latest is None:
+                continue
+            timestamp, values = latest
+            readings[name] = dict(zip(channel.ring.fields, values.tolist()))
+            readings[name]['stale'] = now - timestamp > STALE_AFTER_PERIODS * channel.period
+        return readings
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {name: channel.summary() for name, channel in self.channels.items()}
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+StitchMe Hardware Simulator
+Runs DeviceController against the simulated backend on a virtual clock, far faster than real time
+
+Every asyncio.sleep(), wait_for() and loop.time() inside the run uses the
+virtual clock, so the controller, planners and scheduler run unmodified and
+report the same durations they would on hardware; only the waiting is
+skipped.
+
+Usage:
+    python simulator.py [--sequences 1000] [--stop-probability 0.1] [--seed 0]
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import random
+import selectors
+import time
+from typing import Any, Dict, Optional
+
+from device_controller import DeviceController, DeviceState, TreatmentType
+from hardware import SimulatedBackend
+
+# Relative difference allowed between a path's planned and dispensed volume
+PATH_VOLUME_TOLERANCE = 0.05
+
+
+class _VirtualSelector(selectors.BaseSelector):
+    """Wraps the real selector; instead of blocking until the next timer, jumps the loop's clock to it"""
+
+    def __init__(self, loop: 'VirtualTimeLoop', speedup: Optional[float]):
+        self._loop = loop
+        self._speedup = speedup
+        self._selector = selectors.DefaultSelector()
+
+    def register(self, fileobj, events, data=None):
+        return self._selector.register(fileobj, events, data)
+
+    def unregister(self, fileobj):
+        return self._selector.unregister(fileobj)
+
+    def modify(self, fileobj, events, data=None):
+        return self._selector.modify(fileobj, events, data)
+
+    def get_map(self):
+        return self._selector.get_map()
+
+    def close(self):
+        self._selector.close()
+
+    def select(self, timeout=None):
+        if timeout is None:
+            # Nothing scheduled: only real I/O can wake the loop
+            return self._selector.select(None)
+        events = self._selector.select(0)
+        if not events and timeout > 0:
+            if self._speedup:
+                time.sleep(timeout / self._speedup)
+            self._loop.virtual_time += timeout
+        return events
+
+
+class VirtualTimeLoop(asyncio.SelectorEventLoop):
+    """
+    Event loop whose time() is virtual
+
+    Whenever every task is waiting on a timer, the clock jumps straight to
+    the earliest one. speedup=None runs as fast as the CPU allows; a number
+    still waits, that many times faster than real time, e.g. to watch a run.
+    """
+
+    def __init__(self, speedup: Optional[float] = None):
+        self.virtual_time = 0.0
+        super().__init__(selector=_VirtualSelector(self, speedup))
+
+    def time(self) -> float:
+        return self.virtual_time
+
+
+def run_simulated(coroutine, speedup: Optional[float] = None):
+    """asyncio.run() on a VirtualTimeLoop"""
+    loop = VirtualTimeLoop(speedup)
+    try:
+        asyncio.set_event_loop(loop)
+        return loop.run_until_complete(coroutine)
+    finally:
+        asyncio.set_event_loop(None)
+        loop.run_until_complete(loop.shutdown_asyncgens())
+        loop.close()
+
+
+async def _treatment_sequence(controller: DeviceController, rng: random.Random, stop_probability: float):
+    """One randomized treatment, possibly interrupted by an emergency stop; returns what happened and what it dispensed"""
+    loop = asyncio.get_running_loop()
+    work_area = controller.machine.work_area
+
+    def point(z=5.0):
+        return {'x': rng.uniform(20, work_area.x_max - 20), 'y': rng.uniform(20, work_area.y_max - 20), 'z': z}
+
+    kind = rng.choice(['glue', 'seam', 'cleaning', 'coverage'])
+    # Volume asked for; paths report theirs in the plan summary they return
+    requested = None
+    if kind == 'glue':
+        requested = rng.uniform(0.05, 0.2)
+        treatment = controller.start_treatment(TreatmentType.SKIN_GLUE, point(), {'volume_ml': requested})
+    elif kind == 'seam':
+        start = point()
+        seam = [{'x': start['x'] + 2.0 * i, 'y': start['y'] + rng.uniform(-1, 1), 'z': 5.0} for i in range(8)]
+        treatment = controller.follow_path(TreatmentType.SKIN_GLUE, seam, 0.5, speed=10.0, smooth=rng.random() < 0.5)
+    elif kind == 'cleaning':
+        requested = rng.uniform(0.2, 1.0)
+        treatment = controller.start_treatment(TreatmentType.CLEANING, point(), {'volume_ml': requested})
+    else:
+        center = point()
+        size = rng.uniform(4, 15)
+        outline = [[center['x'], center['y']], [center['x'] + size, center['y']],
+                   [center['x'] + size, center['y'] + size / 2], [center['x'], center['y'] + size / 2]]
+        treatment = controller.cover_wound(TreatmentType.SANITIZING, [outline], 5.0,
+                                           {'dose_ml_cm2': 0.1, 'pattern': rng.choice(['boustrophedon', 'spiral'])})
+
+    dispensed_before = sum(controller.backend.dispensed_ml.values())
+    started = loop.time()
+    task = asyncio.create_task(treatment)
+    interrupted = False
+    if rng.random() < stop_probability:
+        await asyncio.sleep(rng.uniform(0.0, 5.0))
+        # A stop after the treatment finished doesn't interrupt it
+        interrupted = not task.done()
+        await controller.emergency_stop()
+    try:
+        summary = await task
+        outcome = 'completed'
+    except Exception:
+        outcome = 'stopped' if controller.is_emergency_stopped else 'failed'
+    dispensed = sum(controller.backend.dispensed_ml.values()) - dispensed_before
+
+    # A stop in the middle of a treatment must abort it, not let it report success
+    assert not interrupted or outcome == 'stopped', f"{kind} completed through an emergency stop"
+    if outcome == 'completed':
+        # Paths set pump flow every PATH_UPDATE_INTERVAL, so they only track the plan's volume closely
+        tolerance = 1e-6 if requested is not None else PATH_VOLUME_TOLERANCE
+        requested = summary['volume_ml'] if requested is None else requested
+        assert abs(dispensed - requested) <= tolerance * requested, f"{kind} dispensed {dispensed}ml of {requested}ml"
+    elif requested is not None:
+        assert dispensed < requested, f"Stopped {kind} dispensed {dispensed}ml of {requested}ml"
+        assert controller.state == DeviceState.EMERGENCY
+
+    if controller.is_emergency_stopped:
+        # Every stop must leave nothing dispensing
+        assert not controller.backend.valve_open and not any(controller.backend.flows.values())
+        assert not controller.snapshot().valve_open and not any(controller.snapshot().pump_flows)
+        await controller.reset_emergency()
+    controller.state = DeviceState.IDLE
+    return kind, outcome, loop.time() - started, dispensed
+
+
+async def stress(sequences: int, stop_probability: float, seed: int) -> Dict[str, Any]:
+    rng = random.Random(seed)
+    backend = SimulatedBackend()
+    controller = DeviceController(backend)
+    await controller.initialize()
+
+    results: Dict[str, Dict[str, Any]] = {}
+    for _ in range(sequences):
+        kind, outcome, duration, dispensed = await _treatment_sequence(controller, rng, stop_probability)
+        entry = results.setdefault(kind, {'completed': 0, 'stopped': 0, 'failed': 0, 'simulated_s': 0.0,
+                                          'stopped_dispensed_ml': 0.0})
+        entry[outcome] += 1
+        entry['simulated_s'] += duration
+        if outcome == 'stopped':
+            entry['stopped_dispensed_ml'] += dispensed
+
+    return {
+        'sequences': sequences,
+        'by_kind': {kind: {**entry, 'simulated_s': round(entry['simulated_s'], 2),
+                           'stopped_dispensed_ml': round(entry['stopped_dispensed_ml'], 3)}
+                    for kind, entry in results.items()},
+        'simulated_s': round(asyncio.get_running_loop().time(), 2),
+        'moves': backend.moves,
+        'emergency_stops': backend.stops,
+        'steps': backend.steps,
+        'dispensed_ml': {pump: round(volume, 3) for pump, volume in backend.dispensed_ml.items()},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stress DeviceController on simulated hardware")
+    parser.add_argument("--sequences", type=int, default=1000)
+    parser.add_argument("--stop-probability", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--speedup", type=float, default=None,
+                        help="Wait this many times faster than real time instead of not at all")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.CRITICAL)
+    started = time.perf_counter()
+    report = run_simulated(stress(args.sequences, args.stop_probability, args.seed), args.speedup)
+    report['wall_s'] = round(time.perf_counter() - started, 2)
+    report['speedup'] = round(report['simulated_s'] / report['wall_s'], 1)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
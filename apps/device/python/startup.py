@@ -0,0 +1,73 @@
+"""
+StitchMe Startup
+Runs initialization steps as a dependency graph, each starting as soon as its prerequisites finish
+"""
+
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# name -> (coroutine function, names of steps that must finish first)
+Steps = Dict[str, Tuple[Callable[[], Awaitable], Sequence[str]]]
+
+
+def _check_graph(steps: Steps):
+    """Raise ValueError for unknown prerequisites or cycles"""
+    visiting, done = set(), set()
+
+    def visit(name, path):
+        if name in done:
+            return
+        if name in visiting:
+            raise ValueError(f"Startup steps form a cycle: {' -> '.join(path + [name])}")
+        visiting.add(name)
+        for requirement in steps[name][1]:
+            if requirement not in steps:
+                raise ValueError(f"Startup step {name} depends on unknown step {requirement}")
+            visit(requirement, path + [name])
+        visiting.discard(name)
+        done.add(name)
+
+    for name in steps:
+        visit(name, [])
+
+
+async def run_steps(steps: Steps, label: str = "Startup") -> Dict[str, Tuple[float, float]]:
+    """
+    Run every step, overlapping those that don't depend on each other
+
+    Returns {name: (start offset, duration)} in seconds and logs them. If a
+    step fails, steps still running are cancelled and the error is raised.
+    """
+    _check_graph(steps)
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    timings: Dict[str, Tuple[float, float]] = {}
+    tasks: Dict[str, asyncio.Task] = {}
+
+    async def run(name: str):
+        run_step, requirements = steps[name]
+        await asyncio.gather(*(tasks[requirement] for requirement in requirements))
+        step_started = loop.time()
+        await run_step()
+        timings[name] = (step_started - started, loop.time() - step_started)
+
+    # Every step is created up front, so its prerequisites' tasks exist when it first runs
+    for name in steps:
+        tasks[name] = asyncio.create_task(run(name))
+    try:
+        await asyncio.gather(*tasks.values())
+    except BaseException:
+        for task in tasks.values():
+            task.cancel()
+        await asyncio.gather(*tasks.values(), return_exceptions=True)
+        raise
+
+    total = loop.time() - started
+    serial = sum(duration for _, duration in timings.values())
+    for name, (offset, duration) in sorted(timings.items(), key=lambda item: item[1][0]):
+        logger.info(f"⏱️ {label} {name}: {duration:.2f}s (started at +{offset:.2f}s)")
+    logger.info(f"⏱️ {label} took {total:.2f}s ({serial:.2f}s if run one after another)")
+    return timings
@@ -0,0 +1,245 @@
+"""
+StitchMe Status Publisher
+Delta-encoded msgpack status updates with periodic keyframes and per-subscriber rate limits
+"""
+
+import json
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import msgpack
+
+logger = logging.getLogger(__name__)
+
+# Every subscriber gets the full status at least this often (s), so a lost delta heals itself
+KEYFRAME_INTERVAL = 5.0
+
+# Floats are rounded to this many decimals before diffing; sensor noise below it isn't news
+FLOAT_PRECISION = 3
+
+# The full-JSON baseline in stats() is measured on one publish in this many
+BASELINE_SAMPLE_EVERY = 50
+
+# Marker for "no previous value" when diffing
+_MISSING = object()
+
+
+def _rounded(value: Any, precision: int) -> Any:
+    if isinstance(value, float):
+        return round(value, precision)
+    if isinstance(value, dict):
+        return {key: _rounded(item, precision) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_rounded(item, precision) for item in value]
+    return value
+
+
+def diff_status(previous: Dict[str, Any], current: Dict[str, Any],
+                prefix: Tuple[str, ...] = ()) -> Tuple[Dict[str, Any], List[List[str]]]:
+    """
+    Changes from previous to current as (changed, removed)
+
+    changed mirrors the nesting of current but holds only values that differ;
+    nested dicts are diffed key by key, anything else is replaced whole.
+    removed lists the key paths that disappeared.
+    """
+    changed, removed = {}, []
+    for key, value in current.items():
+        old = previous.get(key, _MISSING)
+        if isinstance(value, dict) and isinstance(old, dict):
+            sub_changed, sub_removed = diff_status(old, value, prefix + (key,))
+            if sub_changed:
+                changed[key] = sub_changed
+            removed.extend(sub_removed)
+        elif old is _MISSING or old != value:
+            changed[key] = value
+    removed.extend(list(prefix + (key,)) for key in previous if key not in current)
+    return changed, removed
+
+
+def apply_delta(status: Dict[str, Any], changed: Dict[str, Any], removed: List[List[str]]) -> Dict[str, Any]:
+    """Inverse of diff_status, for receivers: updates status in place and returns it"""
+    for path in removed:
+        target = status
+        for key in path[:-1]:
+            target = target.get(key, {})
+        target.pop(path[-1], None)
+
+    def merge(target: Dict[str, Any], updates: Dict[str, Any]):
+        for key, value in updates.items():
+            if isinstance(value, dict) and isinstance(target.get(key), dict):
+                merge(target[key], value)
+            else:
+                target[key] = value
+
+    merge(status, changed)
+    return status
+
+
+@dataclass
+class Subscriber:
+    """Delivery state and limits for one connected app"""
+    id: str
+    # Most messages per second; None is unlimited
+    max_rate_hz: Optional[float] = None
+    # Sustained byte budget (token bucket, one second of burst); None is unlimited
+    max_bytes_per_s: Optional[float] = None
+    # The status as this subscriber last received it
+    snapshot: Optional[Dict[str, Any]] = None
+    seq_sent: int = 0
+    last_sent: float = 0.0
+    last_keyframe: float = 0.0
+    tokens: float = 0.0
+    token_time: float = field(default_factory=time.monotonic)
+    keyframe_requested: bool = True
+    messages: int = 0
+    keyframes: int = 0
+    bytes_sent: int = 0
+    rate_limited: int = 0
+
+
+class StatusPublisher:
+    """
+    Sends each subscriber only what changed in the device status since it last heard
+
+    publish() is called with the full status on every status tick. Each
+    subscriber keeps the snapshot it last received, so a subscriber held back
+    by its rate limit still gets every change, merged into its next message.
+    Messages are msgpack maps: {'t': 'k' or 'd', 'seq', 'base', 'data',
+    'removed'}; a delta applies on top of the message numbered base. A
+    keyframe carries the whole status and is sent on subscribe, every
+    keyframe_interval seconds and on request_keyframe() (e.g. when a client
+    sees a gap in seq).
+    """
+
+    def __init__(self,
+                 send: Callable[[str, bytes], Awaitable[Any]],
+                 keyframe_interval: float = KEYFRAME_INTERVAL,
+                 float_precision: int = FLOAT_PRECISION):
+        self.send = send
+        self.keyframe_interval = keyframe_interval
+        self.float_precision = float_precision
+        self.subscribers: Dict[str, Subscriber] = {}
+        self.sequence = 0
+
+        self.publishes = 0
+        self.publish_time = 0.0
+        # What sending the full status as JSON to every subscriber on every tick would have cost
+        self.json_bytes = 0
+        self.json_time = 0.0
+        self._json_sample = (0, 0.0)
+
+    def subscribe(self, subscriber_id: str, max_rate_hz: Optional[float] = None,
+                  max_bytes_per_s: Optional[float] = None) -> Subscriber:
+        subscriber = Subscriber(id=subscriber_id, max_rate_hz=max_rate_hz, max_bytes_per_s=max_bytes_per_s,
+                                tokens=max_bytes_per_s or 0.0)
+        self.subscribers[subscriber_id] = subscriber
+        return subscriber
+
+    def unsubscribe(self, subscriber_id: str):
+        self.subscribers.pop(subscriber_id, None)
+
+    def request_keyframe(self, subscriber_id: str):
+        subscriber = self.subscribers.get(subscriber_id)
+        if subscriber:
+            subscriber.keyframe_requested = True
+
+    async def publish(self, status: Dict[str, Any]):
+        """Send status (as deltas where possible) to every subscriber whose limits allow it"""
+        started = time.perf_counter()
+        status = _rounded(status, self.float_precision)
+        now = time.monotonic()
+        self.publishes += 1
+        self.sequence += 1
+
+        # Subscribers that last received the same snapshot share one diff and encoding
+        encoded: Dict[Any, Optional[bytes]] = {}
+        for subscriber in list(self.subscribers.values()):
+            payload, keyframe = self._message(subscriber, status, now, encoded)
+            if payload is None:
+                continue
+            try:
+                await self.send(subscriber.id, payload)
+            except Exception as e:
+                logger.warning(f"⚠️ Status update to {subscriber.id} failed: {e}")
+                # Its snapshot no longer matches what it has; start it over
+                subscriber.keyframe_requested = True
+                continue
+
+            subscriber.snapshot = status
+            subscriber.last_sent = now
+            subscriber.messages += 1
+            subscriber.bytes_sent += len(payload)
+            if keyframe:
+                subscriber.keyframes += 1
+                subscriber.last_keyframe = now
+
+        self.publish_time += time.perf_counter() - started
+
+        # Baseline: the old full JSON broadcast, sampled so measuring it doesn't cost what it measures
+        if self.publishes % BASELINE_SAMPLE_EVERY == 1:
+            json_started = time.perf_counter()
+            size = len(json.dumps(status, default=str).encode())
+            self._json_sample = (size, time.perf_counter() - json_started)
+        size, seconds = self._json_sample
+        self.json_bytes += size * len(self.subscribers)
+        self.json_time += seconds
+
+    def _message(self, subscriber: Subscriber, status: Dict[str, Any], now: float,
+                 encoded: Dict[Any, Optional[bytes]]) -> Tuple[Optional[bytes], bool]:
+        """Encoded message for one subscriber, or None when it has nothing new or is over its limits"""
+        keyframe = (subscriber.snapshot is None or subscriber.keyframe_requested or
+                    now - subscriber.last_keyframe >= self.keyframe_interval)
+
+        if not keyframe and subscriber.max_rate_hz and now - subscriber.last_sent < 1.0 / subscriber.max_rate_hz:
+            subscriber.rate_limited += 1
+            return None, False
+
+        key = 'keyframe' if keyframe else (id(subscriber.snapshot), subscriber.seq_sent)
+        if key not in encoded:
+            if keyframe:
+                message = {'t': 'k', 'seq': self.sequence, 'data': status}
+            else:
+                changed, removed = diff_status(subscriber.snapshot, status)
+                message = {'t': 'd', 'seq': self.sequence, 'base': subscriber.seq_sent,
+                           'data': changed, 'removed': removed} if changed or removed else None
+            encoded[key] = msgpack.packb(message, use_bin_type=True, default=str) if message else None
+        payload = encoded[key]
+        if payload is None:
+            return None, False
+
+        if subscriber.max_bytes_per_s:
+            budget = subscriber.max_bytes_per_s
+            subscriber.tokens = min(budget, subscriber.tokens + (now - subscriber.token_time) * budget)
+            subscriber.token_time = now
+            # Keyframes go out regardless (and may overdraw), or a slow link would never resync
+            if not keyframe and subscriber.tokens < len(payload):
+                subscriber.rate_limited += 1
+                return None, False
+            subscriber.tokens -= len(payload)
+
+        subscriber.keyframe_requested = False
+        subscriber.seq_sent = self.sequence
+        return payload, keyframe
+
+    def stats(self) -> Dict[str, Any]:
+        sent = sum(subscriber.bytes_sent for subscriber in self.subscribers.values())
+        return {
+            'publishes': self.publishes,
+            'bytes_sent': sent,
+            'json_broadcast_bytes': self.json_bytes,
+            'bandwidth_saved_percent': round(100.0 * (1.0 - sent / self.json_bytes), 1) if self.json_bytes else None,
+            'publish_ms': round(self.publish_time / self.publishes * 1000, 3) if self.publishes else None,
+            'json_encode_ms': round(self.json_time / self.publishes * 1000, 3) if self.publishes else None,
+            'subscribers': {
+                subscriber.id: {
+                    'messages': subscriber.messages,
+                    'keyframes': subscriber.keyframes,
+                    'bytes_sent': subscriber.bytes_sent,
+                    'rate_limited': subscriber.rate_limited,
+                }
+                for subscriber in self.subscribers.values()
+            },
+        }
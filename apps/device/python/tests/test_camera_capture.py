@@ -0,0 +1,127 @@
+"""
+Camera handoff: shared-memory slots recycle through the reader, capture picks the sharpest steady frame
+
+Usage: python -m pytest tests
+"""
+
+import asyncio
+import multiprocessing
+import os
+import queue
+import sys
+
+import cv2
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from camera_capture import CameraCapture, SharedFrameSlots  # noqa: E402
+
+INFO = dict(width=4, height=2, quality=85, sharpness=1.0, motion=0.0, captured_at=0.0)
+
+
+@pytest.fixture
+def slots():
+    slots = SharedFrameSlots(2, 64)
+    yield slots
+    slots.close()
+
+
+def test_slots_round_trip_and_recycle(slots):
+    reader = slots.reader()
+    first = slots.put(np.arange(10, dtype=np.uint8), timeout=0.1, **INFO)
+    second = slots.put(np.arange(20, 50, dtype=np.uint8), timeout=0.1, **INFO)
+
+    assert first.slot != second.slot
+    assert bytes(reader.view(first)) == bytes(range(10))
+    assert bytes(reader.view(second)) == bytes(range(20, 50))
+
+    # Both slots are out with the reader until it releases one
+    with pytest.raises(queue.Empty):
+        slots.put(np.zeros(4, dtype=np.uint8), timeout=0.05, **INFO)
+    reader.release(first)
+    third = slots.put(np.full(5, 7, dtype=np.uint8), timeout=0.1, **INFO)
+    assert third.slot == first.slot
+    assert bytes(reader.view(third)) == bytes([7] * 5)
+    reader.close()
+
+
+def test_oversized_frame_rejected(slots):
+    with pytest.raises(ValueError):
+        slots.put(np.zeros(65, dtype=np.uint8), timeout=0.1, **INFO)
+    # The slot wasn't taken
+    assert slots.free.qsize() == 2
+
+
+def _upload(reader, handle, results):
+    results.put(bytes(reader.view(handle)))
+    reader.release(handle)
+    reader.close()
+
+
+def test_reader_in_uploader_process(slots):
+    reader = slots.reader()
+    handle = slots.put(np.arange(8, dtype=np.uint8), timeout=0.1, **INFO)
+    results = multiprocessing.Queue()
+
+    uploader = multiprocessing.Process(target=_upload, args=(reader, handle, results))
+    uploader.start()
+    try:
+        assert results.get(timeout=10) == bytes(range(8))
+    finally:
+        uploader.join(10)
+    assert uploader.exitcode == 0
+    # Released from the other process, so both slots can be filled again
+    taken = {slots.put(np.zeros(4, dtype=np.uint8), timeout=1.0, **INFO).slot for _ in range(2)}
+    assert taken == {0, 1}
+
+
+class FakeCamera:
+    """Grabs alternate between a sharp checkerboard and a blurred copy of it"""
+
+    def __init__(self, width: int, height: int):
+        board = (np.indices((height, width)).sum(axis=0) // 8 % 2 * 255).astype(np.uint8)
+        self.sharp = cv2.cvtColor(board, cv2.COLOR_GRAY2BGR)
+        self.blurred = cv2.GaussianBlur(self.sharp, (15, 15), 5)
+        self.grabs = 0
+
+    def __call__(self, out: np.ndarray) -> bool:
+        np.copyto(out, self.sharp if self.grabs % 5 == 2 else self.blurred)
+        self.grabs += 1
+        return True
+
+
+def test_capture_encodes_sharpest_frame():
+    camera = FakeCamera(320, 240)
+    capture = CameraCapture(camera, resolution=(320, 240), long_edge=160, slots=2)
+    reader = capture.slots.reader()
+    capture.start()
+    try:
+        handle = asyncio.run(capture.capture(timeout=2.0))
+        jpeg = np.frombuffer(bytes(reader.view(handle)), dtype=np.uint8)
+        reader.release(handle)
+        reader.close()
+    finally:
+        capture.stop()
+
+    image = cv2.imdecode(jpeg, cv2.IMREAD_COLOR)
+    assert image.shape == (120, 160, 3)
+    assert (handle.width, handle.height) == (160, 120)
+    # The one sharp frame in each burst of five wins
+    expected = cv2.resize(camera.sharp, (160, 120), interpolation=cv2.INTER_AREA)
+    assert np.abs(image.astype(int) - expected).mean() < 10
+    assert capture.stats()['frames_encoded'] == 1
+
+
+def test_set_target_validation():
+    capture = CameraCapture(FakeCamera(64, 48), resolution=(64, 48), long_edge=32, slots=1)
+    try:
+        capture.set_target(long_edge=16, quality=50)
+        assert (capture.long_edge, capture.quality) == (16, 50)
+        with pytest.raises(ValueError):
+            capture.set_target(long_edge=64)
+        with pytest.raises(ValueError):
+            capture.set_target(quality=0)
+    finally:
+        capture.stop()
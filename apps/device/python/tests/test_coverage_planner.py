@@ -0,0 +1,60 @@
+"""
+Coverage planning: bad pump settings fail up front, planned time and volume match what runs
+
+Usage: python -m pytest tests
+"""
+
+import asyncio
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from coverage_planner import plan_coverage  # noqa: E402
+from device_controller import DeviceController, TreatmentType  # noqa: E402
+from hardware import SimulatedBackend  # noqa: E402
+from simulator import run_simulated  # noqa: E402
+
+WORK_AREA = {'x_max': 200.0, 'y_max': 200.0, 'z_max': 50.0}
+ORIGIN = {'x': 0.0, 'y': 0.0, 'z': 0.0}
+# A 12 x 6 mm wound far from the homed origin, so the approach is long enough to hit the travel cap
+WOUND = np.array([[150.0, 150.0], [162.0, 150.0], [162.0, 156.0], [150.0, 156.0]])
+
+
+@pytest.mark.parametrize("overrides, message", [
+    ({'max_flow_ml_min': 0.0}, "flow rate"),
+    ({'max_flow_ml_min': -1.0}, "flow rate"),
+    ({'volume_ml': 0.0}, "Volume"),
+    ({'dose_ml_cm2': -0.1}, "Dose"),
+])
+def test_invalid_pump_settings(overrides, message):
+    arguments = {'volume_ml': 0.5, 'max_flow_ml_min': 1.0, **overrides}
+    with pytest.raises(ValueError, match=message):
+        plan_coverage([WOUND], 5.0, ORIGIN, work_area=WORK_AREA, **arguments)
+
+
+@pytest.mark.parametrize("pattern", ["boustrophedon", "spiral"])
+def test_coverage_volume(pattern):
+    coverage = plan_coverage([WOUND], 5.0, ORIGIN, 0.5, 2.0, WORK_AREA, pattern=pattern)
+    # Flow follows nozzle speed through every blended corner, so the path lays down exactly the volume asked for
+    times = np.linspace(0.0, coverage.path.duration, 200_001)
+    flows = coverage.path.flow_at(times)
+    dispensed = float(np.sum((flows[1:] + flows[:-1]) / 2.0 * np.diff(times))) / 60.0
+    assert dispensed == pytest.approx(0.5, rel=1e-3)
+    assert coverage.path.volume_ml == pytest.approx(0.5, rel=1e-6)
+
+
+def test_planned_duration_matches_run():
+    async def scenario():
+        controller = DeviceController(SimulatedBackend())
+        assert await controller.initialize()
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        summary = await controller.cover_wound(TreatmentType.CLEANING, [WOUND.tolist()], 5.0, {'volume_ml': 0.5})
+        return summary, loop.time() - started
+
+    summary, elapsed = run_simulated(scenario())
+    assert elapsed == pytest.approx(summary['duration_s'], abs=0.05)
@@ -0,0 +1,76 @@
+"""
+DeviceController on the simulated backend and virtual clock: treatments dispense what they report,
+and an emergency stop aborts them
+
+Usage: python -m pytest tests
+"""
+
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from device_controller import DeviceController, DeviceState, TreatmentType  # noqa: E402
+from hardware import MotionStopped, SimulatedBackend  # noqa: E402
+from simulator import run_simulated  # noqa: E402
+
+GLUE_AT = {'x': 100.0, 'y': 100.0, 'z': 5.0}
+
+
+async def ready_controller() -> DeviceController:
+    controller = DeviceController(SimulatedBackend())
+    assert await controller.initialize()
+    return controller
+
+
+def test_glue_dispenses_requested_volume():
+    async def scenario():
+        controller = await ready_controller()
+        await controller.start_treatment(TreatmentType.SKIN_GLUE, GLUE_AT, {'volume_ml': 0.1})
+        return controller
+
+    controller = run_simulated(scenario())
+    assert controller.backend.dispensed_ml['skin_glue_pump'] == pytest.approx(0.1)
+    assert controller.state == DeviceState.IDLE
+
+
+@pytest.mark.parametrize("treatment", [TreatmentType.SKIN_GLUE, TreatmentType.CLEANING, TreatmentType.SANITIZING])
+def test_emergency_stop_aborts_dwell(treatment):
+    async def scenario():
+        controller = await ready_controller()
+        loop = asyncio.get_running_loop()
+        task = asyncio.create_task(controller.start_treatment(treatment, GLUE_AT, {'volume_ml': 0.1}))
+        await asyncio.sleep(3.0)
+        stopped_at = loop.time()
+        await controller.emergency_stop()
+        with pytest.raises(MotionStopped):
+            await task
+        return controller, loop.time() - stopped_at
+
+    controller, overrun = run_simulated(scenario())
+    assert overrun < 0.01
+    assert 0 < sum(controller.backend.dispensed_ml.values()) < 0.1
+    assert not controller.backend.valve_open and not any(controller.backend.flows.values())
+    # The stop holds until it is reset
+    assert controller.state == DeviceState.EMERGENCY
+    assert controller.is_emergency_stopped
+
+
+def test_emergency_stop_aborts_path():
+    seam = [{'x': 50.0 + 2.0 * i, 'y': 50.0, 'z': 5.0} for i in range(8)]
+
+    async def scenario():
+        controller = await ready_controller()
+        task = asyncio.create_task(controller.follow_path(TreatmentType.SKIN_GLUE, seam, 0.5, speed=2.0))
+        await asyncio.sleep(5.0)
+        await controller.emergency_stop()
+        with pytest.raises(MotionStopped):
+            await task
+        return controller
+
+    controller = run_simulated(scenario())
+    assert controller.state == DeviceState.EMERGENCY
+    assert not controller.snapshot().valve_open and not any(controller.snapshot().pump_flows)
@@ -0,0 +1,125 @@
+"""
+Device state model: in-place updates, one snapshot per version, snapshots that never alias live state
+
+Usage: python -m pytest tests
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from device_state import AXIS_NAMES, MachineState, WorkArea  # noqa: E402
+from hardware import PUMPS  # noqa: E402
+
+
+def test_snapshot_shared_until_state_changes():
+    state = MachineState()
+    first = state.snapshot()
+    assert state.snapshot() is first
+
+    state.set_position(10.0, 20.0, 5.0)
+    second = state.snapshot()
+    assert second is not first
+    assert second.version == first.version + 1
+    assert state.snapshot() is second
+
+
+def test_snapshots_do_not_alias_live_state():
+    state = MachineState()
+    state.set_position(10.0, 20.0, 5.0)
+    state.set_flow('skin_glue_pump', 12.5)
+    before = state.snapshot()
+    position = state.position
+
+    state.set_position(30.0, 40.0, 6.0)
+    state.stop_dispensing()
+
+    assert before.position == {'x': 10.0, 'y': 20.0, 'z': 5.0}
+    assert before.pump_flows[PUMPS.index('skin_glue_pump')] == 12.5
+    assert position == {'x': 10.0, 'y': 20.0, 'z': 5.0}
+    position['x'] = 99.0
+    assert state.position['x'] == 30.0
+    # Plain Python values, not views into the arrays
+    assert all(type(value) is float for value in before.axis_positions + before.pump_flows)
+
+
+def test_setters_write_in_place():
+    state = MachineState()
+    positions, flows = state.axis_positions, state.pump_flows
+
+    state.set_position(1.0, 2.0, 3.0)
+    state.set_axis('nozzle_rotation', 90.0)
+    state.set_flow('cleaning_pump', 4.0)
+    state.enable_axes(True)
+
+    assert state.axis_positions is positions and state.pump_flows is flows
+    assert positions.tolist() == [1.0, 2.0, 3.0, 90.0]
+    assert flows[PUMPS.index('cleaning_pump')] == 4.0
+    assert state.axis_enabled.all()
+    with pytest.raises(AttributeError):
+        state.unexpected = True
+
+
+def test_every_setter_bumps_version():
+    state = MachineState()
+    setters = [
+        lambda: state.set_position(1.0, 1.0, 1.0),
+        lambda: state.set_axis('z_axis', 2.0),
+        lambda: state.enable_axes(True),
+        lambda: state.enable_actuators(True),
+        lambda: state.set_flow('sanitizer_pump', 1.0),
+        lambda: state.set_valve(True),
+        lambda: state.set_calibrated(True),
+        lambda: state.stop_dispensing(),
+    ]
+    for version, setter in enumerate(setters, start=1):
+        setter()
+        assert state.version == version
+        assert state.snapshot().version == version
+
+
+def test_to_dict_layout():
+    state = MachineState()
+    state.set_position(10.0, 20.0, 5.0)
+    state.enable_actuators(True)
+    state.set_flow('skin_glue_pump', 6.0)
+    state.set_valve(True)
+
+    status = state.snapshot().to_dict()
+    assert status['current_position'] == {'x': 10.0, 'y': 20.0, 'z': 5.0}
+    assert list(status['motors']) == list(AXIS_NAMES)
+    assert status['motors']['y_axis'] == {'position': 20.0, 'enabled': False}
+    assert status['actuators']['skin_glue_pump'] == {'enabled': True, 'flow_rate': 6.0}
+    assert status['actuators']['nozzle_valve'] == {'enabled': True, 'open': True}
+    # Each call builds a new dict, so callers can't edit the snapshot
+    status['current_position']['x'] = 0.0
+    assert state.snapshot().to_dict()['current_position']['x'] == 10.0
+
+
+def test_stop_dispensing_is_one_change():
+    state = MachineState()
+    for pump in PUMPS:
+        state.set_flow(pump, 5.0)
+    state.set_valve(True)
+    version = state.version
+
+    state.stop_dispensing()
+
+    snapshot = state.snapshot()
+    assert snapshot.version == version + 1
+    assert snapshot.pump_flows == (0.0,) * len(PUMPS)
+    assert not snapshot.valve_open
+
+
+@pytest.mark.parametrize('point, inside', [
+    ((0.0, 0.0, 0.0), True),
+    ((200.0, 200.0, 50.0), True),
+    ((-0.1, 10.0, 10.0), False),
+    ((10.0, 200.1, 10.0), False),
+    ((10.0, 10.0, 50.1), False),
+])
+def test_work_area_contains(point, inside):
+    assert WorkArea().contains(*point) is inside
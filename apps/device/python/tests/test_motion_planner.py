@@ -0,0 +1,69 @@
+"""
+Point-to-point trajectories: S-curves are continuous, stay within limits and end exactly on target
+
+Usage: python -m pytest tests
+"""
+
+import math
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from motion_planner import DEFAULT_AXIS_LIMITS, plan_move, plan_profile  # noqa: E402
+
+# (distance mm, max velocity, acceleration, jerk): cruise reached, acceleration limit never reached,
+# neither reached
+PROFILES = [
+    (100.0, 150.0, 1500.0, 30000.0),
+    (20.0, 150.0, 1500.0, 5000.0),
+    (0.5, 150.0, 1500.0, 30000.0),
+]
+
+
+@pytest.mark.parametrize("distance, velocity, acceleration, jerk", PROFILES)
+def test_scurve_continuous_and_limited(distance, velocity, acceleration, jerk):
+    profile = plan_profile(distance, velocity, acceleration, jerk)
+    times = np.linspace(0.0, profile.duration, 100_001)
+    dt = times[1] - times[0]
+    position, speed, accel = profile.sample(times)
+
+    # No jumps: each quantity changes by at most what its derivative's limit allows per step
+    assert np.abs(np.diff(accel)).max() <= jerk * dt * (1 + 1e-6)
+    assert np.abs(np.diff(speed)).max() <= acceleration * dt * (1 + 1e-6)
+    assert np.all(np.diff(position) >= -1e-12)
+
+    assert speed.max() <= velocity * (1 + 1e-9)
+    assert np.abs(accel).max() <= acceleration * (1 + 1e-9)
+    assert position[0] == 0.0 and speed[0] == 0.0 and accel[0] == 0.0
+    assert position[-1] == pytest.approx(distance, abs=1e-9)
+    assert speed[-1] == pytest.approx(0.0, abs=1e-9) and accel[-1] == pytest.approx(0.0, abs=1e-6)
+
+
+def test_trapezoid_is_faster_than_scurve():
+    scurve = plan_profile(50.0, 150.0, 1500.0, 30000.0)
+    trapezoid = plan_profile(50.0, 150.0, 1500.0, math.inf)
+    assert trapezoid.duration < scurve.duration
+    assert trapezoid.sample([trapezoid.duration])[0][0] == 50.0
+
+
+@pytest.mark.parametrize("profile", ["scurve", "trapezoid"])
+def test_move_ends_on_target(profile):
+    start = {'x': 10.0, 'y': 120.0, 'z': 5.0}
+    end = {'x': 150.0, 'y': 30.0, 'z': 12.5}
+    plan = plan_move(start, end, profile=profile)
+
+    np.testing.assert_allclose(plan.position_at(plan.duration)[0], [150.0, 30.0, 12.5], atol=1e-9)
+    np.testing.assert_allclose(plan.position_at(0.0)[0], [10.0, 120.0, 5.0], atol=1e-12)
+    for axis, (a, b) in zip(('x', 'y', 'z'), [(10.0, 150.0), (120.0, 30.0), (5.0, 12.5)]):
+        steps = plan.step_times[axis]
+        assert len(steps) == round(abs(b - a) * DEFAULT_AXIS_LIMITS[axis].steps_per_mm)
+        assert np.all(np.diff(steps) >= 0) and steps[-1] <= plan.duration
+
+
+def test_speed_caps_path_velocity():
+    plan = plan_move({'x': 0.0, 'y': 0.0, 'z': 0.0}, {'x': 180.0, 'y': 0.0, 'z': 0.0}, speed=50.0)
+    assert plan.profile.peak_velocity == pytest.approx(50.0)
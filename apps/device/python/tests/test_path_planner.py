@@ -0,0 +1,67 @@
+"""
+Blended multi-waypoint paths: the bead gets the planned volume even though the nozzle slows at corners
+
+Usage: python -m pytest tests
+"""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from motion_planner import plan_path  # noqa: E402
+
+# A zig-zag seam: sharp corners the nozzle has to slow for
+SEAM = [{'x': 50.0 + 3.0 * i, 'y': 50.0 + (2.0 if i % 2 else 0.0), 'z': 5.0} for i in range(10)]
+
+
+def dispensed_ml(plan, samples=200_001):
+    times = np.linspace(0.0, plan.duration, samples)
+    flows = plan.flow_at(times)
+    return float(np.sum((flows[1:] + flows[:-1]) / 2.0 * np.diff(times))) / 60.0
+
+
+def seam_length(waypoints):
+    points = np.array([[w['x'], w['y'], w['z']] for w in waypoints])
+    return float(np.linalg.norm(np.diff(points, axis=0), axis=1).sum())
+
+
+@pytest.mark.parametrize("smooth", [False, True])
+def test_volume_through_blended_corners(smooth):
+    plan = plan_path(SEAM, 0.6, speed=10.0, smooth=smooth)
+    # 0.6 ml/min at 10 mm/s is 0.001 ml per mm, whatever speed the nozzle actually has
+    assert plan.volume_ml == pytest.approx(0.001 * plan.distance)
+    assert dispensed_ml(plan) == pytest.approx(plan.volume_ml, rel=1e-3)
+    if not smooth:
+        assert plan.distance == pytest.approx(seam_length(SEAM))
+
+
+def test_per_segment_flow():
+    rates = [0.6 if k % 2 else 0.0 for k in range(len(SEAM) - 1)]
+    plan = plan_path(SEAM, rates, speed=10.0)
+    lengths = np.diff(plan.offsets)
+    expected = sum(length * rate / 60.0 / 10.0 for length, rate in zip(lengths, rates))
+    assert dispensed_ml(plan) == pytest.approx(expected, rel=1e-3)
+
+
+def test_blends_instead_of_stopping():
+    plan = plan_path(SEAM, 0.6, speed=10.0)
+    assert plan.duration < plan.stop_and_go_duration
+    # Rest only at the ends
+    assert np.all(plan.corner_velocities[1:-1] > 0)
+    times = np.linspace(0.0, plan.duration, 10_001)[1:-1]
+    assert np.all(plan.profile.sample(times)[1] > 0)
+    np.testing.assert_allclose(plan.position_at(plan.duration)[0], [77.0, 52.0, 5.0], atol=1e-6)
+
+
+@pytest.mark.parametrize("waypoints, flow, message", [
+    (SEAM[:1], 0.6, "two waypoints"),
+    ([SEAM[0], SEAM[0]], 0.6, "no length"),
+    (SEAM, -0.1, "negative"),
+])
+def test_invalid_paths(waypoints, flow, message):
+    with pytest.raises(ValueError, match=message):
+        plan_path(waypoints, flow)
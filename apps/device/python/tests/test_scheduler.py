@@ -0,0 +1,94 @@
+"""
+Fixed-rate scheduler on the virtual clock: rates hold, priorities order releases, slow tasks don't block safety
+
+Usage: python -m pytest tests
+"""
+
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from scheduler import Scheduler  # noqa: E402
+from simulator import run_simulated  # noqa: E402
+
+
+def run_for(scheduler: Scheduler, seconds: float):
+    async def scenario():
+        loop = asyncio.get_running_loop()
+        loop.call_later(seconds, scheduler.stop)
+        await scheduler.run()
+
+    run_simulated(scenario())
+
+
+def test_rates_and_priority_order():
+    scheduler = Scheduler()
+    released = []
+
+    def recorder(name):
+        async def callback():
+            released.append((asyncio.get_running_loop().time(), name))
+        return callback
+
+    scheduler.add('ui', recorder('ui'), 5, priority=4)
+    scheduler.add('safety', recorder('safety'), 50, priority=0, critical=True)
+    scheduler.add('status', recorder('status'), 10, priority=3)
+    run_for(scheduler, 10.0)
+
+    stats = scheduler.stats()
+    assert stats['safety']['runs'] == pytest.approx(500, abs=1)
+    assert stats['status']['runs'] == pytest.approx(100, abs=1)
+    assert stats['ui']['runs'] == pytest.approx(50, abs=1)
+    assert all(entry['missed'] == 0 and entry['skipped'] == 0 for entry in stats.values())
+    # Released on the period grid, without drift
+    assert stats['safety']['jitter_ms']['max'] == pytest.approx(0.0, abs=1e-6)
+    # All three are due at t=0; the most urgent goes first
+    assert [name for at, name in released[:3]] == ['safety', 'status', 'ui']
+
+
+def test_slow_task_skips_without_holding_up_safety():
+    scheduler = Scheduler()
+
+    async def safety():
+        pass
+
+    async def slow_display():
+        await asyncio.sleep(0.45)
+
+    scheduler.add('safety', safety, 50, priority=0, critical=True)
+    scheduler.add('ui', slow_display, 5, priority=4)
+    run_for(scheduler, 10.0)
+
+    stats = scheduler.stats()
+    assert stats['safety']['runs'] == pytest.approx(500, abs=1)
+    assert stats['safety']['skipped'] == 0
+    # Each 0.45s display run overlaps the next 0.2s release or two
+    assert stats['ui']['overruns'] == stats['ui']['runs']
+    assert stats['ui']['skipped'] > 0
+
+
+def test_errors_counted_and_reported():
+    errors = []
+
+    async def on_error(e):
+        errors.append(e)
+
+    async def failing():
+        raise RuntimeError("sensor bus fault")
+
+    scheduler = Scheduler(on_error=on_error)
+    scheduler.add('commands', failing, 20, priority=1)
+    run_for(scheduler, 1.0)
+
+    runs = scheduler.stats()['commands']['runs']
+    assert runs >= 20
+    assert scheduler.stats()['commands']['errors'] == runs == len(errors)
+
+
+def test_rate_must_be_positive():
+    with pytest.raises(ValueError):
+        Scheduler().add('ui', None, 0, priority=4)
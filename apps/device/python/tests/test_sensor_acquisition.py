@@ -0,0 +1,130 @@
+"""
+Sensor ring buffers: wraparound, contiguous zero-copy views, cursors that count lost samples
+
+Usage: python -m pytest tests
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from sensor_acquisition import SampleRing, SensorAcquisition  # noqa: E402
+
+
+def filled(ring: SampleRing, count: int, start: int = 0) -> SampleRing:
+    # Sample i has timestamp i and value 10 * i, so contents are easy to check
+    for i in range(start, start + count):
+        ring.write(float(i), [10.0 * i])
+    return ring
+
+
+@pytest.mark.parametrize('written', [0, 3, 8, 9, 10, 25, 101])
+def test_last_across_wraparound(written):
+    ring = filled(SampleRing(8, ['value'], headroom=2), written)
+
+    for n in (1, 5, 8, 20):
+        times, values = ring.last(n)
+        expected = np.arange(max(0, written - min(n, 8)), written, dtype=np.float64)
+        np.testing.assert_array_equal(times, expected)
+        np.testing.assert_array_equal(values[:, 0], expected * 10)
+
+
+def test_reads_are_views():
+    ring = filled(SampleRing(8, ['value'], headroom=2), 21)
+
+    times, values = ring.last(8)
+    assert np.shares_memory(times, ring.times) and np.shares_memory(values, ring.values)
+    times, values = ring.window(100.0, max_points=3)
+    assert np.shares_memory(times, ring.times)
+
+
+def test_views_survive_headroom_writes():
+    ring = filled(SampleRing(8, ['value'], headroom=3), 13)
+    times, values = ring.last(8)
+    kept = times.copy()
+
+    # Full-history views hold for headroom more samples...
+    filled(ring, 3, start=13)
+    np.testing.assert_array_equal(times, kept)
+    np.testing.assert_array_equal(values[:, 0], kept * 10)
+    # ...and the next one laps the oldest
+    filled(ring, 1, start=16)
+    assert times[0] != kept[0]
+
+
+def test_window_and_decimation():
+    ring = filled(SampleRing(100, ['value']), 150)
+
+    times, _ = ring.window(9.5)
+    np.testing.assert_array_equal(times, np.arange(140, 150, dtype=np.float64))
+
+    times, _ = ring.window(1000.0, max_points=7)
+    assert len(times) <= 7
+    assert times[-1] == 149.0
+    assert np.all(np.diff(times) == np.diff(times)[0])
+
+
+def test_since_reports_lost_samples():
+    ring = SampleRing(8, ['value'], headroom=2)
+    times, _, cursor, lost = ring.since(0)
+    assert len(times) == 0 and cursor == 0 and lost == 0
+
+    filled(ring, 5)
+    times, _, cursor, lost = ring.since(cursor)
+    np.testing.assert_array_equal(times, np.arange(5, dtype=np.float64))
+    assert (cursor, lost) == (5, 0)
+
+    # Away long enough for the ring to lap: the newest capacity come back, the rest are counted
+    filled(ring, 20, start=5)
+    times, _, cursor, lost = ring.since(cursor)
+    np.testing.assert_array_equal(times, np.arange(17, 25, dtype=np.float64))
+    assert (cursor, lost) == (25, 12)
+
+    times, _, cursor, lost = ring.since(cursor)
+    assert len(times) == 0 and cursor == 25 and lost == 0
+
+
+def test_latest():
+    ring = SampleRing(4, ['x', 'y'])
+    assert ring.latest() is None
+
+    for i in range(11):
+        ring.write(float(i), [i, -i])
+    timestamp, values = ring.latest()
+    assert timestamp == 10.0
+    assert values.tolist() == [10.0, -10.0]
+
+
+def test_acquisition_samples_on_threads():
+    acquisition = SensorAcquisition()
+    readings = iter(range(1000000))
+
+    def failing():
+        raise OSError("I2C timeout")
+
+    ring = acquisition.add('pressure', lambda: float(next(readings)), rate_hz=200, history=1.0)
+    acquisition.add('temperature', failing, rate_hz=50)
+    with pytest.raises(ValueError):
+        acquisition.add('pressure', lambda: 0.0, rate_hz=10)
+    with pytest.raises(ValueError):
+        acquisition.add('humidity', lambda: 0.0, rate_hz=0)
+
+    acquisition.start()
+    try:
+        time.sleep(0.3)
+    finally:
+        acquisition.stop()
+
+    times, values = ring.last(ring.capacity)
+    assert len(times) > 20
+    assert np.all(np.diff(times) > 0)
+    np.testing.assert_array_equal(np.diff(values[:, 0]), 1.0)
+    stats = acquisition.stats()
+    assert stats['temperature']['errors'] > 0 and stats['temperature']['samples'] == 0
+    assert 'temperature' not in acquisition.readings()
+    assert acquisition.readings()['pressure']['value'] == values[-1, 0]
@@ -0,0 +1,81 @@
+"""
+Startup graph on the virtual clock: steps start when their prerequisites finish, failures cancel the rest
+
+Usage: python -m pytest tests
+"""
+
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from simulator import run_simulated  # noqa: E402
+from startup import run_steps  # noqa: E402
+
+
+def step(seconds: float, log=None, name=None, error=None):
+    async def run():
+        try:
+            await asyncio.sleep(seconds)
+        except asyncio.CancelledError:
+            if log is not None:
+                log.append(f"{name} cancelled")
+            raise
+        if error:
+            raise error
+        if log is not None:
+            log.append(name)
+    return run
+
+
+def test_independent_steps_overlap():
+    timings = run_simulated(run_steps({
+        'config': (step(0.5), []),
+        'motors': (step(2.0), ['config']),
+        'cameras': (step(1.5), ['config']),
+        'homing': (step(3.0), ['motors']),
+        'calibration': (step(1.0), ['cameras', 'motors']),
+    }))
+
+    starts = {name: offset for name, (offset, duration) in timings.items()}
+    durations = {name: duration for name, (offset, duration) in timings.items()}
+    assert starts['config'] == pytest.approx(0.0)
+    assert starts['motors'] == pytest.approx(0.5)
+    assert starts['cameras'] == pytest.approx(0.5)
+    # Waits for the slower of its two prerequisites, then overlaps homing
+    assert starts['calibration'] == pytest.approx(2.5)
+    assert starts['homing'] == pytest.approx(2.5)
+    assert durations == pytest.approx({'config': 0.5, 'motors': 2.0, 'cameras': 1.5, 'homing': 3.0,
+                                       'calibration': 1.0})
+
+
+def test_failure_cancels_running_steps():
+    log = []
+
+    async def scenario():
+        with pytest.raises(RuntimeError, match="motor driver"):
+            await run_steps({
+                'config': (step(0.5, log, 'config'), []),
+                'motors': (step(1.0, log, 'motors', RuntimeError("motor driver not found")), ['config']),
+                'cameras': (step(5.0, log, 'cameras'), ['config']),
+                'homing': (step(1.0, log, 'homing'), ['motors']),
+            })
+        return asyncio.get_running_loop().time()
+
+    failed_at = run_simulated(scenario())
+
+    assert failed_at == pytest.approx(1.5)
+    assert log == ['config', 'cameras cancelled']
+
+
+@pytest.mark.parametrize('steps, message', [
+    ({'a': (step(0), ['b']), 'b': (step(0), ['a'])}, "cycle: a -> b -> a"),
+    ({'a': (step(0), ['a'])}, "cycle: a -> a"),
+    ({'a': (step(0), ['missing'])}, "unknown step missing"),
+])
+def test_invalid_graphs(steps, message):
+    with pytest.raises(ValueError, match=message):
+        run_simulated(run_steps(steps))
@@ -0,0 +1,188 @@
+"""
+Status deltas: receivers rebuild the exact status, rate limits merge changes instead of dropping them, keyframes heal
+
+Usage: python -m pytest tests
+"""
+
+import asyncio
+import copy
+import os
+import sys
+import time
+
+import msgpack
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import status_publisher  # noqa: E402
+from status_publisher import StatusPublisher, apply_delta, diff_status  # noqa: E402
+
+
+class Clock:
+    def __init__(self):
+        # Ahead of the real clock, which Subscriber.token_time starts from
+        self.now = time.monotonic() + 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class Receiver:
+    """Plays the app: applies messages in order and checks each delta's base"""
+
+    def __init__(self):
+        self.status = None
+        self.seq = None
+        self.messages = []
+
+    def receive(self, payload: bytes):
+        message = msgpack.unpackb(payload, raw=False)
+        self.messages.append(message)
+        if message['t'] == 'k':
+            self.status = message['data']
+        else:
+            assert message['base'] == self.seq
+            apply_delta(self.status, message['data'], message['removed'])
+        self.seq = message['seq']
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(status_publisher.time, 'monotonic', clock)
+    return clock
+
+
+def make_publisher(**kwargs):
+    receivers = {}
+
+    async def send(subscriber_id, payload):
+        receivers.setdefault(subscriber_id, Receiver()).receive(payload)
+
+    return StatusPublisher(send, **kwargs), receivers
+
+
+def status_at(tick: int):
+    status = {
+        'state': 'treating' if tick % 7 else 'idle',
+        'position': {'x': 10.0 + tick * 0.5, 'y': 20.0, 'z': 5.0},
+        'sensors': {'pressure': 101.3, 'temperature': round(36.6 + (tick % 3) * 0.1, 1)},
+        'errors': ['pump'] if tick % 5 == 0 else [],
+    }
+    if tick % 4 == 0:
+        status['treatment'] = {'id': f"t{tick}", 'progress': tick / 100}
+    return status
+
+
+def test_diff_round_trip():
+    previous = {'a': 1, 'nested': {'b': 2.0, 'c': [1, 2], 'gone': True}, 'dropped': 'x'}
+    current = {'a': 1, 'nested': {'b': 2.5, 'c': [1, 2]}, 'new': {'d': None}}
+    changed, removed = diff_status(previous, current)
+
+    assert changed == {'nested': {'b': 2.5}, 'new': {'d': None}}
+    assert sorted(removed) == [['dropped'], ['nested', 'gone']]
+    assert apply_delta(copy.deepcopy(previous), changed, removed) == current
+
+
+def test_receiver_tracks_status(clock):
+    publisher, receivers = make_publisher()
+    publisher.subscribe('app')
+
+    for tick in range(1, 60):
+        clock.now += 0.1
+        asyncio.run(publisher.publish(status_at(tick)))
+        assert receivers['app'].status == status_at(tick)
+
+    kinds = [message['t'] for message in receivers['app'].messages]
+    # A keyframe on subscribe, then every 5 s of 0.1 s ticks
+    assert kinds[0] == 'k' and kinds.count('k') == 2
+    # Unchanged fields stay out of deltas
+    assert all('pressure' not in message['data'].get('sensors', {})
+               for message in receivers['app'].messages if message['t'] == 'd')
+
+
+def test_unchanged_status_sends_nothing(clock):
+    publisher, receivers = make_publisher()
+    publisher.subscribe('app')
+
+    for _ in range(10):
+        clock.now += 0.1
+        asyncio.run(publisher.publish(status_at(1)))
+
+    assert len(receivers['app'].messages) == 1
+    # Float noise below the precision isn't a change either
+    noisy = status_at(1)
+    noisy['sensors']['pressure'] += 1e-5
+    asyncio.run(publisher.publish(noisy))
+    assert len(receivers['app'].messages) == 1
+
+
+def test_rate_limit_merges_changes(clock):
+    publisher, receivers = make_publisher()
+    publisher.subscribe('fast')
+    publisher.subscribe('slow', max_rate_hz=2)
+
+    for tick in range(1, 41):
+        clock.now += 0.1
+        asyncio.run(publisher.publish(status_at(tick)))
+
+    stats = publisher.stats()['subscribers']
+    assert stats['fast']['messages'] == 40
+    # 4 s at 2 Hz, plus the keyframe on subscribe
+    assert stats['slow']['messages'] == pytest.approx(9, abs=1)
+    assert stats['slow']['rate_limited'] == 40 - stats['slow']['messages']
+    # The slow subscriber missed ticks but not changes: its last message carries them all
+    assert receivers['slow'].status == status_at(receivers['slow'].seq)
+    assert receivers['fast'].status == status_at(40)
+
+
+def test_byte_budget(clock):
+    publisher, receivers = make_publisher()
+    publisher.subscribe('link', max_bytes_per_s=200)
+
+    for tick in range(1, 101):
+        clock.now += 0.1
+        asyncio.run(publisher.publish(status_at(tick)))
+
+    sent = publisher.stats()['subscribers']['link']['bytes_sent']
+    # One second of burst on top of 10 s at the sustained rate; keyframes may overdraw by one
+    keyframe_size = len(msgpack.packb({'t': 'k', 'seq': 0, 'data': status_at(100)}, use_bin_type=True))
+    assert sent <= 200 * 11 + 2 * keyframe_size
+    assert publisher.stats()['subscribers']['link']['rate_limited'] > 0
+    assert receivers['link'].status == status_at(receivers['link'].seq)
+
+
+def test_failed_send_resyncs_with_keyframe(clock):
+    failures = {'count': 1}
+    receiver = Receiver()
+
+    async def send(subscriber_id, payload):
+        if failures['count'] and len(receiver.messages) == 3:
+            failures['count'] -= 1
+            raise ConnectionError("socket closed")
+        receiver.receive(payload)
+
+    publisher = StatusPublisher(send)
+    publisher.subscribe('app')
+    for tick in range(1, 8):
+        clock.now += 0.1
+        asyncio.run(publisher.publish(status_at(tick)))
+
+    kinds = [message['t'] for message in receiver.messages]
+    assert kinds == ['k', 'd', 'd', 'k', 'd', 'd']
+    assert receiver.status == status_at(7)
+
+
+def test_request_keyframe(clock):
+    publisher, receivers = make_publisher()
+    publisher.subscribe('app')
+    for tick in range(1, 4):
+        clock.now += 0.1
+        asyncio.run(publisher.publish(status_at(tick)))
+
+    publisher.request_keyframe('app')
+    clock.now += 0.1
+    asyncio.run(publisher.publish(status_at(4)))
+
+    assert [message['t'] for message in receivers['app'].messages] == ['k', 'd', 'd', 'k']
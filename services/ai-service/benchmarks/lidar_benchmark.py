@@ -0,0 +1,83 @@
+"""
+Benchmark the LiDAR measurement engine on synthetic depth maps
+
+Each frame is a slightly tilted skin plane with a paraboloid wound bowl of
+known volume, so the output doubles as an accuracy check.
+
+Usage: python benchmarks/lidar_benchmark.py [--repeats N]
+"""
+
+import argparse
+import math
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from lidar import measure_depth_map, measure_point_cloud  # noqa: E402
+
+RESOLUTIONS = [(256, 192), (640, 480), (1280, 960), (1920, 1440)]
+
+SKIN_DISTANCE_M = 0.30
+WOUND_RADIUS_M = 0.010
+WOUND_DEPTH_M = 0.004
+NOISE_M = 0.0002
+
+
+def synthetic_frame(width, height, rng):
+    """Depth map, intrinsics and true wound volume (ml) for one synthetic capture"""
+    scale = width / 256.0
+    intrinsics = {"fx": 212.0 * scale, "fy": 212.0 * scale, "cx": width / 2.0, "cy": height / 2.0}
+
+    x = (np.arange(width) - intrinsics["cx"]) / intrinsics["fx"] * SKIN_DISTANCE_M
+    y = (np.arange(height) - intrinsics["cy"]) / intrinsics["fy"] * SKIN_DISTANCE_M
+    xx, yy = np.meshgrid(x, y)
+
+    depth = SKIN_DISTANCE_M + 0.05 * xx + 0.02 * yy
+    r2 = (xx ** 2 + yy ** 2) / WOUND_RADIUS_M ** 2
+    depth += np.where(r2 < 1.0, WOUND_DEPTH_M * (1.0 - r2), 0.0)
+    depth += rng.normal(0.0, NOISE_M, depth.shape)
+
+    true_volume_ml = math.pi * WOUND_RADIUS_M ** 2 * WOUND_DEPTH_M / 2.0 * 1e6
+    return depth.astype(np.float32), intrinsics, true_volume_ml
+
+
+def time_call(fn, repeats):
+    fn()  # warm-up
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return result, np.median(timings) * 1000.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    print(f"{'resolution':>12} {'points':>9} {'depth map ms':>13} {'cloud ms':>9} "
+          f"{'volume ml':>10} {'true ml':>8} {'area cm2':>9}")
+
+    for width, height in RESOLUTIONS:
+        depth, intrinsics, true_volume = synthetic_frame(width, height, rng)
+
+        result, depth_ms = time_call(lambda: measure_depth_map(depth, intrinsics), args.repeats)
+
+        u = (np.arange(width) - intrinsics["cx"]) / intrinsics["fx"]
+        v = (np.arange(height) - intrinsics["cy"]) / intrinsics["fy"]
+        cloud = np.stack([u[None, :] * depth, v[:, None] * depth, depth], axis=-1).reshape(-1, 3)
+        _, cloud_ms = time_call(lambda: measure_point_cloud(cloud), args.repeats)
+
+        print(f"{width:>5}x{height:<6} {depth.size:>9} {depth_ms:>13.2f} {cloud_ms:>9.2f} "
+              f"{result['wound_volume_ml']:>10.3f} {true_volume:>8.3f} {result['surface_area_cm2']:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
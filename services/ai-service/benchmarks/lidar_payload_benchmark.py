@@ -0,0 +1,69 @@
+"""
+Compare LiDAR upload formats: JSON depth_map vs raw depth frame vs .npy
+
+Reports payload size and the time to turn the request body into a depth
+array (json.loads + np.asarray for JSON, zero-copy wrapping for binary).
+
+Usage: python benchmarks/lidar_payload_benchmark.py [--repeats N]
+"""
+
+import argparse
+import io
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from depth_format import decode_depth_frame, decode_npy, encode_depth_frame  # noqa: E402
+
+RESOLUTIONS = [(256, 192), (640, 480), (1280, 960)]
+
+
+def time_call(fn, repeats):
+    fn()
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return np.median(timings) * 1000.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'resolution':>12} {'format':>14} {'bytes':>11} {'parse ms':>10}")
+
+    for width, height in RESOLUTIONS:
+        depth = (0.3 + rng.normal(0.0, 0.002, (height, width))).astype(np.float32)
+        intrinsics = {"fx": 212.0 * width / 256, "fy": 212.0 * width / 256,
+                      "cx": width / 2.0, "cy": height / 2.0}
+
+        json_body = json.dumps({"depth_map": depth.tolist(), "intrinsics": intrinsics}).encode()
+        frame_f32 = encode_depth_frame(depth, intrinsics)
+        frame_u16 = encode_depth_frame(np.round(depth * 10000).astype(np.uint16), intrinsics, 1e-4)
+        npy_buffer = io.BytesIO()
+        np.save(npy_buffer, depth)
+        npy_body = npy_buffer.getvalue()
+
+        cases = [
+            ("json", json_body,
+             lambda: np.asarray(json.loads(json_body)["depth_map"], dtype=np.float32)),
+            ("frame float32", frame_f32, lambda: decode_depth_frame(frame_f32)),
+            ("frame uint16", frame_u16, lambda: decode_depth_frame(frame_u16)),
+            ("npy", npy_body, lambda: decode_npy(npy_body)),
+        ]
+        for name, body, parse in cases:
+            parse_ms = time_call(parse, args.repeats)
+            print(f"{width:>5}x{height:<6} {name:>14} {len(body):>11} {parse_ms:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,314 @@
+"""
+Load test for the AI service endpoints
+
+Drives /analyze-wound, /analyze-vitals and /process-lidar (JSON and binary)
+with synthetic images, vitals and depth maps at a fixed concurrency, then
+writes a JSON report with throughput, latency percentiles and peak server
+RSS that can be diffed between commits.
+
+Server modes:
+    subprocess  start `uvicorn main:app` on a free port (default; RSS is the server's own)
+    inprocess   call the ASGI app directly through httpx (RSS includes the load generator)
+    external    hit an already running service at --url
+
+Usage:
+    python benchmarks/load_test.py --concurrency 16 --requests 500 --output report.json
+    python benchmarks/load_test.py --compare baseline.json --output report.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import socket
+import subprocess
+import sys
+import time
+from contextlib import AsyncExitStack
+from typing import Any, Callable, Dict, List, Optional
+
+import cv2
+import httpx
+import numpy as np
+
+SERVICE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, SERVICE_DIR)
+
+from depth_format import encode_depth_frame  # noqa: E402
+
+SCENARIOS = ("wound", "vitals", "lidar", "lidar-binary")
+
+
+class Payloads:
+    """Synthetic request bodies, built once so generation isn't measured"""
+
+    def __init__(self, image_size: int, depth_size: int, unique_images: int, seed: int):
+        rng = np.random.default_rng(seed)
+
+        self.images = []
+        for _ in range(unique_images):
+            image = np.full((image_size, image_size * 4 // 3, 3), (150, 170, 210), dtype=np.uint8)
+            center = tuple(int(c) for c in rng.integers(image_size // 4, image_size // 2, size=2))
+            cv2.ellipse(image, center, (image_size // 8, image_size // 12), 0, 0, 360, (60, 60, 170), -1)
+            image = cv2.add(image, rng.integers(0, 20, image.shape, dtype=np.uint8))
+            self.images.append(cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, 90])[1].tobytes())
+
+        height, width = depth_size * 3 // 4, depth_size
+        intrinsics = {"fx": 212.0 * width / 256, "fy": 212.0 * width / 256,
+                      "cx": width / 2.0, "cy": height / 2.0}
+        u = (np.arange(width) - intrinsics["cx"]) / intrinsics["fx"] * 0.3
+        v = (np.arange(height) - intrinsics["cy"]) / intrinsics["fy"] * 0.3
+        r2 = (u[None, :] ** 2 + v[:, None] ** 2) / 0.01 ** 2
+        depth = 0.3 + np.where(r2 < 1.0, 0.004 * (1.0 - r2), 0.0) + rng.normal(0, 0.0002, r2.shape)
+        depth = depth.astype(np.float32)
+
+        self.depth_json = json.dumps({"depth_map": depth.tolist(), "intrinsics": intrinsics}).encode()
+        self.depth_frame = encode_depth_frame(depth, intrinsics)
+
+        self.vitals = [
+            json.dumps({
+                "heart_rate": int(rng.normal(78, 8)),
+                "blood_pressure": "120/80",
+                "temperature": round(float(rng.normal(98.6, 0.4)), 1),
+                "oxygen_saturation": int(np.clip(rng.normal(97, 1.5), 85, 100)),
+            }).encode()
+            for _ in range(64)
+        ]
+
+
+def request_factory(scenario: str, payloads: Payloads) -> Callable[[httpx.AsyncClient, int], Any]:
+    if scenario == "wound":
+        def send(client, i):
+            image = payloads.images[i % len(payloads.images)]
+            return client.post("/analyze-wound", files={"file": (f"frame{i}.jpg", image, "image/jpeg")})
+    elif scenario == "vitals":
+        def send(client, i):
+            return client.post("/analyze-vitals", content=payloads.vitals[i % len(payloads.vitals)],
+                               headers={"content-type": "application/json"})
+    elif scenario == "lidar":
+        def send(client, i):
+            return client.post("/process-lidar", content=payloads.depth_json,
+                               headers={"content-type": "application/json"})
+    elif scenario == "lidar-binary":
+        def send(client, i):
+            return client.post("/process-lidar/binary", content=payloads.depth_frame,
+                               headers={"content-type": "application/octet-stream"})
+    else:
+        raise ValueError(f"Unknown scenario: {scenario}")
+    return send
+
+
+async def run_scenario(client: httpx.AsyncClient,
+                       send: Callable,
+                       total: int,
+                       concurrency: int) -> Dict[str, Any]:
+    """Issue total requests from concurrency workers and summarize the latencies"""
+    latencies = np.zeros(total, dtype=np.float64)
+    statuses: Dict[str, int] = {}
+    counter = iter(range(total))
+
+    async def worker():
+        for i in counter:
+            started = time.perf_counter()
+            try:
+                response = await send(client, i)
+                status = str(response.status_code)
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            latencies[i] = time.perf_counter() - started
+            statuses[status] = statuses.get(status, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies_ms = latencies * 1000.0
+    p50, p95, p99 = np.percentile(latencies_ms, [50, 95, 99])
+    return {
+        "requests": total,
+        "concurrency": concurrency,
+        "duration_s": round(elapsed, 3),
+        "throughput_rps": round(total / elapsed, 2),
+        "latency_ms": {
+            "mean": round(float(latencies_ms.mean()), 3),
+            "p50": round(float(p50), 3),
+            "p95": round(float(p95), 3),
+            "p99": round(float(p99), 3),
+            "max": round(float(latencies_ms.max()), 3),
+        },
+        "status_counts": statuses,
+        "errors": sum(count for status, count in statuses.items() if status != "200"),
+    }
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def peak_rss_bytes(pid: Optional[int] = None) -> Optional[int]:
+    """High-water RSS of pid (from /proc) or of this process"""
+    if pid is None:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=SERVICE_DIR, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def wait_until_healthy(client: httpx.AsyncClient, timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            if (await client.get("/health")).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        if time.monotonic() > deadline:
+            raise RuntimeError("Service did not become healthy in time")
+        await asyncio.sleep(0.2)
+
+
+async def run(args) -> Dict[str, Any]:
+    payloads = Payloads(args.image_size, args.depth_size, args.unique_images, args.seed)
+    server = None
+    app = None
+    lifespan = AsyncExitStack()
+    timeout = httpx.Timeout(60.0)
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+
+    if args.mode == "inprocess":
+        import main
+        app = main.app
+        # Runs the app's startup and shutdown handlers
+        await lifespan.enter_async_context(app.router.lifespan_context(app))
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app),
+                                   base_url="http://loadtest", timeout=timeout)
+    else:
+        url = args.url
+        if args.mode == "subprocess":
+            port = free_port()
+            url = f"http://127.0.0.1:{port}"
+            server = subprocess.Popen(
+                [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1",
+                 "--port", str(port), "--log-level", "warning"],
+                cwd=SERVICE_DIR
+            )
+        client = httpx.AsyncClient(base_url=url, timeout=timeout, limits=limits)
+
+    try:
+        await wait_until_healthy(client)
+
+        results = {}
+        for scenario in args.scenarios:
+            send = request_factory(scenario, payloads)
+            # Warm connections, caches of lazily loaded models, etc.
+            await run_scenario(client, send, min(args.concurrency, args.requests), args.concurrency)
+            results[scenario] = await run_scenario(client, send, args.requests, args.concurrency)
+            print(f"{scenario:>13}: {results[scenario]['throughput_rps']:>9.1f} req/s  "
+                  f"p50 {results[scenario]['latency_ms']['p50']:>8.2f} ms  "
+                  f"p99 {results[scenario]['latency_ms']['p99']:>8.2f} ms  "
+                  f"errors {results[scenario]['errors']}", file=sys.stderr)
+
+        if server is not None:
+            peak_rss = peak_rss_bytes(server.pid)
+        elif app is not None:
+            peak_rss = peak_rss_bytes()
+        else:
+            peak_rss = None
+
+        return {
+            "revision": git_revision(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "host": {"python": platform.python_version(), "machine": platform.machine(),
+                     "cpus": os.cpu_count()},
+            "config": {
+                "mode": args.mode,
+                "concurrency": args.concurrency,
+                "requests": args.requests,
+                "image_size": args.image_size,
+                "depth_size": args.depth_size,
+                "unique_images": args.unique_images,
+                "env": {k: v for k, v in os.environ.items()
+                        if k in ("BATCH_SIZE", "BATCH_MAX_WAIT_MS", "MAX_WORKERS", "WORKER_MODE",
+                                 "WORKER_QUEUE_DEPTH", "MODEL_INPUT_SIZE", "CACHE_MAX_MB")},
+            },
+            "peak_rss_bytes": peak_rss,
+            "scenarios": results,
+        }
+    finally:
+        await client.aclose()
+        await lifespan.aclose()
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=10)
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any]) -> List[str]:
+    """Human-readable relative change against a baseline report"""
+    def change(new, old):
+        return f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+
+    lines = [f"vs {baseline.get('revision') or 'baseline'}:"]
+    for scenario, result in report["scenarios"].items():
+        old = baseline.get("scenarios", {}).get(scenario)
+        if not old:
+            continue
+        lines.append(
+            f"{scenario:>13}: throughput {change(result['throughput_rps'], old['throughput_rps'])}  "
+            f"p50 {change(result['latency_ms']['p50'], old['latency_ms']['p50'])}  "
+            f"p99 {change(result['latency_ms']['p99'], old['latency_ms']['p99'])}"
+        )
+    if report.get("peak_rss_bytes") and baseline.get("peak_rss_bytes"):
+        lines.append(f"{'peak RSS':>13}: {change(report['peak_rss_bytes'], baseline['peak_rss_bytes'])}")
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the StitchMe AI service")
+    parser.add_argument("--mode", choices=("subprocess", "inprocess", "external"), default="subprocess")
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="service URL for --mode external")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario")
+    parser.add_argument("--image-size", type=int, default=1440, help="synthetic image height (px)")
+    parser.add_argument("--depth-size", type=int, default=256, help="synthetic depth map width (px)")
+    parser.add_argument("--unique-images", type=int, default=200,
+                        help="distinct images to cycle through; lower it to exercise the result cache")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    parser.add_argument("--compare", help="baseline JSON report to compare against")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare) as f:
+            print("\n".join(compare(report, json.load(f))), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Wound preprocessing benchmark
+
+Times each stage of the ROI pipeline on synthetic skin images with a wound
+of known position, against decoding and resizing the whole frame, and
+checks the detected region contains the wound.
+
+Usage:
+    python benchmarks/preprocess_benchmark.py [--input-size 512] [--repeat 20]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from image_decoding import decode_image  # noqa: E402
+from preprocessing import wound_input  # noqa: E402
+
+SIZES = [(1280, 960), (1920, 1440), (4032, 3024)]
+
+SKIN_BGR = (150, 170, 210)
+WOUND_BGR = (60, 60, 170)
+
+
+def synthetic_capture(width: int, height: int, wound_fraction: float = 0.12, seed: int = 0):
+    """Skin-toned JPEG with an off-center elliptical wound; returns (jpeg, png, wound box fractions)"""
+    rng = np.random.default_rng(seed)
+    image = np.empty((height, width, 3), dtype=np.uint8)
+    image[:] = SKIN_BGR
+    # Low-amplitude, smooth texture; white noise would make JPEGs unrealistically large
+    texture = cv2.resize(rng.integers(0, 12, (height // 8, width // 8, 3), dtype=np.uint8),
+                         (width, height), interpolation=cv2.INTER_LINEAR)
+    image = cv2.add(image, texture)
+
+    axes = (int(width * wound_fraction / 2), int(width * wound_fraction / 3))
+    center = (int(width * 0.62), int(height * 0.4))
+    cv2.ellipse(image, center, axes, 20, 0, 360, WOUND_BGR, -1)
+
+    box = ((center[0] - axes[0]) / width, (center[1] - axes[0]) / height,
+           (center[0] + axes[0]) / width, (center[1] + axes[0]) / height)
+    jpeg = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, 90])[1].tobytes()
+    png = cv2.imencode(".png", image, [cv2.IMWRITE_PNG_COMPRESSION, 1])[1].tobytes()
+    return jpeg, png, box
+
+
+def contains(region, box, tolerance=0.02):
+    return (region[0] <= box[0] + tolerance and region[1] <= box[1] + tolerance and
+            region[2] >= box[2] - tolerance and region[3] >= box[3] - tolerance)
+
+
+def full_frame(buffer, input_size):
+    image = decode_image(buffer, target_size=input_size)
+    return cv2.resize(image, (input_size, input_size), interpolation=cv2.INTER_AREA)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark wound preprocessing")
+    parser.add_argument("--input-size", type=int, default=512)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    # First call pays OpenCV's lazy initialization
+    wound_input(synthetic_capture(640, 480)[0], args.input_size)
+
+    print(f"{'capture':>16} {'format':>6} {'full frame':>11} {'roi total':>10} "
+          f"{'decode':>8} {'detect':>8} {'crop':>8} {'resize':>8}  region ok")
+    for width, height in SIZES:
+        jpeg, png, box = synthetic_capture(width, height)
+        for name, buffer in (("jpeg", jpeg), ("png", png)):
+            started = time.perf_counter()
+            for _ in range(args.repeat):
+                full_frame(buffer, args.input_size)
+            baseline_ms = (time.perf_counter() - started) / args.repeat * 1000
+
+            totals = {}
+            started = time.perf_counter()
+            for _ in range(args.repeat):
+                _, region, timings = wound_input(buffer, args.input_size)
+                for stage, seconds in timings.items():
+                    totals[stage] = totals.get(stage, 0.0) + seconds
+            roi_ms = (time.perf_counter() - started) / args.repeat * 1000
+            stage_ms = {stage: seconds / args.repeat * 1000 for stage, seconds in totals.items()}
+
+            ok = region is not None and contains(region, box)
+            print(f"{f'{width}x{height}':>16} {name:>6} {baseline_ms:>9.2f}ms {roi_ms:>8.2f}ms "
+                  f"{stage_ms['decode']:>6.2f}ms {stage_ms['detect']:>6.2f}ms "
+                  f"{stage_ms['crop']:>6.2f}ms {stage_ms['resize']:>6.2f}ms  {ok}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Binary depth frame formats
+Zero-copy parsing of raw depth buffers and .npy payloads for LiDAR uploads
+
+Raw frames are a fixed little-endian header followed by row-major samples:
+
+    offset  type      field
+    0       4s        magic b"SMDP"
+    4       u8        format version (1)
+    5       u8        sample type (0 = float32, 1 = uint16)
+    6       u16       reserved
+    8       u32       width
+    12      u32       height
+    16      f32 x 4   fx, fy, cx, cy (pixels)
+    32      f32       depth scale (sample units to meters)
+    36      ...       width * height samples
+"""
+
+import io
+import struct
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+DEPTH_MAGIC = b"SMDP"
+DEPTH_FORMAT_VERSION = 1
+DEPTH_HEADER = struct.Struct("<4sBBHII5f")
+
+DEPTH_SAMPLE_TYPES = {
+    0: np.dtype("<f4"),
+    1: np.dtype("<u2"),
+}
+
+NPY_CONTENT_TYPES = ("application/x-npy", "application/npy")
+
+
+def encode_depth_frame(depth: np.ndarray,
+                       intrinsics: Dict[str, float],
+                       depth_scale: float = 1.0) -> bytes:
+    """Serialize a float32 or uint16 depth map into the raw frame format"""
+    depth = np.asarray(depth)
+    for code, dtype in DEPTH_SAMPLE_TYPES.items():
+        if depth.dtype == dtype.newbyteorder("="):
+            sample_type = code
+            break
+    else:
+        raise ValueError(f"Unsupported depth sample type: {depth.dtype}")
+
+    height, width = depth.shape
+    header = DEPTH_HEADER.pack(
+        DEPTH_MAGIC, DEPTH_FORMAT_VERSION, sample_type, 0, width, height,
+        intrinsics["fx"], intrinsics["fy"], intrinsics["cx"], intrinsics["cy"],
+        depth_scale
+    )
+    return header + depth.astype(DEPTH_SAMPLE_TYPES[sample_type], copy=False).tobytes()
+
+
+def decode_depth_frame(buffer) -> Tuple[np.ndarray, Dict[str, float], float]:
+    """Wrap a raw depth frame without copying; returns (depth, intrinsics, depth_scale)"""
+    if len(buffer) < DEPTH_HEADER.size:
+        raise ValueError("Depth frame is shorter than its header")
+
+    (magic, version, sample_type, _, width, height,
+     fx, fy, cx, cy, depth_scale) = DEPTH_HEADER.unpack_from(buffer)
+    if magic != DEPTH_MAGIC:
+        raise ValueError("Not a depth frame (bad magic)")
+    if version != DEPTH_FORMAT_VERSION:
+        raise ValueError(f"Unsupported depth frame version: {version}")
+    if sample_type not in DEPTH_SAMPLE_TYPES:
+        raise ValueError(f"Unknown depth sample type: {sample_type}")
+
+    dtype = DEPTH_SAMPLE_TYPES[sample_type]
+    expected = DEPTH_HEADER.size + width * height * dtype.itemsize
+    if len(buffer) != expected:
+        raise ValueError(f"Depth frame is {len(buffer)} bytes, expected {expected} for {width}x{height}")
+
+    depth = np.frombuffer(buffer, dtype=dtype, count=width * height,
+                          offset=DEPTH_HEADER.size).reshape(height, width)
+    intrinsics = {"fx": fx, "fy": fy, "cx": cx, "cy": cy}
+    return depth, intrinsics, depth_scale
+
+
+def decode_npy(buffer) -> np.ndarray:
+    """Wrap a .npy payload without copying the array data"""
+    header = io.BytesIO(memoryview(buffer)[:4096])
+    try:
+        version = np.lib.format.read_magic(header)
+        if version == (1, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(header)
+        else:
+            shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(header)
+    except ValueError as e:
+        raise ValueError(f"Invalid .npy payload: {e}")
+
+    if dtype.hasobject:
+        raise ValueError("Object arrays are not accepted")
+
+    count = int(np.prod(shape))
+    offset = header.tell()
+    if len(buffer) < offset + count * dtype.itemsize:
+        raise ValueError(".npy payload is truncated")
+
+    array = np.frombuffer(buffer, dtype=dtype, count=count, offset=offset)
+    return array.reshape(shape, order="F" if fortran_order else "C")
+
+
+def decode_depth_payload(buffer,
+                         content_type: Optional[str] = None) -> Tuple[np.ndarray, Optional[Dict[str, float]], float]:
+    """Decode either payload form; .npy carries no intrinsics or scale"""
+    if (content_type or "").split(";")[0].strip() in NPY_CONTENT_TYPES or bytes(buffer[:6]) == b"\x93NUMPY":
+        return decode_npy(buffer), None, 1.0
+    return decode_depth_frame(buffer)
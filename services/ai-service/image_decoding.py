@@ -0,0 +1,136 @@
+"""
+Image decoding helpers for the AI service
+Decodes uploaded image bytes straight into BGR ndarrays without a PIL round-trip
+"""
+
+import io
+import struct
+import tarfile
+import zipfile
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+JPEG_SOI = b'\xff\xd8'
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.tif', '.tiff', '.webp')
+
+# Start-of-frame markers that carry the image dimensions (excludes DHT/JPG/DAC)
+_JPEG_SOF_MARKERS = {
+    0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7,
+    0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF,
+}
+
+# libjpeg can scale by 1/2, 1/4 and 1/8 during the IDCT, far cheaper than a resize
+_REDUCED_COLOR_FLAGS = (
+    (8, cv2.IMREAD_REDUCED_COLOR_8),
+    (4, cv2.IMREAD_REDUCED_COLOR_4),
+    (2, cv2.IMREAD_REDUCED_COLOR_2),
+)
+
+
+def is_jpeg(buffer) -> bool:
+    """Check whether the buffer starts with a JPEG SOI marker"""
+    return bytes(buffer[:2]) == JPEG_SOI
+
+
+def jpeg_dimensions(buffer) -> Optional[Tuple[int, int]]:
+    """Read (width, height) from the JPEG frame header without decoding pixels"""
+    view = memoryview(buffer)
+    if bytes(view[:2]) != JPEG_SOI:
+        return None
+
+    offset = 2
+    length = len(view)
+    while offset + 4 <= length:
+        if view[offset] != 0xFF:
+            return None
+        marker = view[offset + 1]
+        # Fill bytes and standalone markers have no length field
+        if marker == 0xFF:
+            offset += 1
+            continue
+        if marker == 0x01 or 0xD0 <= marker <= 0xD7:
+            offset += 2
+            continue
+
+        segment_length = struct.unpack('>H', view[offset + 2:offset + 4])[0]
+        if marker in _JPEG_SOF_MARKERS:
+            if offset + 9 > length:
+                return None
+            height, width = struct.unpack('>HH', view[offset + 5:offset + 9])
+            return width, height
+        if marker == 0xDA:  # Start of scan, no frame header found before the data
+            return None
+        offset += 2 + segment_length
+
+    return None
+
+
+def reduced_decode_flag(width: int, height: int, target_size: int) -> int:
+    """Pick the largest libjpeg downscale that keeps the long edge >= target_size"""
+    long_edge = max(width, height)
+    for factor, flag in _REDUCED_COLOR_FLAGS:
+        if long_edge // factor >= target_size:
+            return flag
+    return cv2.IMREAD_COLOR
+
+
+def decode_image(buffer, target_size: Optional[int] = None) -> np.ndarray:
+    """
+    Decode encoded image bytes into a BGR ndarray
+
+    The buffer is wrapped with np.frombuffer so no copy is made before
+    cv2.imdecode. When target_size is given and the image is a JPEG larger
+    than needed, it is decoded at a reduced resolution.
+    """
+    data = np.frombuffer(buffer, dtype=np.uint8)
+    if data.size == 0:
+        raise ValueError("Empty image payload")
+
+    flags = cv2.IMREAD_COLOR
+    if target_size and is_jpeg(data):
+        dimensions = jpeg_dimensions(buffer)
+        if dimensions:
+            flags = reduced_decode_flag(*dimensions, target_size)
+
+    image = cv2.imdecode(data, flags)
+    if image is None:
+        raise ValueError("Unable to decode image")
+
+    return image
+
+
+def extract_archive_images(buffer, max_images: int) -> List[Tuple[str, bytes]]:
+    """Read image members from a zip or tar archive, ordered by name"""
+    stream = io.BytesIO(buffer)
+    images = []
+
+    if zipfile.is_zipfile(stream):
+        with zipfile.ZipFile(stream) as archive:
+            names = sorted(
+                info.filename for info in archive.infolist()
+                if not info.is_dir() and info.filename.lower().endswith(IMAGE_EXTENSIONS)
+            )
+            if len(names) > max_images:
+                raise ValueError(f"Archive holds {len(names)} images, limit is {max_images}")
+            images = [(name, archive.read(name)) for name in names]
+    else:
+        stream.seek(0)
+        try:
+            with tarfile.open(fileobj=stream, mode='r:*') as archive:
+                members = sorted(
+                    (member for member in archive.getmembers()
+                     if member.isfile() and member.name.lower().endswith(IMAGE_EXTENSIONS)),
+                    key=lambda member: member.name
+                )
+                if len(members) > max_images:
+                    raise ValueError(f"Archive holds {len(members)} images, limit is {max_images}")
+                images = [(member.name, archive.extractfile(member).read()) for member in members]
+        except tarfile.TarError:
+            raise ValueError("Archive must be a zip or tar file")
+
+    if not images:
+        raise ValueError("Archive contains no images")
+    return images
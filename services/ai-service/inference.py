@@ -0,0 +1,183 @@
+"""
+Dynamic micro-batching for model inference
+Collects concurrent requests for a short window and runs them as one batch
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    """
+    Groups concurrent inference requests into batches
+
+    Callers await submit() with a single input tensor. A background task
+    collects up to max_batch_size inputs, waiting at most max_wait_ms after
+    the first one arrives, stacks them and calls predict_fn once. Each caller
+    gets back its own result. Batches are stacked into a buffer reused from
+    one batch to the next, so predict_fn must not hold on to its input.
+    """
+
+    def __init__(self,
+                 predict_fn: Callable[[np.ndarray], List[Any]],
+                 max_batch_size: int = 8,
+                 max_wait_ms: float = 5.0,
+                 latency_window: int = 2048):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._stack_buffer: Optional[np.ndarray] = None
+
+        self._latencies = deque(maxlen=latency_window)
+        self._batch_sizes = deque(maxlen=latency_window)
+        self._requests = 0
+        self._batches = 0
+        self._started_at = None
+
+    async def start(self):
+        """Start the batching task on the running event loop"""
+        if self._task is not None:
+            return
+        self._queue = asyncio.Queue()
+        # Single thread keeps the model off the event loop without oversubscribing cores
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="inference")
+        self._started_at = time.perf_counter()
+        self._task = asyncio.create_task(self._run())
+        logger.info(f"Micro-batcher started (max_batch_size={self.max_batch_size}, "
+                    f"max_wait_ms={self.max_wait * 1000:.1f})")
+
+    async def stop(self):
+        """Stop the batching task and fail anything still queued"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+        while not self._queue.empty():
+            _, future, _ = self._queue.get_nowait()
+            if not future.done():
+                future.set_exception(RuntimeError("Inference engine stopped"))
+
+        self._executor.shutdown(wait=False)
+        self._executor = None
+
+    async def submit(self, item: np.ndarray) -> Any:
+        """Queue one input tensor and wait for its result"""
+        if self._task is None:
+            raise RuntimeError("Inference engine is not running")
+
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, future, time.perf_counter()))
+        return await future
+
+    async def submit_many(self, items: List[np.ndarray]) -> List[Any]:
+        """Queue several inputs together so they share batches; results keep input order"""
+        return await asyncio.gather(*(self.submit(item) for item in items))
+
+    async def _collect_batch(self) -> List[tuple]:
+        """Wait for the first request, then fill the batch until full or the window closes"""
+        batch = [await self._queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            # Take whatever is already queued without paying for a timer
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    def _stack(self, items: List[np.ndarray]) -> np.ndarray:
+        """Stack inputs into the reused batch buffer, reallocating if the input shape changes"""
+        first = items[0]
+        buffer = self._stack_buffer
+        if buffer is None or buffer.shape[1:] != first.shape or buffer.dtype != first.dtype:
+            buffer = np.empty((self.max_batch_size, *first.shape), dtype=first.dtype)
+            self._stack_buffer = buffer
+        return np.stack(items, out=buffer[:len(items)])
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+
+        while True:
+            batch = await self._collect_batch()
+
+            # Drop requests whose callers already went away
+            batch = [entry for entry in batch if not entry[1].done()]
+            if not batch:
+                continue
+
+            try:
+                inputs = self._stack([item for item, _, _ in batch])
+                results = await loop.run_in_executor(self._executor, self.predict_fn, inputs)
+                if len(results) != len(batch):
+                    raise RuntimeError(
+                        f"Model returned {len(results)} results for a batch of {len(batch)}")
+            except Exception as e:
+                logger.error(f"Batch inference failed: {e}")
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            finished = time.perf_counter()
+            for (_, future, enqueued), result in zip(batch, results):
+                self._latencies.append(finished - enqueued)
+                if not future.done():
+                    future.set_result(result)
+
+            self._requests += len(batch)
+            self._batches += 1
+            self._batch_sizes.append(len(batch))
+
+    def stats(self) -> Dict[str, Any]:
+        """Throughput, batch size and latency percentiles since start"""
+        elapsed = time.perf_counter() - self._started_at if self._started_at else 0.0
+        latencies_ms = np.asarray(self._latencies, dtype=np.float64) * 1000.0
+
+        stats = {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "requests": self._requests,
+            "batches": self._batches,
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "requests_per_second": self._requests / elapsed if elapsed > 0 else 0.0,
+            "mean_batch_size": float(np.mean(self._batch_sizes)) if self._batch_sizes else 0.0,
+        }
+        if latencies_ms.size:
+            p50, p95, p99 = np.percentile(latencies_ms, [50, 95, 99])
+            stats.update({
+                "latency_p50_ms": float(p50),
+                "latency_p95_ms": float(p95),
+                "latency_p99_ms": float(p99),
+            })
+
+        return stats
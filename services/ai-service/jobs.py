@@ -0,0 +1,340 @@
+"""
+Asynchronous analysis jobs
+In-process priority queue with submit/poll, cancellation and webhook delivery
+"""
+
+import asyncio
+import bisect
+import ipaddress
+import itertools
+import logging
+import socket
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from urllib.parse import urlparse
+
+import httpx
+from fastapi import HTTPException
+
+logger = logging.getLogger(__name__)
+
+# Lower runs first; live treatment jumps ahead of routine and batch reprocessing
+JOB_PRIORITIES = {"live": 0, "normal": 1, "batch": 2}
+
+FINISHED_STATES = ("succeeded", "failed", "cancelled")
+
+# Webhook host allowlist entry that admits any host resolving only to public addresses
+ANY_PUBLIC_HOST = "*"
+
+
+class QueueFullError(Exception):
+    """Raised when the queue already holds its maximum number of waiting jobs"""
+
+
+@dataclass
+class Job:
+    """One queued analysis; run produces the result, cleanup releases its payload"""
+    id: str
+    kind: str
+    priority: str
+    run: Callable[[], Awaitable[Any]]
+    callback_url: Optional[str] = None
+    cleanup: Optional[Callable[[], Any]] = None
+    sequence: int = 0
+    status: str = "queued"
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Any = None
+    error: Optional[str] = None
+    status_code: Optional[int] = None
+    webhook_status: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "priority": self.priority,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "result": self.result,
+            "error": self.error,
+            "status_code": self.status_code,
+            "callback_url": self.callback_url,
+            "webhook_status": self.webhook_status,
+        }
+
+
+class JobQueue:
+    """
+    Priority queue of analysis jobs run by a fixed set of async workers
+
+    Jobs wait in an asyncio.PriorityQueue ordered by priority, then submission
+    order, so the number of analyses in flight stays at workers no matter how
+    many are submitted. Finished jobs are kept for result_ttl seconds for
+    polling. Everything lives in memory: queued and finished jobs are lost on
+    restart, and clients should resubmit anything they haven't collected.
+    """
+
+    def __init__(self,
+                 workers: int = 2,
+                 max_queued: int = 256,
+                 result_ttl: float = 3600.0,
+                 webhook_timeout: float = 10.0,
+                 webhook_retries: int = 3,
+                 webhook_hosts: Optional[List[str]] = None):
+        self.workers = workers
+        self.max_queued = max_queued
+        self.result_ttl = result_ttl
+        self.webhook_timeout = webhook_timeout
+        self.webhook_retries = webhook_retries
+        # Empty allows no callbacks; ANY_PUBLIC_HOST allows any host with only public addresses
+        self.webhook_hosts = set(webhook_hosts or [])
+
+        self._jobs: Dict[str, Job] = {}
+        # Sequence numbers of queued jobs per priority, ascending, for O(1) counts and O(log n) positions
+        self._waiting: Dict[str, List[int]] = {priority: [] for priority in JOB_PRIORITIES}
+        # (finished_at, job id) in finishing order; with one TTL for all, the oldest expire first
+        self._finished: deque = deque()
+        self._running = 0
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._webhooks: set = set()
+        self._client: Optional[httpx.AsyncClient] = None
+        self._sequence = itertools.count()
+        self._stopping = False
+
+        self.submitted = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.cancelled = 0
+
+    async def start(self):
+        if self._tasks:
+            return
+        self._stopping = False
+        self._queue = asyncio.PriorityQueue()
+        self._client = httpx.AsyncClient(timeout=self.webhook_timeout)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        logger.info(f"Job queue started ({self.workers} workers, max {self.max_queued} queued)")
+
+    async def stop(self):
+        """Stop the workers, cancelling queued jobs and any still running; no webhooks are sent"""
+        self._stopping = True
+        for task in [*self._tasks, *self._webhooks]:
+            task.cancel()
+        await asyncio.gather(*self._tasks, *self._webhooks, return_exceptions=True)
+        self._tasks = []
+
+        for job in self._jobs.values():
+            if job.status in ("queued", "running"):
+                self._finish(job, "cancelled", error="Service shutting down")
+
+        if self._client:
+            await self._client.aclose()
+            self._client = None
+
+    def validate_callback(self, callback_url: Optional[str]):
+        """
+        Raise ValueError unless callback_url is an http(s) URL on an allowed host
+
+        Hosts must be listed in webhook_hosts. With ANY_PUBLIC_HOST listed, other
+        hosts are accepted too, but are only called if they resolve to public
+        addresses (checked on every delivery).
+        """
+        if callback_url is None:
+            return
+        parsed = urlparse(callback_url)
+        if parsed.scheme not in ("http", "https") or not parsed.hostname:
+            raise ValueError("callback_url must be an http or https URL")
+        if not self.webhook_hosts:
+            raise ValueError("Webhooks are disabled: no callback hosts are configured")
+        if parsed.hostname not in self.webhook_hosts and ANY_PUBLIC_HOST not in self.webhook_hosts:
+            raise ValueError(f"callback_url host {parsed.hostname} is not allowed")
+
+    async def _check_public(self, callback_url: str):
+        """Raise ValueError unless every address the callback host resolves to is public"""
+        parsed = urlparse(callback_url)
+        if parsed.hostname in self.webhook_hosts:
+            return
+        loop = asyncio.get_running_loop()
+        try:
+            infos = await loop.getaddrinfo(parsed.hostname, parsed.port or 443, type=socket.SOCK_STREAM)
+        except socket.gaierror as e:
+            raise ValueError(f"callback host {parsed.hostname} does not resolve: {e}")
+        for info in infos:
+            address = ipaddress.ip_address(info[4][0].split("%")[0])
+            if not address.is_global:
+                raise ValueError(f"callback host {parsed.hostname} resolves to non-public address {address}")
+
+    def submit(self,
+               kind: str,
+               run: Callable[[], Awaitable[Any]],
+               priority: str = "normal",
+               callback_url: Optional[str] = None,
+               cleanup: Optional[Callable[[], Any]] = None) -> Job:
+        """Queue a job; raises ValueError for bad arguments and QueueFullError when full"""
+        if self._queue is None:
+            raise RuntimeError("Job queue is not running")
+        if priority not in JOB_PRIORITIES:
+            raise ValueError(f"Unknown priority {priority}, expected one of {', '.join(JOB_PRIORITIES)}")
+        self.validate_callback(callback_url)
+
+        self._evict_finished()
+        if self.queued >= self.max_queued:
+            raise QueueFullError(f"Job queue full ({self.max_queued} jobs waiting)")
+
+        job = Job(
+            id=uuid.uuid4().hex,
+            kind=kind,
+            priority=priority,
+            run=run,
+            callback_url=callback_url,
+            cleanup=cleanup,
+            sequence=next(self._sequence)
+        )
+        self._jobs[job.id] = job
+        self._waiting[priority].append(job.sequence)
+        self._queue.put_nowait((JOB_PRIORITIES[priority], job.sequence, job.id))
+        self.submitted += 1
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        self._evict_finished()
+        return self._jobs.get(job_id)
+
+    def position(self, job: Job) -> Optional[int]:
+        """How many queued jobs will run before this one (0 = next), or None if not queued"""
+        if job.status != "queued":
+            return None
+        ahead = sum(len(self._waiting[priority]) for priority, rank in JOB_PRIORITIES.items()
+                    if rank < JOB_PRIORITIES[job.priority])
+        return ahead + bisect.bisect_left(self._waiting[job.priority], job.sequence)
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a job that hasn't started; its queue entry is skipped when reached"""
+        job = self._jobs.get(job_id)
+        if job is None or job.status != "queued":
+            return False
+        self._finish(job, "cancelled")
+        return True
+
+    @property
+    def queued(self) -> int:
+        return sum(len(waiting) for waiting in self._waiting.values())
+
+    def _unqueue(self, job: Job):
+        """Drop a job that is leaving the queued state from the waiting counts"""
+        waiting = self._waiting[job.priority]
+        index = bisect.bisect_left(waiting, job.sequence)
+        if index < len(waiting) and waiting[index] == job.sequence:
+            del waiting[index]
+
+    async def _worker(self):
+        while True:
+            _, _, job_id = await self._queue.get()
+            job = self._jobs.get(job_id)
+            if job is None or job.status != "queued":
+                continue
+            await self._execute(job)
+
+    async def _execute(self, job: Job):
+        self._unqueue(job)
+        self._running += 1
+        job.status = "running"
+        job.started_at = time.time()
+        try:
+            result = await job.run()
+        except asyncio.CancelledError:
+            self._finish(job, "cancelled", error="Service shutting down")
+            raise
+        except HTTPException as e:
+            self._finish(job, "failed", error=str(e.detail), status_code=e.status_code)
+        except Exception as e:
+            logger.error(f"Job {job.id} ({job.kind}) failed: {e}")
+            self._finish(job, "failed", error=str(e), status_code=500)
+        else:
+            self._finish(job, "succeeded", result=result, status_code=200)
+
+    def _finish(self, job: Job, status: str, result: Any = None,
+                error: Optional[str] = None, status_code: Optional[int] = None):
+        if job.status == "queued":
+            self._unqueue(job)
+        elif job.status == "running":
+            self._running -= 1
+        job.status = status
+        job.finished_at = time.time()
+        self._finished.append((job.finished_at, job.id))
+        job.result = result
+        job.error = error
+        job.status_code = status_code
+        job.run = None
+
+        if status == "succeeded":
+            self.succeeded += 1
+        elif status == "failed":
+            self.failed += 1
+        else:
+            self.cancelled += 1
+
+        if job.cleanup:
+            try:
+                job.cleanup()
+            except Exception as e:
+                logger.warning(f"Cleanup for job {job.id} failed: {e}")
+            job.cleanup = None
+
+        if job.callback_url and not self._stopping:
+            task = asyncio.create_task(self._notify(job))
+            self._webhooks.add(task)
+            task.add_done_callback(self._webhooks.discard)
+
+    async def _notify(self, job: Job):
+        """POST the finished job to its callback URL, retrying with exponential backoff"""
+        try:
+            await self._check_public(job.callback_url)
+        except ValueError as e:
+            job.webhook_status = "refused"
+            logger.warning(f"Webhook for job {job.id} not sent: {e}")
+            return
+
+        payload = job.to_dict()
+        for attempt in range(self.webhook_retries + 1):
+            try:
+                response = await self._client.post(job.callback_url, json=payload)
+                if response.status_code < 500:
+                    job.webhook_status = f"delivered ({response.status_code})"
+                    return
+                job.webhook_status = f"failed ({response.status_code})"
+            except httpx.HTTPError as e:
+                job.webhook_status = f"failed ({type(e).__name__})"
+            if attempt < self.webhook_retries:
+                await asyncio.sleep(0.5 * 2 ** attempt)
+        logger.warning(f"Webhook for job {job.id} to {job.callback_url} gave up: {job.webhook_status}")
+
+    def _evict_finished(self):
+        """Forget finished jobs (and their results) older than result_ttl; O(1) per evicted job"""
+        cutoff = time.time() - self.result_ttl
+        while self._finished and self._finished[0][0] < cutoff:
+            _, job_id = self._finished.popleft()
+            self._jobs.pop(job_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        self._evict_finished()
+        by_priority = {priority: len(waiting) for priority, waiting in self._waiting.items()}
+        return {
+            "workers": self.workers,
+            "queued": sum(by_priority.values()),
+            "queued_by_priority": by_priority,
+            "running": self._running,
+            "max_queued": self.max_queued,
+            "submitted": self.submitted,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "cancelled": self.cancelled,
+        }
@@ -0,0 +1,429 @@
+"""
+LiDAR processing for 3D wound mapping
+Vectorized depth-map / point-cloud measurement of wound volume, area and depth
+"""
+
+import math
+from typing import Any, Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from depth_format import decode_depth_payload
+
+# Approximate ARKit sceneDepth intrinsics for the 256x192 depth map
+DEFAULT_INTRINSICS = {"fx": 212.0, "fy": 212.0, "cx": 128.0, "cy": 96.0}
+
+# Fraction of the frame on each side treated as surrounding skin when no mask is given
+SKIN_MARGIN = 0.15
+
+# Minimum depth below the skin plane that counts as wound, before noise adaptation
+MIN_WOUND_DEPTH_MM = 0.5
+
+# Grid spacing used to rasterize unorganized point clouds
+POINT_CLOUD_RESOLUTION_MM = 0.5
+
+# Finest grid spacing a client may ask for
+MIN_POINT_CLOUD_RESOLUTION_MM = 0.1
+
+# Side (mm) of the box around the cloud's median that wound and surrounding skin fit in;
+# points outside it are outliers
+POINT_CLOUD_MAX_EXTENT_MM = 300.0
+
+# Largest rasterization grid (about 40 bytes per cell while measuring)
+POINT_CLOUD_MAX_CELLS = 2_000_000
+
+DEPTH_HISTOGRAM_BINS = 10
+
+# Upper bound on samples used for the skin plane fit
+PLANE_FIT_MAX_POINTS = 50000
+
+
+def backproject(depth: np.ndarray,
+                u: np.ndarray,
+                v: np.ndarray,
+                intrinsics: Dict[str, float]) -> np.ndarray:
+    """Lift an (H, W) depth map sampled at pixel columns u and rows v to (H, W, 3) points"""
+    x_ray = ((u - intrinsics["cx"]) / intrinsics["fx"]).astype(np.float32)
+    y_ray = ((v - intrinsics["cy"]) / intrinsics["fy"]).astype(np.float32)
+
+    points = np.empty(depth.shape + (3,), dtype=np.float32)
+    np.multiply(x_ray[None, :], depth, out=points[..., 0])
+    np.multiply(y_ray[:, None], depth, out=points[..., 1])
+    points[..., 2] = depth
+    return points
+
+
+def fit_plane(points: np.ndarray) -> Tuple[np.ndarray, float]:
+    """
+    Total least squares plane through (N, 3) points
+
+    Returns (normal, offset) with normal . p + offset = 0 and the normal
+    pointing away from the camera, so positive distances lie below the skin.
+    """
+    centroid = points.mean(axis=0, dtype=np.float64)
+    centered = points - centroid
+    _, eigvecs = np.linalg.eigh(centered.T @ centered)
+    normal = eigvecs[:, 0]
+    if normal[2] < 0:
+        normal = -normal
+    return normal, float(-normal @ centroid)
+
+
+def robust_fit_plane(points: np.ndarray,
+                     iterations: int = 3,
+                     max_points: int = PLANE_FIT_MAX_POINTS) -> Tuple[np.ndarray, float, float]:
+    """Fit a plane, repeatedly dropping outliers beyond 3 robust sigmas; also returns RMS residual"""
+    # A plane needs nowhere near every sample; an even stride keeps the fit representative
+    step = max(1, len(points) // max_points)
+    inliers = points[::step]
+    normal, offset = fit_plane(inliers)
+
+    for _ in range(iterations):
+        residuals = inliers @ normal + offset
+        sigma = 1.4826 * np.median(np.abs(residuals - np.median(residuals)))
+        keep = np.abs(residuals) <= max(3.0 * sigma, 1e-6)
+        if keep.all() or keep.sum() < 3:
+            break
+        inliers = inliers[keep]
+        normal, offset = fit_plane(inliers)
+
+    residuals = inliers @ normal + offset
+    return normal, offset, float(np.sqrt(np.mean(residuals ** 2)))
+
+
+def triangulated_area(points: np.ndarray, mask: np.ndarray) -> float:
+    """Area of the mesh formed by grid quads whose four corners are all inside mask"""
+    quads = mask[:-1, :-1] & mask[1:, :-1] & mask[:-1, 1:] & mask[1:, 1:]
+    if not quads.any():
+        return 0.0
+
+    p00 = points[:-1, :-1][quads]
+    p10 = points[1:, :-1][quads]
+    p01 = points[:-1, 1:][quads]
+    p11 = points[1:, 1:][quads]
+
+    area = np.linalg.norm(np.cross(p10 - p00, p01 - p00), axis=1).sum(dtype=np.float64)
+    area += np.linalg.norm(np.cross(p01 - p11, p10 - p11), axis=1).sum(dtype=np.float64)
+    return 0.5 * float(area)
+
+
+def describe_depths(depth_mm: np.ndarray) -> Dict[str, Any]:
+    """Summary statistics and histogram of wound depths (mm)"""
+    if depth_mm.size == 0:
+        return {
+            "max_depth_mm": 0.0,
+            "avg_depth_mm": 0.0,
+            "depth_distribution": "none",
+            "histogram": {"bin_edges_mm": [], "counts": []}
+        }
+
+    mean = float(depth_mm.mean(dtype=np.float64))
+    std = float(depth_mm.std(dtype=np.float64))
+    counts, edges = np.histogram(depth_mm, bins=DEPTH_HISTOGRAM_BINS, range=(0.0, float(depth_mm.max())))
+
+    if mean <= 0 or std / mean < 0.35:
+        distribution = "uniform"
+    elif np.mean(((depth_mm - mean) / std) ** 3) > 0.5:
+        # Mostly shallow with a few deep spots
+        distribution = "localized"
+    else:
+        distribution = "variable"
+
+    return {
+        "max_depth_mm": round(float(depth_mm.max()), 2),
+        "avg_depth_mm": round(mean, 2),
+        "depth_distribution": distribution,
+        "histogram": {
+            "bin_edges_mm": np.round(edges.astype(np.float64), 3).tolist(),
+            "counts": counts.tolist()
+        }
+    }
+
+
+def _wound_threshold(fit_rms_m: float) -> float:
+    return max(MIN_WOUND_DEPTH_MM / 1000.0, 3.0 * fit_rms_m)
+
+
+_OPEN_KERNEL = np.ones((3, 3), dtype=np.uint8)
+
+# Box filter size applied to depth maps before measurement
+SMOOTHING_KERNEL = 3
+
+
+def _smooth_depth(depth: np.ndarray, valid: np.ndarray) -> np.ndarray:
+    """Box-filter depth over valid samples only (normalized convolution), zero elsewhere"""
+    weights = valid.astype(np.float32)
+    filled = np.where(valid, depth, 0.0).astype(np.float32)
+    if SMOOTHING_KERNEL <= 1:
+        return filled
+
+    kernel = (SMOOTHING_KERNEL, SMOOTHING_KERNEL)
+    summed = cv2.blur(filled, kernel, borderType=cv2.BORDER_REPLICATE)
+    counts = cv2.blur(weights, kernel, borderType=cv2.BORDER_REPLICATE)
+    smoothed = np.divide(summed, counts, out=np.zeros_like(summed), where=counts > 0)
+    smoothed[~valid] = 0.0
+    return smoothed
+
+
+def _clean_mask(mask: np.ndarray) -> np.ndarray:
+    """Morphological opening to drop isolated noise pixels from a wound mask"""
+    opened = cv2.morphologyEx(mask.view(np.uint8), cv2.MORPH_OPEN, _OPEN_KERNEL)
+    return opened.view(bool)
+
+
+def _measurement(volume_m3: float,
+                 surface_area_m2: float,
+                 opening_area_m2: float,
+                 depth_m: np.ndarray,
+                 fit_rms_m: float,
+                 valid_points: int) -> Dict[str, Any]:
+    return {
+        "depth_map_processed": True,
+        "wound_detected": depth_m.size > 0,
+        "wound_volume_ml": round(volume_m3 * 1e6, 3),
+        "surface_area_cm2": round(surface_area_m2 * 1e4, 3),
+        "opening_area_cm2": round(opening_area_m2 * 1e4, 3),
+        "depth_measurements": describe_depths(depth_m * 1000.0),
+        "plane_fit_rms_mm": round(fit_rms_m * 1000.0, 3),
+        "valid_points": valid_points,
+        "wound_points": int(depth_m.size),
+        "3d_model_url": None
+    }
+
+
+def measure_depth_map(depth: np.ndarray,
+                      intrinsics: Optional[Dict[str, float]] = None,
+                      wound_mask: Optional[np.ndarray] = None,
+                      u: Optional[np.ndarray] = None,
+                      v: Optional[np.ndarray] = None) -> Dict[str, Any]:
+    """
+    Measure a wound from an organized depth map in meters
+
+    The skin plane is fitted to wound_mask's complement, or to a border ring
+    of the frame when no mask is given. u and v are the pixel coordinates of
+    the depth columns and rows, for depth maps sampled at a stride.
+    """
+    depth = np.asarray(depth, dtype=np.float32)
+    if depth.ndim != 2 or min(depth.shape) < 2:
+        raise ValueError("Depth map must be a 2D array of at least 2x2")
+
+    intrinsics = intrinsics or DEFAULT_INTRINSICS
+    height, width = depth.shape
+    u = np.arange(width, dtype=np.float64) if u is None else np.asarray(u, dtype=np.float64)
+    v = np.arange(height, dtype=np.float64) if v is None else np.asarray(v, dtype=np.float64)
+
+    valid = np.isfinite(depth) & (depth > 0)
+    if valid.sum() < 3:
+        raise ValueError("Depth map has too few valid samples")
+
+    points = backproject(_smooth_depth(depth, valid), u, v, intrinsics)
+
+    if wound_mask is not None:
+        wound_mask = np.asarray(wound_mask, dtype=bool)
+        skin = valid & ~wound_mask
+    else:
+        margin_y = max(1, int(height * SKIN_MARGIN))
+        margin_x = max(1, int(width * SKIN_MARGIN))
+        skin = valid.copy()
+        skin[margin_y:height - margin_y, margin_x:width - margin_x] = False
+    if skin.sum() < 3:
+        raise ValueError("Not enough surrounding skin to fit a reference plane")
+
+    normal, offset, fit_rms = robust_fit_plane(points[skin])
+
+    # Perpendicular depth of every sample below the skin plane
+    depth_below = points @ normal.astype(np.float32) + np.float32(offset)
+
+    wound = valid & (depth_below > _wound_threshold(fit_rms))
+    wound &= wound_mask if wound_mask is not None else ~skin
+    wound = _clean_mask(wound)
+
+    # Footprint of each sample on the skin plane: t^2 / (fx fy |n . r|) per pixel,
+    # scaled by the sampling stride, where r is the pixel ray and t its plane depth
+    x_ray = (u - intrinsics["cx"]) / intrinsics["fx"]
+    y_ray = (v - intrinsics["cy"]) / intrinsics["fy"]
+    n_dot_r = np.abs(normal[0] * x_ray[None, :] + normal[1] * y_ray[:, None] + normal[2])
+    plane_depth = np.abs(offset) / n_dot_r
+    stride = (np.median(np.diff(u)) if width > 1 else 1.0) * (np.median(np.diff(v)) if height > 1 else 1.0)
+    footprint = plane_depth ** 2 * stride / (intrinsics["fx"] * intrinsics["fy"] * n_dot_r)
+
+    wound_depths = depth_below[wound]
+    wound_footprint = footprint[wound]
+
+    return _measurement(
+        volume_m3=float(np.dot(wound_depths.astype(np.float64), wound_footprint)),
+        surface_area_m2=triangulated_area(points, wound),
+        opening_area_m2=float(wound_footprint.sum()),
+        depth_m=wound_depths,
+        fit_rms_m=fit_rms,
+        valid_points=int(valid.sum())
+    )
+
+
+def measure_point_cloud(points: np.ndarray,
+                        resolution_mm: float = POINT_CLOUD_RESOLUTION_MM) -> Dict[str, Any]:
+    """
+    Measure a wound from an unorganized (N, 3) point cloud in meters
+
+    The skin plane is fitted robustly to all points (the wound is the
+    minority), then depths are rasterized onto a regular grid in the plane
+    so the same area and volume integration applies.
+    """
+    try:
+        resolution_mm = float(resolution_mm)
+    except (TypeError, ValueError):
+        raise ValueError("resolution_mm must be a number")
+    if not (math.isfinite(resolution_mm) and resolution_mm >= MIN_POINT_CLOUD_RESOLUTION_MM):
+        raise ValueError(f"resolution_mm must be at least {MIN_POINT_CLOUD_RESOLUTION_MM}")
+
+    points = np.asarray(points, dtype=np.float32)
+    if points.ndim != 2 or points.shape[1] != 3:
+        raise ValueError("Point cloud must be an (N, 3) array")
+    points = points[np.isfinite(points).all(axis=1)]
+    if len(points) < 3:
+        raise ValueError("Point cloud has too few valid points")
+
+    # Stray returns (a wall, the floor) would skew the plane and stretch the grid without bound
+    center = np.median(points, axis=0)
+    points = points[(np.abs(points - center) <= POINT_CLOUD_MAX_EXTENT_MM / 2000.0).all(axis=1)]
+    if len(points) < 3:
+        raise ValueError("Point cloud has too few points within the wound extent")
+
+    normal, offset, fit_rms = robust_fit_plane(points)
+
+    # Orthonormal in-plane basis
+    helper = np.array([1.0, 0.0, 0.0]) if abs(normal[0]) < 0.9 else np.array([0.0, 1.0, 0.0])
+    e1 = np.cross(normal, helper)
+    e1 /= np.linalg.norm(e1)
+    e2 = np.cross(normal, e1)
+    basis = np.stack([e1, e2, normal], axis=1).astype(np.float32)
+
+    local = points @ basis
+    local[:, 2] += np.float32(offset)
+
+    # Rasterize depths onto the plane grid, averaging points that share a cell
+    resolution = resolution_mm / 1000.0
+    origin = local[:, :2].min(axis=0)
+    cells = np.floor((local[:, :2] - origin) / resolution).astype(np.int64)
+    grid_w, grid_h = cells.max(axis=0) + 1
+    if grid_w * grid_h > POINT_CLOUD_MAX_CELLS:
+        raise ValueError(f"Point cloud needs a {grid_w}x{grid_h} grid at {resolution_mm}mm; "
+                         f"the limit is {POINT_CLOUD_MAX_CELLS} cells, use a coarser resolution_mm")
+    flat = cells[:, 1] * grid_w + cells[:, 0]
+    counts = np.bincount(flat, minlength=grid_w * grid_h)
+    sums = np.bincount(flat, weights=local[:, 2], minlength=grid_w * grid_h)
+
+    occupied = (counts > 0).reshape(grid_h, grid_w)
+    grid_depth = np.zeros(grid_w * grid_h, dtype=np.float32)
+    np.divide(sums, counts, out=grid_depth, where=counts > 0, casting='unsafe')
+    grid_depth = grid_depth.reshape(grid_h, grid_w)
+
+    grid = np.empty((grid_h, grid_w, 3), dtype=np.float32)
+    grid[..., 0] = (np.arange(grid_w, dtype=np.float32) + 0.5) * resolution
+    grid[..., 1] = ((np.arange(grid_h, dtype=np.float32) + 0.5) * resolution)[:, None]
+    grid[..., 2] = grid_depth
+
+    wound = _clean_mask(occupied & (grid_depth > _wound_threshold(fit_rms)))
+    wound_depths = grid_depth[wound]
+    cell_area = resolution ** 2
+
+    return _measurement(
+        volume_m3=float(wound_depths.sum(dtype=np.float64)) * cell_area,
+        surface_area_m2=triangulated_area(grid, wound),
+        opening_area_m2=float(wound.sum()) * cell_area,
+        depth_m=wound_depths,
+        fit_rms_m=fit_rms,
+        valid_points=int(len(points))
+    )
+
+
+def samples_to_depth_map(samples) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Assemble [{"x", "y", "depth"}, ...] pixel samples (as sent by the app) into a strided depth grid
+
+    Raises ValueError for anything else, e.g. a sample that isn't an object,
+    lacks a key or holds a non-numeric or non-finite coordinate.
+    """
+    if not isinstance(samples, list):
+        raise ValueError("lidar_data must be a list of {x, y, depth} samples")
+    try:
+        xs = np.fromiter((s["x"] for s in samples), dtype=np.float64, count=len(samples))
+        ys = np.fromiter((s["y"] for s in samples), dtype=np.float64, count=len(samples))
+        depths = np.fromiter((s["depth"] for s in samples), dtype=np.float32, count=len(samples))
+    except KeyError as e:
+        raise ValueError(f"LiDAR sample missing {e}")
+    except (TypeError, ValueError):
+        raise ValueError("LiDAR samples must be objects with numeric x, y and depth")
+    if not (np.isfinite(xs).all() and np.isfinite(ys).all()):
+        raise ValueError("LiDAR sample coordinates must be finite")
+
+    u, columns = np.unique(xs, return_inverse=True)
+    v, rows = np.unique(ys, return_inverse=True)
+    depth = np.full((len(v), len(u)), np.nan, dtype=np.float32)
+    depth[rows, columns] = depths
+    return depth, u, v
+
+
+def process_depth_data(lidar_data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Turn a LiDAR capture into wound depth, volume and area measurements
+
+    Accepts one of:
+    - "depth_map": 2D list of depths, with optional "intrinsics",
+      "depth_scale" (raw units to meters, default 1.0) and "wound_mask"
+    - "points": list of [x, y, z] in meters
+    - "lidar_data": list of {"x", "y", "depth"} pixel samples
+    """
+    intrinsics = lidar_data.get("intrinsics")
+
+    if "depth_map" in lidar_data:
+        depth = np.asarray(lidar_data["depth_map"], dtype=np.float32)
+        depth *= np.float32(lidar_data.get("depth_scale", 1.0))
+        wound_mask = lidar_data.get("wound_mask")
+        return measure_depth_map(
+            depth,
+            intrinsics,
+            None if wound_mask is None else np.asarray(wound_mask, dtype=bool)
+        )
+
+    if "points" in lidar_data:
+        return measure_point_cloud(
+            lidar_data["points"],
+            lidar_data.get("resolution_mm", POINT_CLOUD_RESOLUTION_MM)
+        )
+
+    samples = lidar_data.get("lidar_data")
+    if samples:
+        depth, u, v = samples_to_depth_map(samples)
+        return measure_depth_map(depth, intrinsics, u=u, v=v)
+
+    raise ValueError("LiDAR payload must contain depth_map, points or lidar_data samples")
+
+
+def process_depth_buffer(buffer,
+                         content_type: Optional[str] = None,
+                         intrinsics: Optional[Dict[str, float]] = None,
+                         depth_scale: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Measure a binary depth upload (raw depth frame or .npy)
+
+    A 2D array is treated as a depth map and an (N, 3) array as a point
+    cloud. Explicit intrinsics/depth_scale override the ones in the frame.
+    """
+    depth, frame_intrinsics, frame_scale = decode_depth_payload(buffer, content_type)
+    scale = frame_scale if depth_scale is None else depth_scale
+
+    if depth.ndim == 2 and depth.shape[1] == 3 and frame_intrinsics is None and intrinsics is None:
+        points = depth.astype(np.float32, copy=False)
+        if scale != 1.0:
+            points = points * np.float32(scale)
+        return measure_point_cloud(points)
+
+    if depth.ndim != 2:
+        raise ValueError(f"Expected a 2D depth map or (N, 3) points, got shape {depth.shape}")
+
+    depth_m = depth.astype(np.float32, copy=False)
+    if scale != 1.0:
+        depth_m = depth_m * np.float32(scale)
+    return measure_depth_map(depth_m, intrinsics or frame_intrinsics)
@@ -1,25 +1,100 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException
+from fastapi import FastAPI, File, UploadFile, HTTPException, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 import cv2
 import numpy as np
-from PIL import Image
-import io
 import os
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
+import asyncio
+import json
 import logging
+from contextlib import ExitStack
 from datetime import datetime
 
+from image_decoding import extract_archive_images
+from inference import MicroBatcher
+from jobs import JOB_PRIORITIES, JobQueue, QueueFullError
+from lidar import process_depth_buffer, process_depth_data
+from metrics import (
+    REJECTED_JOBS, gauge_from, metrics_middleware, metrics_response, observe_stage, stage_timer
+)
+from model_registry import ModelRegistry
+from preprocessing import preprocess_frame, preprocess_image
+from result_cache import ResultCache, cache_key
+from uploads import (
+    MIB, UploadLimitMiddleware, check_upload_size, detach_uploads, spooled_buffer, upload_buffer
+)
+from vitals import analyze_vital_signs
+from vitals_stream import VitalsSessionRegistry
+from workers import PoolSaturatedError, WorkerPool
+from wound_model import load_wound_model, warm_up_wound_model
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Per-image upload limit, and the body limit for every other request
+MAX_IMAGE_SIZE_MB = float(os.getenv("MAX_IMAGE_SIZE_MB", "10"))
+MAX_REQUEST_SIZE_MB = float(os.getenv("MAX_REQUEST_SIZE_MB", "64"))
+MAX_IMAGE_BYTES = int(MAX_IMAGE_SIZE_MB * MIB)
+
+WOUND_ROUTE = "/analyze-wound"
+WOUND_JOB_ROUTE = "/jobs/analyze-wound"
+# Stage metrics label for work done once per model batch, whichever routes' requests are in it
+WOUND_BATCHER = "wound_batcher"
+
+# Long edge (px) the model consumes; JPEGs larger than this are decoded reduced
+MODEL_INPUT_SIZE = int(os.getenv("MODEL_INPUT_SIZE", "512"))
+
+# Most frames accepted by /analyze-wound/batch in one request
+MAX_BATCH_IMAGES = int(os.getenv("MAX_BATCH_IMAGES", "32"))
+
+# "eager" loads and warms every model at startup, "lazy" on first request
+MODEL_LOAD_MODE = os.getenv("MODEL_LOAD_MODE", "eager")
+
+# Micro-batching window for wound inference
+BATCH_SIZE = int(os.getenv("BATCH_SIZE", "8"))
+BATCH_MAX_WAIT_MS = float(os.getenv("BATCH_MAX_WAIT_MS", "5"))
+
+# CPU worker pool; "thread" suits GIL-releasing OpenCV, "process" isolates pure-Python work
+WORKER_MODE = os.getenv("WORKER_MODE", "thread")
+MAX_WORKERS = int(os.getenv("MAX_WORKERS", "4"))
+WORKER_QUEUE_DEPTH = int(os.getenv("WORKER_QUEUE_DEPTH", "16"))
+
+# Result cache for repeated uploads; CACHE_DIR enables the on-disk tier
+CACHE_MAX_MB = float(os.getenv("CACHE_MAX_MB", "64"))
+CACHE_DIR = os.getenv("CACHE_DIR") or None
+CACHE_DISK_MAX_MB = float(os.getenv("CACHE_DISK_MAX_MB", "512"))
+
+# Streaming vitals: rolling window length, stats push interval and idle session timeout
+VITALS_WINDOW = int(os.getenv("VITALS_WINDOW", "120"))
+VITALS_STATS_INTERVAL = int(os.getenv("VITALS_STATS_INTERVAL", "10"))
+VITALS_SESSION_TIMEOUT_S = float(os.getenv("VITALS_SESSION_TIMEOUT_S", "600"))
+
+# Async job queue: concurrent jobs, queue bound, how long results stay pollable, webhook delivery
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_QUEUE_MAX = int(os.getenv("JOB_QUEUE_MAX", "256"))
+JOB_RESULT_TTL_S = float(os.getenv("JOB_RESULT_TTL_S", "3600"))
+JOB_RETRY_DELAY_S = float(os.getenv("JOB_RETRY_DELAY_S", "0.25"))
+JOB_WEBHOOK_TIMEOUT_S = float(os.getenv("JOB_WEBHOOK_TIMEOUT_S", "10"))
+JOB_WEBHOOK_RETRIES = int(os.getenv("JOB_WEBHOOK_RETRIES", "3"))
+# Comma-separated callback hosts; empty disables webhooks, * also allows any host that resolves to public addresses only
+JOB_WEBHOOK_HOSTS = [h.strip() for h in os.getenv("JOB_WEBHOOK_HOSTS", "").split(",") if h.strip()]
+
 app = FastAPI(
     title="StitchMe AI Service",
     description="AI-powered wound assessment and analysis service",
     version="1.0.0"
 )
 
+# Oversized bodies are refused before they are read; added first so CORS headers still apply
+app.add_middleware(
+    UploadLimitMiddleware,
+    max_bytes=int(MAX_REQUEST_SIZE_MB * MIB),
+    # An image plus an optional depth file of the same size
+    route_limits={WOUND_ROUTE: 2 * MAX_IMAGE_BYTES}
+)
+
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -29,6 +104,100 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+app.middleware("http")(metrics_middleware)
+
+model_registry = ModelRegistry()
+model_registry.register(
+    "wound",
+    lambda version: load_wound_model(version, input_size=MODEL_INPUT_SIZE),
+    warmup=warm_up_wound_model
+)
+
+def predict_wounds(batch):
+    """(model version, result) per input, so callers know which model produced each result"""
+    # Resolved per batch so a hot swap takes effect without touching in-flight batches
+    model = model_registry.current("wound")
+    # Timed once per batch rather than per request
+    with stage_timer(WOUND_BATCHER, "normalize"):
+        inputs = model.prepare_batch(batch)
+    return [(model.version, result) for result in model.predict(inputs)]
+
+wound_batcher = MicroBatcher(
+    predict_wounds,
+    max_batch_size=BATCH_SIZE,
+    max_wait_ms=BATCH_MAX_WAIT_MS
+)
+
+cpu_pool = WorkerPool(
+    max_workers=MAX_WORKERS,
+    max_queue=WORKER_QUEUE_DEPTH,
+    mode=WORKER_MODE
+)
+
+result_cache = ResultCache(
+    max_bytes=int(CACHE_MAX_MB * 1024 * 1024),
+    disk_dir=CACHE_DIR,
+    disk_max_bytes=int(CACHE_DISK_MAX_MB * 1024 * 1024)
+)
+
+vitals_sessions = VitalsSessionRegistry(
+    idle_timeout=VITALS_SESSION_TIMEOUT_S,
+    window=VITALS_WINDOW
+)
+
+job_queue = JobQueue(
+    workers=JOB_WORKERS,
+    max_queued=JOB_QUEUE_MAX,
+    result_ttl=JOB_RESULT_TTL_S,
+    webhook_timeout=JOB_WEBHOOK_TIMEOUT_S,
+    webhook_retries=JOB_WEBHOOK_RETRIES,
+    webhook_hosts=JOB_WEBHOOK_HOSTS
+)
+
+gauge_from("stitchme_ai_worker_pool_pending", "Jobs queued or running on the worker pool",
+           lambda: cpu_pool.pending)
+gauge_from("stitchme_ai_inference_queue_depth", "Inputs waiting for the micro-batcher",
+           lambda: wound_batcher.stats()["queue_depth"])
+gauge_from("stitchme_ai_result_cache_hits", "Result cache hits (memory and disk)",
+           lambda: result_cache.memory_hits + result_cache.disk_hits)
+gauge_from("stitchme_ai_result_cache_misses", "Result cache misses",
+           lambda: result_cache.misses)
+gauge_from("stitchme_ai_jobs_queued", "Async jobs waiting to run",
+           lambda: job_queue.queued)
+
+@app.on_event("startup")
+async def startup():
+    await cpu_pool.start()
+    await wound_batcher.start()
+    await job_queue.start()
+    if MODEL_LOAD_MODE == "eager":
+        await model_registry.load_all()
+
+@app.on_event("shutdown")
+async def shutdown():
+    await job_queue.stop()
+    await wound_batcher.stop()
+    await cpu_pool.stop()
+
+async def offload(fn, *args):
+    """Run CPU-bound work on the worker pool, answering 503 when it is saturated"""
+    try:
+        return await cpu_pool.run(fn, *args)
+    except PoolSaturatedError as e:
+        REJECTED_JOBS.labels(fn.__name__).inc()
+        logger.warning(str(e))
+        raise HTTPException(
+            status_code=503,
+            detail="Service busy, retry shortly",
+            headers={"Retry-After": "1"}
+        )
+
+def pool_payload(buffer):
+    """Upload buffers are memory maps, which only thread workers can share"""
+    if buffer is None or cpu_pool.mode == "thread":
+        return buffer
+    return bytes(buffer)
+
 @app.get("/")
 async def root():
     return {
@@ -42,64 +211,269 @@ async def root():
 async def health_check():
     return {
         "status": "healthy",
-        "timestamp": datetime.now().isostring(),
+        "timestamp": datetime.now().isoformat(),
         "service": "ai-service"
     }
 
-@app.post("/analyze-wound")
+@app.get("/metrics")
+async def metrics():
+    """Prometheus scrape endpoint"""
+    return metrics_response()
+
+@app.get("/inference/stats")
+async def inference_stats():
+    return {
+        "model_version": model_registry.stats()["wound"]["version"],
+        "batching": wound_batcher.stats(),
+        "workers": cpu_pool.stats(),
+        "cache": result_cache.stats(),
+        "jobs": job_queue.stats()
+    }
+
+@app.get("/models")
+async def list_models():
+    """Load state, version, load/warm-up time and memory of each registered model"""
+    return model_registry.stats()
+
+@app.post("/models/{name}/reload")
+async def reload_model(name: str, version: Optional[str] = None):
+    """Hot swap a model to a new version without dropping in-flight requests"""
+    try:
+        await model_registry.swap(name, version)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error reloading model {name}: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Model reload failed: {str(e)}")
+    return model_registry.stats()[name]
+
+def wound_response(analysis_result: Dict[str, Any]) -> JSONResponse:
+    """Render the response here so serialization shows up as its own stage"""
+    with stage_timer(WOUND_ROUTE, "serialize"):
+        return JSONResponse(content={
+            "success": True,
+            "data": analysis_result,
+            "message": "Wound analysis completed successfully"
+        })
+
+async def run_wound_analysis(
+    filename: str,
+    contents,
+    lidar_data: Optional[str] = None,
+    depth_contents=None,
+    depth_content_type: Optional[str] = None,
+    route: str = WOUND_ROUTE
+) -> Dict[str, Any]:
+    """
+    Analyze one wound image buffer (and optional depth buffer), going through the result cache
+
+    Stage timings are recorded under route, the endpoint the work was submitted through.
+    """
+    # Retries and re-sent captures hit the cache instead of re-running the model
+    wound_model = await model_registry.get("wound")
+    with stage_timer(route, "cache_lookup"):
+        key = await asyncio.to_thread(
+            cache_key, wound_model.version, contents, lidar_data, depth_contents
+        )
+        cached_result = await result_cache.get(key)
+    if cached_result is not None:
+        logger.info(f"Served cached wound analysis: {filename}")
+        return cached_result
+    
+    # Decode and prepare the model input off the event loop
+    try:
+        input_tensor, timings = await offload(
+            preprocess_image, pool_payload(contents), MODEL_INPUT_SIZE
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    for stage, seconds in timings.items():
+        observe_stage(route, stage, seconds)
+    
+    # Run through the batched wound model
+    with stage_timer(route, "inference"):
+        model_version, analysis_result = await wound_batcher.submit(input_tensor)
+    
+    if depth_contents:
+        try:
+            with stage_timer(route, "depth_analysis"):
+                analysis_result["depth_analysis"] = await offload(
+                    process_depth_buffer, pool_payload(depth_contents), depth_content_type
+                )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid depth data: {e}")
+    
+    # A hot swap between the lookup and the batch means another version ran; file the result under it
+    if model_version != wound_model.version:
+        key = await asyncio.to_thread(cache_key, model_version, contents, lidar_data, depth_contents)
+    await result_cache.put(key, analysis_result)
+    
+    logger.info(f"Analyzed wound image: {filename}")
+    
+    return analysis_result
+
+@app.post(WOUND_ROUTE)
 async def analyze_wound(
     file: UploadFile = File(...),
-    lidar_data: str = None
+    lidar_data: str = None,
+    depth_file: Optional[UploadFile] = File(None)
 ):
     """
     Analyze wound from uploaded image and optional LiDAR data
+
+    depth_file may carry a binary depth frame or .npy array (see depth_format.py),
+    in which case its measurements are returned under depth_analysis.
     """
     try:
         # Validate file type
         if not file.content_type.startswith('image/'):
             raise HTTPException(status_code=400, detail="File must be an image")
         
-        # Read image
-        contents = await file.read()
-        image = Image.open(io.BytesIO(contents))
+        check_upload_size(file, MAX_IMAGE_BYTES)
+        if depth_file:
+            check_upload_size(depth_file, MAX_IMAGE_BYTES)
         
-        # Convert to OpenCV format
-        cv_image = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)
+        with ExitStack() as uploads:
+            # Map the spooled uploads rather than reading them into memory
+            with stage_timer(WOUND_ROUTE, "read_upload"):
+                contents = uploads.enter_context(upload_buffer(file))
+                depth_contents = uploads.enter_context(upload_buffer(depth_file)) if depth_file else None
+            
+            analysis_result = await run_wound_analysis(
+                file.filename,
+                contents,
+                lidar_data,
+                depth_contents,
+                depth_file.content_type if depth_file else None
+            )
         
-        # TODO: Implement actual AI model
-        # For now, return mock analysis
-        analysis_result = {
-            "wound_detected": True,
-            "confidence_score": 0.87,
-            "severity": "moderate",
-            "wound_area_cm2": 2.5,
-            "detected_features": {
-                "color_analysis": "reddish with some inflammation",
-                "texture": "irregular surface",
-                "edges": "well-defined borders"
-            },
-            "recommendations": [
-                "Clean wound with saline solution",
-                "Apply antiseptic",
-                "Cover with sterile bandage",
-                "Monitor for signs of infection"
-            ],
-            "requires_professional": False,
-            "risk_assessment": "low",
-            "treatment_recommendation": "Clean wound and apply antiseptic. Monitor healing progress."
-        }
+        return wound_response(analysis_result)
         
-        logger.info(f"Analyzed wound image: {file.filename}")
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error analyzing wound: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
+
+def select_best_frame(results: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Pick the frame with the best confidence x relative sharpness among detections"""
+    candidates = [r for r in results if r["success"] and r["data"].get("wound_detected")]
+    if not candidates:
+        return None
+    
+    max_sharpness = max(r["sharpness"] for r in candidates) or 1.0
+    best = max(
+        candidates,
+        key=lambda r: r["data"].get("confidence_score", 0.0) * r["sharpness"] / max_sharpness
+    )
+    return {
+        "index": best["index"],
+        "filename": best["filename"],
+        "score": round(best["data"].get("confidence_score", 0.0) * best["sharpness"] / max_sharpness, 4)
+    }
+
+def validate_batch_files(files: List[UploadFile]):
+    """Reject batches with too many frames, non-image parts or oversized images"""
+    if len(files) > MAX_BATCH_IMAGES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many images: {len(files)} (limit {MAX_BATCH_IMAGES})"
+        )
+    for upload in files:
+        if not (upload.content_type or "").startswith('image/'):
+            raise HTTPException(status_code=400, detail=f"{upload.filename} is not an image")
+        check_upload_size(upload, MAX_IMAGE_BYTES)
+
+async def run_wound_batch(
+    frames: Optional[List[Tuple[str, Any]]] = None,
+    archive_contents=None
+) -> Dict[str, Any]:
+    """Analyze (filename, buffer) frames, or the images in a zip/tar archive buffer, as one batch"""
+    if archive_contents is not None:
+        try:
+            frames = await offload(extract_archive_images, pool_payload(archive_contents), MAX_BATCH_IMAGES)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    
+    await model_registry.get("wound")
+    
+    # Decode every frame in parallel on the worker pool
+    prepared = await asyncio.gather(
+        *(offload(preprocess_frame, pool_payload(contents), MODEL_INPUT_SIZE) for _, contents in frames),
+        return_exceptions=True
+    )
+    
+    for outcome in prepared:
+        if isinstance(outcome, HTTPException):
+            raise outcome
+    
+    decoded = [i for i, outcome in enumerate(prepared) if not isinstance(outcome, Exception)]
+    predictions = await wound_batcher.submit_many([prepared[i][0] for i in decoded])
+    predictions = {index: result for index, (_, result) in zip(decoded, predictions)}
+    
+    results = []
+    for index, ((filename, _), outcome) in enumerate(zip(frames, prepared)):
+        if isinstance(outcome, Exception):
+            results.append({
+                "index": index,
+                "filename": filename,
+                "success": False,
+                "error": str(outcome)
+            })
+        else:
+            results.append({
+                "index": index,
+                "filename": filename,
+                "success": True,
+                "sharpness": round(outcome[1], 2),
+                "data": predictions[index]
+            })
+    
+    logger.info(f"Analyzed wound batch: {len(decoded)}/{len(frames)} frames decoded")
+    
+    return {
+        "frame_count": len(frames),
+        "results": results,
+        "best_frame": select_best_frame(results)
+    }
+
+@app.post("/analyze-wound/batch")
+async def analyze_wound_batch(
+    files: List[UploadFile] = File(None),
+    archive: Optional[UploadFile] = File(None)
+):
+    """
+    Analyze a series of wound frames in one request
+
+    Frames come as repeated files parts or as a single zip/tar archive. They
+    are decoded in parallel and run through the model together; per-frame
+    results are returned in upload order along with the best frame.
+    """
+    try:
+        with ExitStack() as uploads:
+            if archive is not None:
+                batch_result = await run_wound_batch(
+                    archive_contents=uploads.enter_context(upload_buffer(archive))
+                )
+            elif files:
+                validate_batch_files(files)
+                batch_result = await run_wound_batch(
+                    [(upload.filename, uploads.enter_context(upload_buffer(upload))) for upload in files]
+                )
+            else:
+                raise HTTPException(status_code=400, detail="Provide files or an archive")
         
         return {
             "success": True,
-            "data": analysis_result,
-            "message": "Wound analysis completed successfully"
+            "data": batch_result,
+            "message": "Batch wound analysis completed successfully"
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Error analyzing wound: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
+        logger.error(f"Error analyzing wound batch: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Batch analysis failed: {str(e)}")
 
 @app.post("/analyze-vitals")
 async def analyze_vitals(vital_data: Dict[str, Any]):
@@ -107,17 +481,7 @@ async def analyze_vitals(vital_data: Dict[str, Any]):
     Analyze vital signs data
     """
     try:
-        # TODO: Implement vital signs analysis
-        # For now, return mock analysis
-        vitals_analysis = {
-            "heart_rate": vital_data.get("heart_rate", 72),
-            "blood_pressure": vital_data.get("blood_pressure", "120/80"),
-            "temperature": vital_data.get("temperature", 98.6),
-            "oxygen_saturation": vital_data.get("oxygen_saturation", 98),
-            "assessment": "Normal vital signs",
-            "alerts": [],
-            "recommendations": ["Continue monitoring"]
-        }
+        vitals_analysis = await offload(analyze_vital_signs, vital_data)
         
         return {
             "success": True,
@@ -125,30 +489,128 @@ async def analyze_vitals(vital_data: Dict[str, Any]):
             "message": "Vital signs analysis completed"
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error analyzing vitals: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Vitals analysis failed: {str(e)}")
 
+def ingest_vitals_message(session, message) -> List[Dict[str, Any]]:
+    """Feed one streamed message (a sample or list of samples) into a session"""
+    events = []
+    for sample in message if isinstance(message, list) else [message]:
+        try:
+            events.extend(session.ingest(sample))
+        except (AttributeError, TypeError, ValueError) as e:
+            events.append({"type": "error", "detail": f"Invalid sample: {e}"})
+            continue
+        if session.samples % VITALS_STATS_INTERVAL == 0:
+            events.append(session.summary())
+    return events
+
+@app.websocket("/vitals/stream/{session_id}")
+async def vitals_stream_ws(websocket: WebSocket, session_id: str):
+    """
+    Stream vitals samples over a WebSocket
+
+    Each JSON message is a sample (or list of samples) with heart_rate,
+    oxygen_saturation, temperature and optional timestamp. Alerts and
+    periodic rolling stats are pushed back on the same socket.
+    """
+    await websocket.accept()
+    session = vitals_sessions.get(session_id)
+    logger.info(f"Vitals stream opened: {session_id}")
+    
+    try:
+        while True:
+            try:
+                message = json.loads(await websocket.receive_text())
+            except json.JSONDecodeError as e:
+                await websocket.send_json({"type": "error", "detail": f"Invalid JSON: {e}"})
+                continue
+            
+            for event in ingest_vitals_message(session, message):
+                await websocket.send_json(event)
+    
+    except WebSocketDisconnect:
+        logger.info(f"Vitals stream closed: {session_id} ({session.samples} samples)")
+
+@app.post("/vitals/stream/{session_id}")
+async def vitals_stream_ndjson(session_id: str, request: Request):
+    """
+    Ingest a chunked NDJSON upload of vitals samples
+
+    Lines are processed as the body arrives, so buffered device uploads of
+    any length use constant memory. Alerts and rolling stats are returned as
+    NDJSON, ending with a final stats line. Use the WebSocket for real-time
+    alert push.
+    """
+    session = vitals_sessions.get(session_id)
+    events = []
+    
+    def ingest_line(line: bytes):
+        if not line.strip():
+            return
+        try:
+            message = json.loads(line)
+        except json.JSONDecodeError as e:
+            events.append({"type": "error", "detail": f"Invalid JSON: {e}"})
+            return
+        events.extend(ingest_vitals_message(session, message))
+    
+    pending = b""
+    async for chunk in request.stream():
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            ingest_line(line)
+    ingest_line(pending)
+    events.append(session.summary())
+    
+    return Response(
+        content=b"".join(json.dumps(event).encode() + b"\n" for event in events),
+        media_type="application/x-ndjson"
+    )
+
+@app.get("/vitals/stream/{session_id}")
+async def vitals_stream_stats(session_id: str):
+    """Current rolling stats for a vitals session"""
+    session = vitals_sessions.find(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail=f"Unknown vitals session: {session_id}")
+    return session.summary()
+
+async def run_lidar(lidar_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Measure a JSON depth map, point cloud or sample list"""
+    try:
+        return await offload(process_depth_data, lidar_data)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+async def run_lidar_binary(
+    body,
+    content_type: Optional[str],
+    intrinsics: Optional[Dict[str, float]] = None,
+    depth_scale: Optional[float] = None
+) -> Dict[str, Any]:
+    """Measure a binary depth frame or .npy depth map"""
+    try:
+        return await offload(process_depth_buffer, body, content_type, intrinsics, depth_scale)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def query_intrinsics(fx, fy, cx, cy) -> Optional[Dict[str, float]]:
+    if None in (fx, fy, cx, cy):
+        return None
+    return {"fx": fx, "fy": fy, "cx": cx, "cy": cy}
+
 @app.post("/process-lidar")
 async def process_lidar(lidar_data: Dict[str, Any]):
     """
     Process LiDAR data for 3D wound mapping
     """
     try:
-        # TODO: Implement LiDAR processing
-        # For now, return mock processing result
-        lidar_result = {
-            "depth_map_processed": True,
-            "wound_volume_ml": 0.8,
-            "surface_area_cm2": 2.5,
-            "depth_measurements": {
-                "max_depth_mm": 3.2,
-                "avg_depth_mm": 1.8,
-                "depth_distribution": "uniform"
-            },
-            "3d_model_url": "mock-3d-model-url",
-            "measurements_accuracy": 0.95
-        }
+        lidar_result = await run_lidar(lidar_data)
         
         return {
             "success": True,
@@ -156,10 +618,229 @@ async def process_lidar(lidar_data: Dict[str, Any]):
             "message": "LiDAR data processed successfully"
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error processing LiDAR: {str(e)}")
         raise HTTPException(status_code=500, detail=f"LiDAR processing failed: {str(e)}")
 
+@app.post("/process-lidar/binary")
+async def process_lidar_binary(
+    request: Request,
+    fx: Optional[float] = None,
+    fy: Optional[float] = None,
+    cx: Optional[float] = None,
+    cy: Optional[float] = None,
+    depth_scale: Optional[float] = None
+):
+    """
+    Process a binary depth upload for 3D wound mapping
+
+    The body is a raw depth frame (application/octet-stream) or a .npy array
+    (application/x-npy). Query intrinsics are required for .npy depth maps
+    and override the frame header otherwise.
+    """
+    try:
+        body = await request.body()
+        
+        lidar_result = await run_lidar_binary(
+            body,
+            request.headers.get("content-type"),
+            query_intrinsics(fx, fy, cx, cy),
+            depth_scale
+        )
+        
+        return {
+            "success": True,
+            "data": lidar_result,
+            "message": "LiDAR data processed successfully"
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error processing binary LiDAR: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"LiDAR processing failed: {str(e)}")
+
+async def until_capacity(run):
+    """Retry a job's analysis while the worker pool is saturated instead of failing the job"""
+    delay = JOB_RETRY_DELAY_S
+    while True:
+        try:
+            return await run()
+        except HTTPException as e:
+            if e.status_code != 503:
+                raise
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, 5.0)
+
+def check_job_options(priority: str, callback_url: Optional[str]):
+    """Validate before copying uploads, so a bad request doesn't pay for the copy"""
+    if priority not in JOB_PRIORITIES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown priority {priority}, expected one of {', '.join(JOB_PRIORITIES)}"
+        )
+    try:
+        job_queue.validate_callback(callback_url)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def submit_job(kind: str, run, priority: str, callback_url: Optional[str], files=()) -> JSONResponse:
+    """Queue run() as a job and answer 202 with where to poll; files are closed when it finishes"""
+    def cleanup():
+        for f in files:
+            if f is not None:
+                f.close()
+    
+    try:
+        job = job_queue.submit(
+            kind,
+            lambda: until_capacity(run),
+            priority=priority,
+            callback_url=callback_url,
+            cleanup=cleanup
+        )
+    except ValueError as e:
+        cleanup()
+        raise HTTPException(status_code=400, detail=str(e))
+    except QueueFullError as e:
+        cleanup()
+        logger.warning(str(e))
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    
+    logger.info(f"Queued {kind} job {job.id} ({priority})")
+    status_url = f"/jobs/{job.id}"
+    return JSONResponse(
+        status_code=202,
+        headers={"Location": status_url},
+        content={
+            "success": True,
+            "data": {**job_status(job), "status_url": status_url},
+            "message": "Job queued"
+        }
+    )
+
+def job_status(job) -> Dict[str, Any]:
+    return {**job.to_dict(), "queue_position": job_queue.position(job)}
+
+@app.post(WOUND_JOB_ROUTE, status_code=202)
+async def submit_wound_job(
+    file: UploadFile = File(...),
+    lidar_data: str = None,
+    depth_file: Optional[UploadFile] = File(None),
+    priority: str = "normal",
+    callback_url: Optional[str] = None
+):
+    """
+    Queue a wound analysis and return a job id to poll at /jobs/{job_id}
+
+    Takes the same inputs as /analyze-wound. priority is live, normal or
+    batch; live jobs run ahead of everything queued. When callback_url is
+    given the finished job is also POSTed there.
+    """
+    check_job_options(priority, callback_url)
+    if not (file.content_type or "").startswith('image/'):
+        raise HTTPException(status_code=400, detail="File must be an image")
+    check_upload_size(file, MAX_IMAGE_BYTES)
+    if depth_file:
+        check_upload_size(depth_file, MAX_IMAGE_BYTES)
+    
+    # The request's uploads are closed when it returns, so the job keeps its own copies
+    image, depth = await detach_uploads([file, depth_file])
+    filename = file.filename
+    depth_content_type = depth_file.content_type if depth_file else None
+    
+    async def run():
+        with ExitStack() as buffers:
+            contents = buffers.enter_context(spooled_buffer(image))
+            depth_contents = buffers.enter_context(spooled_buffer(depth)) if depth else None
+            return await run_wound_analysis(filename, contents, lidar_data, depth_contents, depth_content_type,
+                                            route=WOUND_JOB_ROUTE)
+    
+    return submit_job("analyze-wound", run, priority, callback_url, files=(image, depth))
+
+@app.post("/jobs/analyze-wound/batch", status_code=202)
+async def submit_wound_batch_job(
+    files: List[UploadFile] = File(None),
+    archive: Optional[UploadFile] = File(None),
+    priority: str = "batch",
+    callback_url: Optional[str] = None
+):
+    """Queue a multi-frame analysis (same inputs as /analyze-wound/batch); defaults to batch priority"""
+    check_job_options(priority, callback_url)
+    if archive is not None:
+        detached = await detach_uploads([archive])
+        
+        async def run():
+            with spooled_buffer(detached[0]) as contents:
+                return await run_wound_batch(archive_contents=contents)
+    elif files:
+        validate_batch_files(files)
+        filenames = [upload.filename for upload in files]
+        detached = await detach_uploads(files)
+        
+        async def run():
+            with ExitStack() as buffers:
+                frames = [
+                    (filename, buffers.enter_context(spooled_buffer(f)))
+                    for filename, f in zip(filenames, detached)
+                ]
+                return await run_wound_batch(frames)
+    else:
+        raise HTTPException(status_code=400, detail="Provide files or an archive")
+    
+    return submit_job("analyze-wound-batch", run, priority, callback_url, files=detached)
+
+@app.post("/jobs/process-lidar", status_code=202)
+async def submit_lidar_job(
+    lidar_data: Dict[str, Any],
+    priority: str = "normal",
+    callback_url: Optional[str] = None
+):
+    """Queue a LiDAR measurement (same body as /process-lidar)"""
+    return submit_job("process-lidar", lambda: run_lidar(lidar_data), priority, callback_url)
+
+@app.post("/jobs/process-lidar/binary", status_code=202)
+async def submit_lidar_binary_job(
+    request: Request,
+    fx: Optional[float] = None,
+    fy: Optional[float] = None,
+    cx: Optional[float] = None,
+    cy: Optional[float] = None,
+    depth_scale: Optional[float] = None,
+    priority: str = "normal",
+    callback_url: Optional[str] = None
+):
+    """Queue a binary LiDAR measurement (same body and query as /process-lidar/binary)"""
+    body = await request.body()
+    content_type = request.headers.get("content-type")
+    intrinsics = query_intrinsics(fx, fy, cx, cy)
+    return submit_job(
+        "process-lidar-binary",
+        lambda: run_lidar_binary(body, content_type, intrinsics, depth_scale),
+        priority,
+        callback_url
+    )
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Status of a job, with its result or error once finished"""
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown or expired job: {job_id}")
+    return job_status(job)
+
+@app.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    """Cancel a job that hasn't started yet"""
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown or expired job: {job_id}")
+    if not job_queue.cancel(job_id):
+        raise HTTPException(status_code=409, detail=f"Job {job_id} is already {job.status}")
+    return job_status(job)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
@@ -0,0 +1,114 @@
+"""
+Prometheus metrics for the AI service
+Per-route latency, in-flight and payload size metrics plus per-stage timers
+"""
+
+import time
+from contextlib import contextmanager
+
+from fastapi import Request
+from fastapi.responses import Response
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+from starlette.routing import Match
+
+LATENCY_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.075, 0.1,
+    0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 10.0
+)
+
+STAGE_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+    0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5
+)
+
+# 1 KB to 64 MB in powers of four
+PAYLOAD_BUCKETS = tuple(1024 * 4 ** i for i in range(9))
+
+REQUEST_LATENCY = Histogram(
+    "stitchme_ai_request_duration_seconds",
+    "HTTP request latency by route",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS
+)
+
+REQUESTS_IN_FLIGHT = Gauge(
+    "stitchme_ai_requests_in_flight",
+    "HTTP requests currently being handled",
+    ["method", "route"]
+)
+
+REQUEST_PAYLOAD_BYTES = Histogram(
+    "stitchme_ai_request_payload_bytes",
+    "Declared request body size by route",
+    ["route"],
+    buckets=PAYLOAD_BUCKETS
+)
+
+STAGE_LATENCY = Histogram(
+    "stitchme_ai_stage_duration_seconds",
+    "Time spent in each stage of a request's processing",
+    ["route", "stage"],
+    buckets=STAGE_BUCKETS
+)
+
+REJECTED_JOBS = Counter(
+    "stitchme_ai_rejected_jobs_total",
+    "Worker pool jobs shed because the pool was saturated",
+    ["function"]
+)
+
+
+def route_template(request: Request) -> str:
+    """The matched route's path template, so /vitals/stream/abc counts as /vitals/stream/{session_id}"""
+    for route in request.app.router.routes:
+        match, _ = route.matches(request.scope)
+        if match == Match.FULL:
+            return route.path
+    return "unmatched"
+
+
+async def metrics_middleware(request: Request, call_next):
+    route = route_template(request)
+    method = request.method
+
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit():
+        REQUEST_PAYLOAD_BYTES.labels(route).observe(int(content_length))
+
+    in_flight = REQUESTS_IN_FLIGHT.labels(method, route)
+    in_flight.inc()
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        in_flight.dec()
+        REQUEST_LATENCY.labels(method, route, str(status)).observe(time.perf_counter() - started)
+
+
+@contextmanager
+def stage_timer(route: str, stage: str):
+    """Time a block as one stage of a route's processing"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_LATENCY.labels(route, stage).observe(time.perf_counter() - started)
+
+
+def observe_stage(route: str, stage: str, seconds: float):
+    """Record a stage timed elsewhere, e.g. inside a worker process"""
+    STAGE_LATENCY.labels(route, stage).observe(seconds)
+
+
+def gauge_from(name: str, documentation: str, fn):
+    """Gauge whose value is read from fn() at scrape time"""
+    gauge = Gauge(name, documentation)
+    gauge.set_function(fn)
+    return gauge
+
+
+def metrics_response() -> Response:
+    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,137 @@
+"""
+Model registry for the AI service
+Lazy or eager model loading with warm-up, load metrics and atomic hot swap
+"""
+
+import asyncio
+import logging
+import resource
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def _rss_bytes() -> int:
+    """Current resident set size of this process"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * resource.getpagesize()
+    except (OSError, ValueError, IndexError):
+        # Peak rather than current RSS, but better than nothing off Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+@dataclass
+class ModelEntry:
+    """A registered model and what it cost to bring up"""
+    name: str
+    loader: Callable[[Optional[str]], Any]
+    warmup: Optional[Callable[[Any], Any]] = None
+    model: Any = None
+    version: Optional[str] = None
+    load_seconds: Optional[float] = None
+    warmup_seconds: Optional[float] = None
+    memory_bytes: Optional[int] = None
+    loaded_at: Optional[float] = None
+    swaps: int = 0
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
+
+class ModelRegistry:
+    """
+    Named models loaded on first use or at startup
+
+    Loaders take an optional version string and return an object with a
+    version attribute; they should import heavy frameworks themselves so
+    importing this service stays cheap. Loading and warm-up run in a thread.
+    A swap builds and warms the replacement before publishing it, so
+    requests already holding the old model finish on it undisturbed.
+    """
+
+    def __init__(self):
+        self._entries: Dict[str, ModelEntry] = {}
+
+    def register(self,
+                 name: str,
+                 loader: Callable[[Optional[str]], Any],
+                 warmup: Optional[Callable[[Any], Any]] = None):
+        self._entries[name] = ModelEntry(name=name, loader=loader, warmup=warmup)
+
+    def _entry(self, name: str) -> ModelEntry:
+        try:
+            return self._entries[name]
+        except KeyError:
+            raise KeyError(f"Unknown model: {name}")
+
+    def current(self, name: str) -> Any:
+        """The published model, without loading; raises if it isn't loaded yet"""
+        model = self._entry(name).model
+        if model is None:
+            raise RuntimeError(f"Model {name} is not loaded")
+        return model
+
+    async def get(self, name: str) -> Any:
+        """The published model, loading it first if needed"""
+        entry = self._entry(name)
+        if entry.model is not None:
+            return entry.model
+
+        async with entry.lock:
+            if entry.model is None:
+                await self._load(entry, None)
+        return entry.model
+
+    async def load_all(self):
+        """Eagerly load every registered model"""
+        await asyncio.gather(*(self.get(name) for name in self._entries))
+
+    async def swap(self, name: str, version: Optional[str] = None) -> Any:
+        """Load (and warm) a new version, then atomically replace the current one"""
+        entry = self._entry(name)
+        async with entry.lock:
+            previous = entry.version
+            await self._load(entry, version)
+            if previous is not None:
+                entry.swaps += 1
+                logger.info(f"Swapped model {name}: {previous} -> {entry.version}")
+        return entry.model
+
+    async def _load(self, entry: ModelEntry, version: Optional[str]):
+        def build():
+            rss_before = _rss_bytes()
+            started = time.perf_counter()
+            model = entry.loader(version)
+            loaded = time.perf_counter()
+            if entry.warmup:
+                entry.warmup(model)
+            warmed = time.perf_counter()
+            return model, loaded - started, warmed - loaded, _rss_bytes() - rss_before
+
+        model, load_seconds, warmup_seconds, memory_bytes = await asyncio.to_thread(build)
+
+        # Publish with a single reference assignment
+        entry.model = model
+        entry.version = getattr(model, "version", version)
+        entry.load_seconds = load_seconds
+        entry.warmup_seconds = warmup_seconds
+        entry.memory_bytes = max(memory_bytes, 0)
+        entry.loaded_at = time.time()
+
+        logger.info(f"Loaded model {entry.name} {entry.version} in {load_seconds * 1000:.0f} ms "
+                    f"(warm-up {warmup_seconds * 1000:.0f} ms, ~{entry.memory_bytes / 1e6:.1f} MB)")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            name: {
+                "loaded": entry.model is not None,
+                "version": entry.version,
+                "load_seconds": entry.load_seconds,
+                "warmup_seconds": entry.warmup_seconds,
+                "memory_bytes": entry.memory_bytes,
+                "loaded_at": entry.loaded_at,
+                "swaps": entry.swaps,
+            }
+            for name, entry in self._entries.items()
+        }
@@ -0,0 +1,166 @@
+"""
+Wound image preprocessing
+Coarse wound localization on a preview, ROI crop at source resolution and resize to the model input
+"""
+
+import math
+import time
+from typing import Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from image_decoding import decode_image, is_jpeg, jpeg_dimensions
+
+# Long edge (px) of the preview the region detector runs on
+DETECTION_SIZE = 128
+
+# Context kept around the detected region, as a fraction of its size per side
+ROI_MARGIN = 0.25
+
+# Candidate regions smaller than this fraction of the preview are treated as noise
+MIN_ROI_FRACTION = 0.005
+
+# Candidates covering more than this fraction aren't a localized wound; use the whole frame
+MAX_ROI_FRACTION = 0.6
+
+# Minimum gap in mean LAB a* (redness) between wound and surrounding skin
+MIN_REDNESS_CONTRAST = 10.0
+
+# Most the ROI crop may be upscaled to reach the input size. At 1.0 JPEGs are decoded at the
+# smallest scale that still gives the region input_size pixels, so the model sees real detail;
+# larger values decode smaller and interpolate the rest
+ROI_MAX_UPSCALE = 1.0
+
+FULL_FRAME = (0.0, 0.0, 1.0, 1.0)
+
+Region = Tuple[float, float, float, float]
+
+
+def detect_wound_region(preview: np.ndarray) -> Optional[Region]:
+    """
+    Locate the most likely wound in a small BGR preview
+
+    Wound beds are redder than the skin around them, so the LAB a* channel is
+    split with Otsu's threshold and the largest red blob taken. Returns a
+    square (x0, y0, x1, y1) box as fractions of the image size, padded by
+    ROI_MARGIN, or None when nothing stands out.
+    """
+    height, width = preview.shape[:2]
+    redness = cv2.cvtColor(preview, cv2.COLOR_BGR2LAB)[:, :, 1]
+    redness = cv2.GaussianBlur(redness, (5, 5), 0)
+
+    _, mask = cv2.threshold(redness, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    inside = mask.astype(bool)
+    if not inside.any() or inside.all():
+        return None
+    if float(redness[inside].mean()) - float(redness[~inside].mean()) < MIN_REDNESS_CONTRAST:
+        return None
+
+    mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, np.ones((3, 3), dtype=np.uint8))
+    count, _, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+    if count < 2:
+        return None
+
+    # Row 0 is the background
+    largest = 1 + int(np.argmax(stats[1:, cv2.CC_STAT_AREA]))
+    x, y, w, h, area = stats[largest]
+    if not MIN_ROI_FRACTION <= area / (height * width) <= MAX_ROI_FRACTION:
+        return None
+
+    # Square box so the crop isn't distorted when resized to the square model input
+    side = min(max(w, h) * (1.0 + 2.0 * ROI_MARGIN), width, height)
+    cx, cy = x + w / 2.0, y + h / 2.0
+    # Shift rather than clip at the borders to keep the box square
+    x0 = min(max(cx - side / 2.0, 0.0), width - side)
+    y0 = min(max(cy - side / 2.0, 0.0), height - side)
+    return x0 / width, y0 / height, (x0 + side) / width, (y0 + side) / height
+
+
+def crop_region(image: np.ndarray, region: Region) -> np.ndarray:
+    """View of the region of an image, given as fractions of its size"""
+    height, width = image.shape[:2]
+    x0, y0, x1, y1 = region
+    left, top = int(x0 * width), int(y0 * height)
+    right = max(int(math.ceil(x1 * width)), left + 1)
+    bottom = max(int(math.ceil(y1 * height)), top + 1)
+    return image[top:bottom, left:right]
+
+
+def wound_input(buffer, input_size: int) -> Tuple[np.ndarray, Optional[Region], Dict[str, float]]:
+    """
+    Decode an upload into an input_size square uint8 image centered on the wound
+
+    JPEGs are first decoded at a reduced scale for the detector, then decoded
+    again at the smallest libjpeg scale that resolves the region at
+    input_size / ROI_MAX_UPSCALE, and cropped; other formats are decoded once
+    at full size. Without a detection the whole frame is used, decoded as
+    before at the smallest scale covering input_size. Returns the image, the
+    region (None for the full frame) and per-stage timings in seconds.
+    """
+    started = time.perf_counter()
+    preview = decode_image(buffer, target_size=DETECTION_SIZE)
+    decoded = time.perf_counter()
+
+    # Non-JPEGs arrive at full size, so shrink a copy for the detector
+    preview_long_edge = max(preview.shape[:2])
+    small = preview
+    if preview_long_edge > 2 * DETECTION_SIZE:
+        # Striding first keeps the area resize from touching every full-size pixel
+        step = preview_long_edge // (2 * DETECTION_SIZE)
+        strided = preview[::step, ::step]
+        scale = DETECTION_SIZE / max(strided.shape[:2])
+        small = cv2.resize(strided, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    region = detect_wound_region(small)
+    detected = time.perf_counter()
+
+    dimensions = jpeg_dimensions(buffer) if is_jpeg(buffer) else None
+    if dimensions:
+        full_width, full_height = dimensions
+    else:
+        full_height, full_width = preview.shape[:2]
+
+    full_long_edge = max(full_width, full_height)
+    if region is None:
+        needed = input_size
+    else:
+        x0, y0, x1, y1 = region
+        region_long_edge = max((x1 - x0) * full_width, (y1 - y0) * full_height)
+        # Long edge the whole frame needs for the region to span enough pixels
+        needed = math.ceil(input_size / ROI_MAX_UPSCALE * full_long_edge / region_long_edge)
+    needed = min(needed, full_long_edge)
+
+    image = preview
+    if preview_long_edge < needed:
+        image = decode_image(buffer, target_size=needed)
+    crop = crop_region(image, region or FULL_FRAME)
+    cropped = time.perf_counter()
+
+    resized = cv2.resize(crop, (input_size, input_size), interpolation=cv2.INTER_AREA)
+    finished = time.perf_counter()
+
+    return resized, region, {
+        "decode": decoded - started,
+        "detect": detected - decoded,
+        "crop": cropped - detected,
+        "resize": finished - cropped,
+    }
+
+
+def preprocess_image(buffer, input_size: int) -> Tuple[np.ndarray, Dict[str, float]]:
+    """Model input for an upload, with per-stage timings in seconds"""
+    image, _, timings = wound_input(buffer, input_size)
+    return image, timings
+
+
+def sharpness(image: np.ndarray) -> float:
+    """Variance of the Laplacian; higher means a sharper, less motion-blurred frame"""
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    return float(cv2.Laplacian(gray, cv2.CV_64F).var())
+
+
+def preprocess_frame(buffer, input_size: int) -> Tuple[np.ndarray, float]:
+    """Like preprocess_image, but also scores the wound region's sharpness for best-frame selection"""
+    image, _, _ = wound_input(buffer, input_size)
+    # Scored at input size so frames of different resolutions compare fairly
+    return image, sharpness(image)
@@ -0,0 +1,171 @@
+"""
+Content-addressed cache for analysis results
+LRU memory tier bounded by size, with an optional on-disk tier that survives restarts
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def cache_key(model_version: str, *payloads) -> str:
+    """Hash the model version and every request payload (bytes, str or None) into a cache key"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(model_version.encode())
+    for payload in payloads:
+        if payload is None:
+            payload = b''
+        elif isinstance(payload, str):
+            payload = payload.encode()
+        # Length prefix keeps ("ab", "c") and ("a", "bc") distinct
+        digest.update(len(payload).to_bytes(8, 'little'))
+        digest.update(payload)
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """
+    Two-tier cache of JSON-serializable results
+
+    Entries are stored as encoded JSON so their size is exact and cached
+    values can't be mutated by callers. The memory tier evicts least recently
+    used entries once max_bytes is exceeded. When disk_dir is set, entries are
+    also written there and pruned oldest-first past disk_max_bytes.
+    """
+
+    # Re-scan the disk tier for pruning every this many writes
+    PRUNE_INTERVAL = 64
+
+    def __init__(self,
+                 max_bytes: int = 64 * 1024 * 1024,
+                 disk_dir: Optional[str] = None,
+                 disk_max_bytes: int = 512 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        self.disk_max_bytes = disk_max_bytes
+
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self._size = 0
+        self._disk_lock = threading.Lock()
+        self._disk_writes = 0
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if self.disk_dir:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Look a key up in memory, then on disk; disk reads run off the event loop"""
+        encoded = self._entries.get(key)
+        if encoded is not None:
+            self._entries.move_to_end(key)
+            self.memory_hits += 1
+            return json.loads(encoded)
+
+        if self.disk_dir:
+            encoded = await asyncio.to_thread(self._read_disk, key)
+            if encoded is not None:
+                self.disk_hits += 1
+                self._store_memory(key, encoded)
+                return json.loads(encoded)
+
+        self.misses += 1
+        return None
+
+    async def put(self, key: str, value: Dict[str, Any]):
+        """Store a result in memory and, if enabled, on disk"""
+        encoded = json.dumps(value, separators=(',', ':')).encode()
+        self._store_memory(key, encoded)
+        if self.disk_dir:
+            await asyncio.to_thread(self._write_disk, key, encoded)
+
+    def _store_memory(self, key: str, encoded: bytes):
+        if len(encoded) > self.max_bytes:
+            return
+
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._size -= len(previous)
+
+        self._entries[key] = encoded
+        self._size += len(encoded)
+
+        while self._size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= len(evicted)
+            self.evictions += 1
+
+    def _disk_path(self, key: str) -> Path:
+        # Two-level fan-out keeps directories small
+        return self.disk_dir / key[:2] / f"{key}.json"
+
+    def _read_disk(self, key: str) -> Optional[bytes]:
+        try:
+            return self._disk_path(key).read_bytes()
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            logger.warning(f"Result cache read failed for {key}: {e}")
+            return None
+
+    def _write_disk(self, key: str, encoded: bytes):
+        path = self._disk_path(key)
+        try:
+            path.parent.mkdir(exist_ok=True)
+            tmp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+            tmp_path.write_bytes(encoded)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Result cache write failed for {key}: {e}")
+            return
+
+        with self._disk_lock:
+            self._disk_writes += 1
+            if self._disk_writes % self.PRUNE_INTERVAL == 0:
+                self._prune_disk()
+
+    def _prune_disk(self):
+        files = []
+        total = 0
+        for path in self.disk_dir.glob("*/*.json"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+
+        files.sort()
+        for _, size, path in files:
+            if total <= self.disk_max_bytes:
+                break
+            try:
+                path.unlink()
+                total -= size
+            except FileNotFoundError:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "memory_bytes": self._size,
+            "max_bytes": self.max_bytes,
+            "disk_enabled": self.disk_dir is not None,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+        }
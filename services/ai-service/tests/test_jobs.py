@@ -0,0 +1,113 @@
+"""
+Job queue bookkeeping and webhook host checks
+
+Usage: python -m pytest tests
+"""
+
+import asyncio
+import io
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from jobs import ANY_PUBLIC_HOST, JobQueue  # noqa: E402
+from uploads import detach_uploads  # noqa: E402
+
+
+async def idle():
+    return None
+
+
+def test_callbacks_need_allowlist():
+    with pytest.raises(ValueError, match="disabled"):
+        JobQueue().validate_callback("https://example.com/hook")
+    with pytest.raises(ValueError, match="not allowed"):
+        JobQueue(webhook_hosts=["hooks.example.com"]).validate_callback("http://169.254.169.254/")
+    JobQueue(webhook_hosts=["hooks.example.com"]).validate_callback("https://hooks.example.com/done")
+
+
+@pytest.mark.parametrize("host", ["127.0.0.1", "localhost", "10.1.2.3", "169.254.169.254", "[::1]"])
+def test_any_public_host_refuses_internal_addresses(host):
+    queue = JobQueue(webhook_hosts=[ANY_PUBLIC_HOST])
+    url = f"http://{host}/hook"
+    queue.validate_callback(url)
+    with pytest.raises(ValueError, match="non-public"):
+        asyncio.run(queue._check_public(url))
+
+
+def test_counts_and_positions():
+    async def scenario():
+        queue = JobQueue(workers=0)
+        await queue.start()
+        batch = [queue.submit("test", idle, priority="batch") for _ in range(3)]
+        normal = [queue.submit("test", idle, priority="normal") for _ in range(3)]
+        live = queue.submit("test", idle, priority="live")
+        assert queue.queued == 7
+        assert [queue.position(job) for job in normal] == [1, 2, 3]
+        assert [queue.position(job) for job in batch] == [4, 5, 6]
+
+        assert queue.cancel(normal[1].id)
+        assert queue.queued == 6
+        assert queue.position(normal[1]) is None
+        assert [queue.position(job) for job in normal[::2]] == [1, 2]
+        assert queue.position(live) == 0
+        assert queue.stats()["queued_by_priority"] == {"live": 1, "normal": 2, "batch": 3}
+        await queue.stop()
+        assert queue.queued == 0
+
+    asyncio.run(scenario())
+
+
+def test_finished_jobs_evicted_on_read():
+    async def scenario():
+        queue = JobQueue(workers=1, result_ttl=0.05)
+        await queue.start()
+        job = queue.submit("test", idle)
+        while job.status != "succeeded":
+            await asyncio.sleep(0.01)
+        assert queue.get(job.id) is job
+        await asyncio.sleep(0.1)
+        assert queue.get(job.id) is None
+        assert queue.stats()["running"] == 0
+        await queue.stop()
+
+    asyncio.run(scenario())
+
+
+class FailingUpload:
+    """Upload whose file can't be read"""
+
+    size = 10
+
+    class file:
+        @staticmethod
+        def seek(offset):
+            raise OSError("client went away")
+
+
+class Upload:
+    def __init__(self, data: bytes):
+        self.file = io.BytesIO(data)
+        self.size = len(data)
+
+
+def test_detach_cleans_up_on_failure(monkeypatch):
+    made = []
+    import uploads
+    real = uploads.detached_file
+
+    def tracked(size):
+        made.append(real(size))
+        return made[-1]
+
+    monkeypatch.setattr(uploads, "detached_file", tracked)
+    with pytest.raises(OSError):
+        asyncio.run(detach_uploads([Upload(b"first"), None, Upload(b"second"), FailingUpload()]))
+    assert len(made) == 3  # the failing upload's copy included
+    assert all(f.closed for f in made)
+
+    image, depth = asyncio.run(detach_uploads([Upload(b"frame"), None]))
+    assert image.read() == b"frame" and depth is None
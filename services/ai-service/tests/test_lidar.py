@@ -0,0 +1,55 @@
+"""
+LiDAR input bounds: client-chosen resolution, stray points and malformed samples are rejected or ignored, never a 500
+
+Usage: python -m pytest tests
+"""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from lidar import POINT_CLOUD_MAX_CELLS, measure_point_cloud, process_depth_data  # noqa: E402
+
+
+def wound_cloud(rng, half_width_m=0.03, count=20000):
+    """Flat skin 30 cm from the camera with a 4 mm deep paraboloid wound of radius 1 cm"""
+    xy = rng.uniform(-half_width_m, half_width_m, (count, 2))
+    radius = np.hypot(xy[:, 0], xy[:, 1])
+    z = 0.3 + np.where(radius < 0.01, 0.004 * (1 - (radius / 0.01) ** 2), 0.0)
+    return np.column_stack([xy, z]).astype(np.float32)
+
+
+@pytest.mark.parametrize("outlier", [[20.0, 0.0, 0.3], [0.0, 0.0, 20.0], [-5.0, 3.0, 1.0]])
+def test_outliers_are_ignored(outlier):
+    points = wound_cloud(np.random.default_rng(0))
+    assert measure_point_cloud(np.vstack([points, outlier])) == measure_point_cloud(points)
+
+
+@pytest.mark.parametrize("resolution_mm", [0, -1, 0.001, float("nan"), None, "fine"])
+def test_invalid_resolution_rejected(resolution_mm):
+    with pytest.raises(ValueError):
+        measure_point_cloud(wound_cloud(np.random.default_rng(0)), resolution_mm)
+
+
+def test_grid_cell_cap():
+    points = wound_cloud(np.random.default_rng(0), half_width_m=0.14)
+    with pytest.raises(ValueError, match=str(POINT_CLOUD_MAX_CELLS)):
+        measure_point_cloud(points, 0.1)
+    assert measure_point_cloud(points)["depth_map_processed"]
+
+
+@pytest.mark.parametrize("samples", [
+    [{"x": 1}],
+    [1, 2, 3],
+    [{"x": 0, "y": 0, "depth": "deep"}],
+    [{"x": None, "y": 0, "depth": 0.3}],
+    [{"x": float("nan"), "y": 0, "depth": 0.3}],
+    "xyz",
+])
+def test_malformed_samples_rejected(samples):
+    with pytest.raises(ValueError):
+        process_depth_data({"lidar_data": samples})
@@ -0,0 +1,53 @@
+"""
+Wound ROI cropping: the region reaches the model from a decode with enough pixels, never upscaled
+
+Usage: python -m pytest tests
+"""
+
+import os
+import sys
+
+import cv2
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import preprocessing  # noqa: E402
+
+INPUT_SIZE = 512
+
+
+def wound_jpeg(width: int, height: int, wound_fraction: float) -> bytes:
+    """Skin-toned frame with a red wound whose diameter is wound_fraction of the short edge"""
+    image = np.full((height, width, 3), (150, 170, 215), dtype=np.uint8)
+    cv2.circle(image, (width // 3, height // 2), int(wound_fraction * min(width, height) / 2), (40, 40, 190), -1)
+    ok, jpeg = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, 90])
+    assert ok
+    return jpeg.tobytes()
+
+
+@pytest.mark.parametrize("width, height, wound_fraction", [
+    (4000, 3000, 0.3),  # region fits in a reduced decode
+    (4000, 3000, 0.12),  # region needs the full-size decode
+    (1920, 1080, 0.5),
+])
+def test_roi_never_upscaled(monkeypatch, width, height, wound_fraction):
+    crops = []
+    crop_region = preprocessing.crop_region
+
+    def recorded(image, region):
+        crop = crop_region(image, region)
+        crops.append((image.shape, crop.shape))
+        return crop
+
+    monkeypatch.setattr(preprocessing, "crop_region", recorded)
+    image, region, _ = preprocessing.wound_input(wound_jpeg(width, height, wound_fraction), INPUT_SIZE)
+
+    assert region is not None
+    assert image.shape == (INPUT_SIZE, INPUT_SIZE, 3)
+    (decoded_shape, crop_shape), = crops
+    assert max(crop_shape[:2]) >= INPUT_SIZE
+    # Still no larger a decode than that needs
+    if max(crop_shape[:2]) >= 2 * INPUT_SIZE:
+        assert max(decoded_shape[:2]) == max(width, height)
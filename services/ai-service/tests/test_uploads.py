@@ -0,0 +1,71 @@
+"""
+Buffers over uploaded and detached files, whatever kind of file holds the data
+
+Usage: python -m pytest tests
+"""
+
+import asyncio
+import io
+import mmap
+import os
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from uploads import DETACHED_SPOOL_BYTES, detach_upload, spooled_buffer  # noqa: E402
+
+
+def spooled(data: bytes, max_size: int) -> tempfile.SpooledTemporaryFile:
+    f = tempfile.SpooledTemporaryFile(max_size=max_size)
+    f.write(data)
+    f.seek(0)
+    return f
+
+
+class Upload:
+    def __init__(self, data: bytes):
+        self.file = io.BytesIO(data)
+        self.size = len(data)
+
+
+class Stream(io.RawIOBase):
+    """Readable file without a file descriptor or an in-memory buffer to look through"""
+
+    def __init__(self, data: bytes):
+        self._data = io.BytesIO(data)
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        return self._data.readinto(b)
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        return self._data.seek(offset, whence)
+
+
+DATA = bytes(range(256)) * 64
+
+
+@pytest.mark.parametrize("make, mapped", [
+    (lambda: spooled(DATA, max_size=len(DATA) + 1), False),  # still in memory
+    (lambda: spooled(DATA, max_size=16), True),  # rolled over to disk
+    (lambda: io.BytesIO(DATA), False),
+    (lambda: Stream(DATA), False),
+])
+def test_buffer_contents(make, mapped):
+    with make() as f, spooled_buffer(f) as buffer:
+        assert isinstance(buffer, mmap.mmap) == mapped
+        assert bytes(buffer) == DATA
+
+
+@pytest.mark.parametrize("size", [10, DETACHED_SPOOL_BYTES + 1])
+def test_detached_copy(size):
+    data = os.urandom(size)
+    detached = asyncio.run(detach_upload(Upload(data)))
+    with detached, spooled_buffer(detached) as buffer:
+        assert isinstance(buffer, mmap.mmap) == (size > DETACHED_SPOOL_BYTES)
+        assert bytes(buffer) == data
@@ -0,0 +1,57 @@
+"""
+Rolling vitals statistics on client clocks other than the server's
+
+Usage: python -m pytest tests
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from vitals_stream import RollingStats, VitalsSession  # noqa: E402
+
+# Heart rate rising 0.06 bpm per minute, one sample per second
+TRUE_TREND = 0.06
+
+
+def feed(session, timestamps):
+    for i, timestamp in enumerate(timestamps):
+        session.ingest({"timestamp": timestamp, "heart_rate": 70.0 + TRUE_TREND * i / 60.0})
+    return session.summary()["metrics"]["heart_rate"]
+
+
+@pytest.mark.parametrize("timestamps", [
+    [1000.0 + i for i in range(120)],  # device uptime (s)
+    [1.7e9 + i for i in range(120)],  # Unix epoch (s)
+    [1.7e12 + 1000.0 * i for i in range(120)],  # Unix epoch (ms)
+    [-50.0 + i for i in range(120)],  # negative relative time
+])
+def test_trend_on_any_clock(timestamps):
+    stats = feed(VitalsSession("clock"), timestamps)
+    assert stats["samples"] == 120
+    assert stats["trend_per_min"] == pytest.approx(TRUE_TREND, abs=1e-3)
+
+
+def test_trend_none_when_sums_cancel():
+    stats = RollingStats(capacity=2)
+    # Raw epoch seconds: n * sum(t^2) - sum(t)^2 cancels to 0 in float64
+    stats.add(1.7e9, 70.0)
+    stats.add(1.7e9 + 5.0, 71.0)
+    assert stats.summary()["trend_per_min"] is None
+
+
+def test_rejected_samples_not_counted():
+    session = VitalsSession("invalid")
+    session.ingest({"timestamp": 0.0, "heart_rate": 70.0})
+    for sample in ({"timestamp": 1.0, "heart_rate": "fast"}, {"timestamp": 1.0, "heart_rate": float("nan")}):
+        with pytest.raises(ValueError):
+            session.ingest(sample)
+    with pytest.raises(ValueError):
+        session.ingest({"timestamp": 2.0, "heart_rate": 71.0, "oxygen_saturation": "low"})
+
+    summary = session.summary()
+    assert summary["samples"] == 1
+    assert summary["metrics"]["heart_rate"]["samples"] == 1
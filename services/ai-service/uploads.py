@@ -0,0 +1,182 @@
+"""
+Upload handling for the AI service
+Request size limits enforced before and while streaming, and copy-free access to spooled uploads
+"""
+
+import asyncio
+import io
+import mmap
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+from typing import IO, Dict, List, Optional
+
+from fastapi import HTTPException, UploadFile
+from fastapi.responses import JSONResponse
+
+MIB = 1024 * 1024
+
+# Detached uploads (kept past their request) go to a temp file on disk beyond this size
+DETACHED_SPOOL_BYTES = MIB
+
+
+def payload_too_large(what: str, size: Optional[int], limit: int) -> HTTPException:
+    """413 error; size is None when the body was cut off mid-stream"""
+    if size is None:
+        detail = f"{what} exceeds the {limit / MIB:.1f} MB limit"
+    else:
+        detail = f"{what} is {size / MIB:.1f} MB, limit is {limit / MIB:.1f} MB"
+    return HTTPException(status_code=413, detail=detail)
+
+
+class UploadLimitMiddleware:
+    """
+    ASGI middleware capping request body size per route
+
+    A request whose Content-Length exceeds its route's limit is answered 413
+    before any of the body is read. Bodies without a length (chunked) are
+    counted as they stream in and cut off as soon as they pass the limit, so
+    nothing past it is ever buffered or spooled.
+    """
+
+    def __init__(self, app, max_bytes: int, route_limits: Optional[Dict[str, int]] = None):
+        self.app = app
+        self.max_bytes = max_bytes
+        self.route_limits = route_limits or {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        limit = self.route_limits.get(scope["path"], self.max_bytes)
+
+        for name, value in scope["headers"]:
+            if name == b"content-length":
+                try:
+                    declared = int(value)
+                except ValueError:
+                    break
+                if declared > limit:
+                    error = payload_too_large("Request body", declared, limit)
+                    response = JSONResponse({"detail": error.detail}, status_code=413)
+                    await response(scope, receive, send)
+                    return
+                break
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    raise payload_too_large("Request body", None, limit)
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+def upload_size(upload: UploadFile) -> int:
+    """Size in bytes of an already received upload"""
+    if upload.size is not None:
+        return upload.size
+    position = upload.file.tell()
+    upload.file.seek(0, os.SEEK_END)
+    size = upload.file.tell()
+    upload.file.seek(position)
+    return size
+
+
+def check_upload_size(upload: UploadFile, max_bytes: int):
+    """Reject a single multipart file over max_bytes with 413"""
+    size = upload_size(upload)
+    if size > max_bytes:
+        raise payload_too_large(upload.filename or "Upload", size, max_bytes)
+
+
+def _backing_file(file: IO[bytes]) -> IO[bytes]:
+    """The BytesIO or OS-level file holding a file's data, looking through SpooledTemporaryFile"""
+    if isinstance(file, tempfile.SpooledTemporaryFile):
+        # Not public API; if a Python release moves it, callers fall back to reading a copy
+        return getattr(file, "_file", None)
+    return file
+
+
+@contextmanager
+def spooled_buffer(file: IO[bytes]):
+    """
+    Read-only buffer over a (spooled) temp file's contents, valid inside the block
+
+    Starlette spools multipart files into a SpooledTemporaryFile, in memory up
+    to a small threshold (1 MB) and on disk past it. Small files are copied
+    out, which is cheap at that size; files on disk are memory-mapped, so large
+    captures are paged in by the kernel during decode rather than read into a
+    bytes object per request. Anything else is read into bytes.
+    """
+    backing = _backing_file(file)
+    if isinstance(backing, io.BytesIO):
+        yield backing.getvalue()
+        return
+
+    try:
+        fileno = backing.fileno()
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        file.seek(0)
+        yield file.read()
+        return
+    if os.fstat(fileno).st_size == 0:
+        yield b''
+        return
+
+    mapped = mmap.mmap(fileno, 0, access=mmap.ACCESS_READ)
+    try:
+        yield mapped
+    finally:
+        try:
+            mapped.close()
+        except BufferError:
+            # Something (e.g. an exception traceback) still holds a view; the GC unmaps it later
+            pass
+
+
+def upload_buffer(upload: UploadFile):
+    """spooled_buffer over an upload's contents"""
+    return spooled_buffer(upload.file)
+
+
+def detached_file(size: int) -> IO[bytes]:
+    """Where a detached upload of size bytes is kept: in memory if small, else an anonymous temp file"""
+    return io.BytesIO() if size <= DETACHED_SPOOL_BYTES else tempfile.TemporaryFile()
+
+
+async def detach_upload(upload: UploadFile) -> IO[bytes]:
+    """Copy an upload into a file that outlives the request, e.g. for a queued job"""
+    def copy():
+        target = detached_file(upload_size(upload))
+        try:
+            upload.file.seek(0)
+            shutil.copyfileobj(upload.file, target, MIB)
+        except BaseException:
+            target.close()
+            raise
+        target.seek(0)
+        return target
+
+    return await asyncio.to_thread(copy)
+
+
+async def detach_uploads(uploads: List[Optional[UploadFile]]) -> List[Optional[IO[bytes]]]:
+    """detach_upload each upload in turn (None stays None); if one fails, the copies already made are closed"""
+    detached: List[Optional[IO[bytes]]] = []
+    try:
+        for upload in uploads:
+            detached.append(await detach_upload(upload) if upload is not None else None)
+    except BaseException:
+        for f in detached:
+            if f is not None:
+                f.close()
+        raise
+    return detached
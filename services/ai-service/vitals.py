@@ -0,0 +1,20 @@
+"""
+Vital signs analysis
+"""
+
+from typing import Any, Dict
+
+
+def analyze_vital_signs(vital_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Assess a single vital signs reading"""
+    # TODO: Implement vital signs analysis
+    # For now, return mock analysis
+    return {
+        "heart_rate": vital_data.get("heart_rate", 72),
+        "blood_pressure": vital_data.get("blood_pressure", "120/80"),
+        "temperature": vital_data.get("temperature", 98.6),
+        "oxygen_saturation": vital_data.get("oxygen_saturation", 98),
+        "assessment": "Normal vital signs",
+        "alerts": [],
+        "recommendations": ["Continue monitoring"]
+    }
@@ -0,0 +1,247 @@
+"""
+Streaming vital signs analytics
+Per-session rolling statistics with O(1) updates and threshold alerts
+"""
+
+import math
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+# Samples kept per metric in each session's rolling window
+VITALS_WINDOW = 120
+
+# (low, high) alert thresholds; None disables that side
+VITAL_THRESHOLDS = {
+    "heart_rate": (50.0, 120.0),
+    "oxygen_saturation": (92.0, None),
+    "temperature": (95.0, 100.4),  # Fahrenheit, matching /analyze-vitals
+}
+
+STREAMED_METRICS = tuple(VITAL_THRESHOLDS)
+
+# Shortest window (seconds) over which a trend is reported
+MIN_TREND_SPAN_S = 5.0
+
+# Timestamps above this are taken as Unix epoch milliseconds rather than seconds
+EPOCH_MS_THRESHOLD = 1e11
+
+
+class RollingStats:
+    """
+    Fixed-size sliding window over (timestamp, value) samples
+
+    Running sums give mean, variance and least-squares trend in O(1) per
+    sample; monotonic deques give min and max in amortized O(1). Sums are
+    rebuilt from the ring buffer once per window to stop float drift.
+    """
+
+    def __init__(self, capacity: int = VITALS_WINDOW):
+        self.capacity = capacity
+        self._values = np.zeros(capacity, dtype=np.float64)
+        self._times = np.zeros(capacity, dtype=np.float64)
+        self._count = 0
+        self._next = 0
+        self._seq = 0
+
+        self._sum_y = 0.0
+        self._sum_yy = 0.0
+        self._sum_t = 0.0
+        self._sum_tt = 0.0
+        self._sum_ty = 0.0
+
+        self._min = deque()
+        self._max = deque()
+
+    def __len__(self):
+        return self._count
+
+    def add(self, t: float, y: float):
+        t = float(t)
+        y = float(y)
+        if self._count == self.capacity:
+            old_t = float(self._times[self._next])
+            old_y = float(self._values[self._next])
+            self._sum_y -= old_y
+            self._sum_yy -= old_y * old_y
+            self._sum_t -= old_t
+            self._sum_tt -= old_t * old_t
+            self._sum_ty -= old_t * old_y
+        else:
+            self._count += 1
+
+        self._values[self._next] = y
+        self._times[self._next] = t
+        self._next = (self._next + 1) % self.capacity
+
+        self._sum_y += y
+        self._sum_yy += y * y
+        self._sum_t += t
+        self._sum_tt += t * t
+        self._sum_ty += t * y
+
+        seq = self._seq
+        self._seq += 1
+        oldest = seq - self._count + 1
+        while self._min and self._min[-1][1] >= y:
+            self._min.pop()
+        self._min.append((seq, y))
+        while self._min[0][0] < oldest:
+            self._min.popleft()
+        while self._max and self._max[-1][1] <= y:
+            self._max.pop()
+        self._max.append((seq, y))
+        while self._max[0][0] < oldest:
+            self._max.popleft()
+
+        if self._next == 0:
+            self._resum()
+
+    def _resum(self):
+        values = self._values[:self._count]
+        times = self._times[:self._count]
+        self._sum_y = float(values.sum())
+        self._sum_yy = float(values @ values)
+        self._sum_t = float(times.sum())
+        self._sum_tt = float(times @ times)
+        self._sum_ty = float(times @ values)
+
+    @property
+    def last(self) -> Optional[float]:
+        if not self._count:
+            return None
+        return float(self._values[self._next - 1])
+
+    def summary(self) -> Dict[str, Any]:
+        n = self._count
+        if not n:
+            return {"samples": 0}
+
+        mean = self._sum_y / n
+        variance = max(self._sum_yy / n - mean * mean, 0.0)
+
+        # Least-squares slope in units per minute, once the window spans enough time
+        span = self._times[self._next - 1] - self._times[(self._next - n) % self.capacity]
+        trend = None
+        if span >= MIN_TREND_SPAN_S:
+            denominator = n * self._sum_tt - self._sum_t * self._sum_t
+            if denominator > 0:
+                slope = (n * self._sum_ty - self._sum_t * self._sum_y) / denominator
+                trend = round(slope * 60.0, 3)
+
+        return {
+            "samples": n,
+            "last": self.last,
+            "mean": round(mean, 3),
+            "std": round(variance ** 0.5, 3),
+            "min": self._min[0][1],
+            "max": self._max[0][1],
+            "trend_per_min": trend,
+        }
+
+
+class VitalsSession:
+    """Rolling vitals state for one device session"""
+
+    def __init__(self, session_id: str, window: int = VITALS_WINDOW):
+        self.session_id = session_id
+        self.started_at = time.time()
+        self.last_seen = self.started_at
+        self.samples = 0
+        # Timestamp of the first sample; clients may send any clock (epoch, device uptime)
+        self.time_origin: Optional[float] = None
+        self.stats = {metric: RollingStats(window) for metric in STREAMED_METRICS}
+        self._alarm_state = {metric: None for metric in STREAMED_METRICS}
+
+    def ingest(self, sample: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Add one sample, validated before anything is recorded; returns alerts raised or cleared by it"""
+        now = time.time()
+        timestamp = float(sample.get("timestamp", now))
+        values = {metric: float(sample[metric]) for metric in STREAMED_METRICS if sample.get(metric) is not None}
+        if not all(math.isfinite(value) for value in (timestamp, *values.values())):
+            raise ValueError("timestamp and vitals must be finite numbers")
+
+        self.last_seen = now
+        self.samples += 1
+
+        seconds = timestamp / 1000.0 if timestamp > EPOCH_MS_THRESHOLD else timestamp
+        if self.time_origin is None:
+            self.time_origin = seconds
+        # Time since the session's first sample keeps the running sums well conditioned on any clock
+        t = seconds - self.time_origin
+
+        alerts = []
+        for metric, value in values.items():
+            self.stats[metric].add(t, value)
+
+            alert = self._check_threshold(metric, value, timestamp)
+            if alert:
+                alerts.append(alert)
+
+        return alerts
+
+    def _check_threshold(self, metric: str, value: float, timestamp: float) -> Optional[Dict[str, Any]]:
+        """Edge-triggered alerting so a sustained excursion is reported once"""
+        low, high = VITAL_THRESHOLDS[metric]
+        if low is not None and value < low:
+            state = "low"
+        elif high is not None and value > high:
+            state = "high"
+        else:
+            state = None
+
+        previous = self._alarm_state[metric]
+        if state == previous:
+            return None
+        self._alarm_state[metric] = state
+
+        return {
+            "type": "alert" if state else "alert_cleared",
+            "session_id": self.session_id,
+            "metric": metric,
+            "level": state or previous,
+            "value": value,
+            "threshold": low if (state or previous) == "low" else high,
+            "timestamp": timestamp,
+        }
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "type": "stats",
+            "session_id": self.session_id,
+            "samples": self.samples,
+            "active_alerts": {m: s for m, s in self._alarm_state.items() if s},
+            "metrics": {metric: stats.summary() for metric, stats in self.stats.items()},
+        }
+
+
+class VitalsSessionRegistry:
+    """Live vitals sessions keyed by session id, evicted after idle_timeout seconds"""
+
+    def __init__(self, idle_timeout: float = 600.0, window: int = VITALS_WINDOW):
+        self.idle_timeout = idle_timeout
+        self.window = window
+        self._sessions: Dict[str, VitalsSession] = {}
+
+    def find(self, session_id: str) -> Optional[VitalsSession]:
+        """An existing session, or None"""
+        return self._sessions.get(session_id)
+
+    def get(self, session_id: str) -> VitalsSession:
+        """The session, created on first use"""
+        session = self._sessions.get(session_id)
+        if session is None:
+            self.evict_idle()
+            session = VitalsSession(session_id, self.window)
+            self._sessions[session_id] = session
+        return session
+
+    def evict_idle(self):
+        cutoff = time.time() - self.idle_timeout
+        for session_id in [s for s, session in self._sessions.items() if session.last_seen < cutoff]:
+            del self._sessions[session_id]
+
+    def __len__(self):
+        return len(self._sessions)
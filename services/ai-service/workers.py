@@ -0,0 +1,114 @@
+"""
+Bounded worker pool for CPU-bound analysis
+Keeps OpenCV/NumPy work off the event loop and sheds load when saturated
+"""
+
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class PoolSaturatedError(Exception):
+    """Raised when the pool already holds its maximum number of pending jobs"""
+
+
+def warm_up():
+    """Prime a worker so the first real request doesn't pay import/allocation costs"""
+    # Imported here so process workers load the pipeline (and any model) at spawn time
+    from preprocessing import preprocess_image
+
+    if multiprocessing.parent_process() is not None:
+        # One OpenCV thread per process; the pool itself provides the parallelism
+        cv2.setNumThreads(1)
+
+    ok, encoded = cv2.imencode('.jpg', np.zeros((64, 64, 3), dtype=np.uint8))
+    if ok:
+        preprocess_image(encoded, 32)
+
+
+class WorkerPool:
+    """
+    Thread or process pool with bounded queue depth
+
+    At most max_workers jobs run at once and at most max_queue more may wait.
+    Beyond that run() raises PoolSaturatedError immediately so callers can
+    answer 503 instead of piling up work.
+    """
+
+    def __init__(self, max_workers: int = 4, max_queue: int = 16, mode: str = "thread"):
+        if mode not in ("thread", "process"):
+            raise ValueError(f"Unknown worker mode: {mode}")
+
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.mode = mode
+        self._executor: Optional[Executor] = None
+        self._pending = 0
+
+    @property
+    def capacity(self) -> int:
+        return self.max_workers + self.max_queue
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    async def start(self):
+        """Create the executor and warm every worker"""
+        if self._executor is not None:
+            return
+
+        if self.mode == "process":
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                initializer=warm_up
+            )
+        else:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix="analysis"
+            )
+
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*[
+            loop.run_in_executor(self._executor, warm_up)
+            for _ in range(self.max_workers)
+        ])
+        logger.info(f"Worker pool ready ({self.mode}, {self.max_workers} workers, "
+                    f"queue depth {self.max_queue})")
+
+    async def stop(self):
+        """Shut the executor down, letting running jobs finish"""
+        if self._executor is None:
+            return
+        executor, self._executor = self._executor, None
+        await asyncio.get_running_loop().run_in_executor(None, executor.shutdown)
+
+    async def run(self, fn: Callable[..., Any], *args) -> Any:
+        """Run fn(*args) on the pool, or raise PoolSaturatedError if it is full"""
+        if self._executor is None:
+            raise RuntimeError("Worker pool is not running")
+        if self._pending >= self.capacity:
+            raise PoolSaturatedError(
+                f"Worker pool saturated ({self._pending}/{self.capacity} jobs pending)")
+
+        self._pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        finally:
+            self._pending -= 1
+
+    def stats(self):
+        return {
+            "mode": self.mode,
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "pending": self._pending,
+        }
@@ -0,0 +1,79 @@
+"""
+Wound assessment model
+Input normalization and the (currently mocked) batched wound classifier
+"""
+
+import copy
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+# Mean/std used to normalize BGR input tensors
+INPUT_MEAN = np.array([0.406, 0.456, 0.485], dtype=np.float32)
+INPUT_STD = np.array([0.225, 0.224, 0.229], dtype=np.float32)
+
+# (x / 255 - mean) / std folded into one multiply-add
+INPUT_SCALE = 1.0 / (255.0 * INPUT_STD)
+INPUT_OFFSET = -INPUT_MEAN / INPUT_STD
+
+MOCK_ANALYSIS = {
+    "wound_detected": True,
+    "confidence_score": 0.87,
+    "severity": "moderate",
+    "wound_area_cm2": 2.5,
+    "detected_features": {
+        "color_analysis": "reddish with some inflammation",
+        "texture": "irregular surface",
+        "edges": "well-defined borders"
+    },
+    "recommendations": [
+        "Clean wound with saline solution",
+        "Apply antiseptic",
+        "Cover with sterile bandage",
+        "Monitor for signs of infection"
+    ],
+    "requires_professional": False,
+    "risk_assessment": "low",
+    "treatment_recommendation": "Clean wound and apply antiseptic. Monitor healing progress."
+}
+
+
+class MockWoundModel:
+    """Stand-in wound classifier with the batched interface a real model will expose"""
+
+    DEFAULT_VERSION = "mock-1.0.0"
+
+    def __init__(self, input_size: int = 512, version: Optional[str] = None):
+        self.input_size = input_size
+        self.version = version or self.DEFAULT_VERSION
+        # Normalized input tensor, reused across batches and grown to the largest seen
+        self._input: Optional[np.ndarray] = None
+
+    def prepare_batch(self, batch: np.ndarray) -> np.ndarray:
+        """
+        Normalize an (N, H, W, 3) uint8 batch into the model's input tensor
+
+        The returned float32 array is a view of a buffer reused by the next
+        call, so it is only valid until then; batches run one at a time.
+        """
+        if self._input is None or len(self._input) < len(batch) or self._input.shape[1:] != batch.shape[1:]:
+            self._input = np.empty(batch.shape, dtype=np.float32)
+        tensor = self._input[:len(batch)]
+        np.multiply(batch, INPUT_SCALE, out=tensor)
+        tensor += INPUT_OFFSET
+        return tensor
+
+    def predict(self, batch: np.ndarray) -> List[Dict[str, Any]]:
+        """Run inference on an (N, H, W, 3) float32 batch, one result per item"""
+        # TODO: Implement actual AI model
+        return [copy.deepcopy(MOCK_ANALYSIS) for _ in range(len(batch))]
+
+
+def load_wound_model(version: Optional[str] = None, input_size: int = 512) -> MockWoundModel:
+    """Model registry loader; a real model would import its framework and read weights here"""
+    return MockWoundModel(input_size=input_size, version=version)
+
+
+def warm_up_wound_model(model: MockWoundModel):
+    """One throwaway inference so the first request doesn't pay for lazy initialization"""
+    model.predict(model.prepare_batch(np.zeros((1, model.input_size, model.input_size, 3), dtype=np.uint8)))